@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+准入控制与过载保护：开销大的接口按路由限制并发，超出部分进入有界等待队列
+
+1. 每个受限路由一个限流器：最多 max_concurrent 个请求同时执行，最多 max_queue 个请求排队（先进先出）
+2. 队列已满的请求立即返回 429，排队超过 ADMISSION_QUEUE_TIMEOUT_MS 的请求返回 503，
+   两者都带 Retry-After（按近期平均处理耗时和当前排队长度估算）
+3. 健康检查、组件列表等轻量接口不受限，数据接口过载时仍立即响应（预留容量）
+4. 请求执行完毕后槽位直接交给队首的等待者，不会被新到达的请求插队
+5. ASGI 入口绑定 data 线程池（bind_pool）：所有 data 接口请求通过路由限流器后，再经过以线程数为并发上限的
+   全局限流器，准入的请求一定有空闲线程，不会在 ThreadPoolExecutor 的无界队列中等待（排队超时对那里无效）；
+   各路由的并发上限也不超过线程数
+
+ASGI 入口在事件循环中异步排队，排队的请求不占用线程池；上面的排队、排队超时和预留容量保证只在 ASGI 模式下成立。
+直接以 WSGI/Flask 运行时不排队（没有空闲槽位立即返回 429）：在处理线程中阻塞等待会占满服务器线程，
+轻量接口反而得不到处理。路由限流器按进程计数，gunicorn 同步 worker 每个进程同时只处理一个请求，
+进程内的限额不会触发；因此 WSGI 模式另有跨进程的 data 接口槽位（WorkerSlots，每个槽位一个文件锁），
+data 接口最多占用 ADMISSION_WSGI_DATA_SLOTS 个工作进程，其余进程保留给健康检查、组件列表等轻量接口
+
+环境变量：
+    ADMISSION_CONTROL：设为 0 禁用（默认启用）
+    ADMISSION_LIMITS：覆盖默认限额，如 "/api/capacity/extrapolation=4:16,/api/timeseries=2:8"（并发:队列）
+    ADMISSION_QUEUE_TIMEOUT_MS：排队超时（默认 2000，ASGI 模式下路由和线程池两级排队共用）
+    ADMISSION_POOL_QUEUE：ASGI data 线程池的全局等待队列长度（默认线程数的 4 倍）
+    ADMISSION_WSGI_DATA_SLOTS：WSGI 模式下 data 接口可同时占用的工作进程数，
+        默认 WEB_CONCURRENCY - 1（gunicorn 同样按 WEB_CONCURRENCY 确定默认 worker 数）；两者都未设置时不限制
+    ADMISSION_SLOT_DIR：WSGI 槽位锁文件目录（默认系统临时目录下按主进程区分的子目录）
+"""
+
+import asyncio
+import math
+import os
+import pathlib
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+from tracing import annotate
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# 健康检查、组件列表等只读内存快照的轻量接口（ASGI 走 fast 线程池，WSGI 不占用 data 接口槽位）
+FAST_PATHS = frozenset({
+    '/api/health',
+    '/api/ready',
+    '/api/components',
+    '/api/components/databases',
+    '/api/components/message-queues',
+    '/api/components/operating-systems',
+})
+
+
+# 路由 -> (最大并发, 最大排队数)
+DEFAULT_ROUTE_LIMITS = {
+    '/api/adaptation/task-based': (4, 16),
+    '/api/performance/evaluate': (4, 16),
+    '/api/timeseries': (4, 16),
+    '/api/capacity/extrapolation': (4, 16),
+    '/api/capacity/scale-out': (2, 8),
+    '/api/capacity/curve': (2, 8),
+    '/api/capacity/pipeline': (2, 8),
+    '/api/query': (4, 16),
+    '/api/results/databases': (2, 8),
+    '/api/results/message-queues': (2, 8),
+    '/api/debug/memory': (1, 0),
+    '/api/admin/reload': (1, 0),
+}
+
+QUEUE_TIMEOUT_MS = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT_MS', '2000'))
+
+# ASGI data 线程池的全局等待队列长度 = 线程数 × 该倍数（ADMISSION_POOL_QUEUE 未设置时）
+POOL_QUEUE_FACTOR = 4
+
+# 尚无处理耗时样本时 Retry-After 的估算值（秒）
+DEFAULT_SERVICE_S = 0.5
+EWMA_WEIGHT = 0.2
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[int, int]]:
+    """
+    解析限额配置："路由=并发:队列,..."
+
+    Raises:
+        ValueError: 格式错误或取值非法
+    """
+    limits = {}
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        route, _, value = item.partition('=')
+        concurrency, _, queue = value.partition(':')
+        try:
+            concurrency, queue = int(concurrency), int(queue or 0)
+        except ValueError:
+            raise ValueError(f"无法解析准入限额: {item}")
+        if concurrency <= 0 or queue < 0:
+            raise ValueError(f"准入限额必须为正数: {item}")
+        limits[route.rstrip('/')] = (concurrency, queue)
+    return limits
+
+
+class _Waiter:
+    """一个排队中的请求；granted 只在持有限流器锁时修改"""
+
+    __slots__ = ('granted', 'notify')
+
+    def __init__(self, notify):
+        self.granted = False
+        self.notify = notify
+
+
+class RouteLimiter:
+    """单个路由的并发限制和有界等待队列（线程安全，同时支持同步和异步等待）"""
+
+    def __init__(self, route: str, max_concurrent: int, max_queue: int,
+                 queue_timeout_ms: float = QUEUE_TIMEOUT_MS):
+        self.route = route
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_ms / 1000.0
+        self.active = 0
+        self.service_s = None
+        self.stats = {'admitted': 0, 'queued': 0, 'rejected_queue_full': 0, 'rejected_busy': 0,
+                      'rejected_timeout': 0, 'cancelled': 0}
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def _enter(self, notify) -> Tuple[str, Optional[_Waiter]]:
+        """尝试进入：('admitted', None)、('queued', 等待者) 或 ('queue_full', None)"""
+        with self._lock:
+            if self.active < self.max_concurrent and not self._waiters:
+                self.active += 1
+                self.stats['admitted'] += 1
+                return 'admitted', None
+            if len(self._waiters) >= self.max_queue:
+                self.stats['rejected_queue_full'] += 1
+                return 'queue_full', None
+            waiter = _Waiter(notify)
+            self._waiters.append(waiter)
+            self.stats['queued'] += 1
+            return 'queued', waiter
+
+    def _abandon(self, waiter: _Waiter, reason: str = 'rejected_timeout') -> bool:
+        """放弃等待（超时或取消）：槽位已交给该等待者时返回 True（视为准入），否则移出队列"""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            self.stats[reason] += 1
+            return False
+
+    def try_acquire(self) -> Optional[str]:
+        """
+        不排队的准入（WSGI/Flask 处理线程中使用）
+
+        Returns:
+            None 表示已准入（之后必须调用 release）；没有空闲槽位时为 'busy'
+        """
+        with self._lock:
+            if self.active < self.max_concurrent and not self._waiters:
+                self.active += 1
+                self.stats['admitted'] += 1
+                return None
+            self.stats['rejected_busy'] += 1
+            return 'busy'
+
+    async def acquire_async(self, timeout_s: Optional[float] = None) -> Optional[str]:
+        """
+        在事件循环中等待准入（ASGI 入口使用）
+
+        Args:
+            timeout_s: 排队超时（秒），默认 queue_timeout_s
+
+        Returns:
+            None 表示已准入（之后必须调用 release）；否则为 'queue_full' 或 'timeout'
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def notify():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        outcome, waiter = self._enter(notify)
+        if outcome != 'queued':
+            return None if outcome == 'admitted' else outcome
+        try:
+            done, _ = await asyncio.wait({future}, timeout=self.queue_timeout_s if timeout_s is None else timeout_s)
+        except asyncio.CancelledError:
+            # 客户端断开等导致任务取消：已分到的槽位归还，否则移出队列，避免槽位泄漏
+            if self._abandon(waiter, 'cancelled'):
+                self.release()
+            raise
+        if done or self._abandon(waiter):
+            return None
+        return 'timeout'
+
+    def release(self, service_s: Optional[float] = None):
+        """请求结束：记录处理耗时，槽位交给队首等待者或归还"""
+        with self._lock:
+            if service_s is not None:
+                self.service_s = service_s if self.service_s is None else \
+                    (1 - EWMA_WEIGHT) * self.service_s + EWMA_WEIGHT * service_s
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                self.stats['admitted'] += 1
+                waiter.notify()
+                return
+            self.active -= 1
+
+    def retry_after(self) -> int:
+        """建议的重试等待秒数：排在当前队列之后所需的时间（至少 1 秒）"""
+        with self._lock:
+            service_s = self.service_s if self.service_s is not None else DEFAULT_SERVICE_S
+            backlog = len(self._waiters) + 1
+        return max(1, math.ceil(service_s * backlog / self.max_concurrent))
+
+    def snapshot(self) -> Dict:
+        """当前状态与累计计数"""
+        with self._lock:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'active': self.active,
+                'waiting': len(self._waiters),
+                'avg_service_ms': None if self.service_s is None else round(self.service_s * 1000.0, 2),
+                **self.stats,
+            }
+
+
+class AdmissionController:
+    """按路由分派限流器；未配置限额的路由不受限"""
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[int, int]]] = None,
+                 queue_timeout_ms: float = QUEUE_TIMEOUT_MS):
+        limits = DEFAULT_ROUTE_LIMITS if limits is None else limits
+        self.queue_timeout_ms = queue_timeout_ms
+        self.limiters = {
+            route: RouteLimiter(route, concurrency, queue, queue_timeout_ms)
+            for route, (concurrency, queue) in limits.items()
+        }
+        self.pool_limiter: Optional[RouteLimiter] = None
+
+    def bind_pool(self, workers: int, max_queue: Optional[int] = None):
+        """
+        绑定 ASGI data 线程池：路由并发上限收紧到线程数，并创建以线程数为并发上限的全局限流器
+
+        Args:
+            workers: data 线程池的线程数
+            max_queue: 全局等待队列长度，默认 ADMISSION_POOL_QUEUE 或线程数 × POOL_QUEUE_FACTOR
+        """
+        if max_queue is None:
+            max_queue = int(os.environ.get('ADMISSION_POOL_QUEUE', workers * POOL_QUEUE_FACTOR))
+        for limiter in self.limiters.values():
+            limiter.max_concurrent = min(limiter.max_concurrent, workers)
+        self.pool_limiter = RouteLimiter('data 线程池', workers, max_queue, self.queue_timeout_ms)
+
+    def limiter_for(self, path: str) -> Optional[RouteLimiter]:
+        """请求路径对应的限流器"""
+        return self.limiters.get(path.rstrip('/'))
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """全部限流器的状态（已绑定线程池时另含 data 线程池的全局限流器）"""
+        snapshot = {route: limiter.snapshot() for route, limiter in self.limiters.items()}
+        if self.pool_limiter is not None:
+            snapshot[self.pool_limiter.route] = self.pool_limiter.snapshot()
+        return snapshot
+
+
+class WorkerSlots:
+    """
+    WSGI 模式下跨进程的 data 接口槽位：每个槽位是一个文件锁，请求处理期间持有
+
+    锁随文件描述符关闭或进程退出自动释放，worker 崩溃不会泄漏槽位；不排队，没有空闲槽位立即拒绝
+    """
+
+    route = 'data 接口'
+
+    def __init__(self, slots: int, directory: Optional[str] = None):
+        self.max_concurrent = slots
+        self.directory = directory
+        self.service_s = None
+        self._lock = threading.Lock()
+
+    def _slot_dir(self) -> pathlib.Path:
+        """锁文件目录：默认按主进程（gunicorn arbiter）区分，在 worker 中首次使用时确定"""
+        if self.directory is None:
+            self.directory = os.path.join(tempfile.gettempdir(), f'admission-slots-{os.getppid()}')
+        path = pathlib.Path(self.directory)
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def try_acquire(self) -> Optional[int]:
+        """
+        尝试占用一个槽位
+
+        Returns:
+            持有锁的文件描述符（之后必须调用 release）；没有空闲槽位时为 None
+        """
+        directory = self._slot_dir()
+        for slot in range(self.max_concurrent):
+            fd = os.open(directory / f'slot-{slot}.lock', os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+        return None
+
+    def release(self, fd: int, service_s: Optional[float] = None):
+        """释放槽位并记录处理耗时"""
+        os.close(fd)
+        if service_s is not None:
+            with self._lock:
+                self.service_s = service_s if self.service_s is None else \
+                    (1 - EWMA_WEIGHT) * self.service_s + EWMA_WEIGHT * service_s
+
+    def retry_after(self) -> int:
+        """建议的重试等待秒数：约一个请求的平均处理耗时（至少 1 秒）"""
+        with self._lock:
+            service_s = self.service_s if self.service_s is not None else DEFAULT_SERVICE_S
+        return max(1, math.ceil(service_s))
+
+
+def create_worker_slots() -> Optional[WorkerSlots]:
+    """按环境变量创建 WSGI 模式的 data 接口槽位（未配置或平台不支持文件锁时为 None）"""
+    if fcntl is None:
+        return None
+    slots = os.environ.get('ADMISSION_WSGI_DATA_SLOTS')
+    if slots is None:
+        workers = os.environ.get('WEB_CONCURRENCY')
+        if workers is None:
+            return None
+        slots = max(int(workers) - 1, 1)
+    if int(slots) <= 0:
+        raise ValueError(f"ADMISSION_WSGI_DATA_SLOTS 必须为正数: {slots}")
+    return WorkerSlots(int(slots), os.environ.get('ADMISSION_SLOT_DIR'))
+
+
+def rejection(limiter, reason: str) -> Tuple[int, Dict, Dict[str, str]]:
+    """
+    拒绝响应：等待队列已满（ASGI）或没有空闲槽位（WSGI，不排队）为 429，排队超时为 503
+
+    Args:
+        limiter: RouteLimiter 或 WorkerSlots
+        reason: 'queue_full'、'busy'、'timeout'
+
+    Returns:
+        (状态码, 响应体, 响应头)
+    """
+    retry_after = limiter.retry_after()
+    if reason == 'queue_full':
+        status, message = 429, f'请求过多，{limiter.route} 的并发和等待队列已满'
+    elif reason == 'busy' and isinstance(limiter, WorkerSlots):
+        status, message = 429, f'请求过多，{limiter.route} 已占满 {limiter.max_concurrent} 个工作进程（其余进程保留给轻量接口）'
+    elif reason == 'busy':
+        status, message = 429, f'请求过多，{limiter.route} 没有空闲的并发槽位'
+    else:
+        status, message = 503, f'服务繁忙，{limiter.route} 排队超时'
+    return status, {'error': message, 'retry_after_s': retry_after}, {'Retry-After': str(retry_after)}
+
+
+def create_controller() -> Optional[AdmissionController]:
+    """按环境变量创建准入控制器（ADMISSION_CONTROL=0 时为 None）"""
+    if os.environ.get('ADMISSION_CONTROL', '1') == '0':
+        return None
+    limits = dict(DEFAULT_ROUTE_LIMITS)
+    spec = os.environ.get('ADMISSION_LIMITS')
+    if spec:
+        limits.update(parse_limits(spec))
+    return AdmissionController(limits)
+
+
+controller = create_controller()
+worker_slots = create_worker_slots() if controller is not None else None
+
+# ASGI 入口已完成准入时在 environ 中设置该标记，Flask 钩子不再重复排队
+ADMITTED_ENVIRON_KEY = 'admission.admitted'
+
+
+def install_admission(app):
+    """
+    为 Flask 应用注册准入控制钩子（ADMISSION_CONTROL=0 时不注册）
+
+    WSGI 模式下不排队：先占用路由的进程内槽位，data 接口再占用跨进程的工作进程槽位（见模块说明）
+    """
+    if controller is None:
+        return
+
+    from flask import g, jsonify, request
+
+    def reject(limiter, reason: str):
+        annotate('admission.rejected', reason)
+        status, body, headers = rejection(limiter, reason)
+        return jsonify(body), status, headers
+
+    @app.before_request
+    def _admit_request():
+        if request.environ.get(ADMITTED_ENVIRON_KEY):
+            return None
+        limiter = controller.limiter_for(request.path)
+        if limiter is not None:
+            reason = limiter.try_acquire()
+            if reason is not None:
+                return reject(limiter, reason)
+            g.admission = (limiter, time.perf_counter())
+        if worker_slots is not None and request.path.rstrip('/') not in FAST_PATHS:
+            fd = worker_slots.try_acquire()
+            if fd is None:
+                return reject(worker_slots, 'busy')
+            g.worker_slot = (fd, time.perf_counter())
+        return None
+
+    @app.teardown_request
+    def _release_request(error=None):
+        slot = g.pop('worker_slot', None)
+        if slot is not None:
+            fd, start = slot
+            worker_slots.release(fd, time.perf_counter() - start)
+        admitted = g.pop('admission', None)
+        if admitted is not None:
+            limiter, start = admitted
+            limiter.release(time.perf_counter() - start)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+组件别名索引：把 components.json 中的组件（ID、显示名称、厂商、版本）映射到测试数据集的组件名
+
+测试结果文件按 {Component}_kbbench_results_*.csv / {Component}_perftest_*.csv 命名，
+而请求中的组件名可能是目录中的显示名称（如 "人大金仓 KingbaseES"、"阿里 RabbitMQ"）。
+索引在加载组件目录时构建一次，请求时规范化名称后查字典即可，不再逐个文件名做子串匹配。
+
+规范化：NFKC、转小写，按中文/字母数字切分为词元后拼接（"人大金仓 KingbaseES" -> "人大金仓kingbasees"）
+
+别名来源（目录条目中任一词元或完整名称与数据集组件名相同时，该条目关联到该数据集）：
+1. 数据集组件名本身
+2. 组件 ID（"#2"）
+3. 显示名称、显示名称中的各词元
+4. 厂商
+5. 版本、名称 + 版本
+指向不同目标的别名（如两个组件共用的厂商名）视为有歧义，不收录
+"""
+
+import pathlib
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set
+
+from datasets import component_from_filename, list_csv_files
+
+
+# components.json 中的分类 -> 测试数据的组件类型
+CATALOG_TYPES = {
+    'databases': 'DB',
+    'message_queues': 'MQ',
+}
+
+_TOKEN_PATTERN = re.compile(r'[\u3400-\u9fff]+|[a-z0-9]+')
+
+
+def tokens(text) -> List[str]:
+    """名称的规范化词元（中文串或字母数字串）"""
+    if text is None:
+        return []
+    return _TOKEN_PATTERN.findall(unicodedata.normalize('NFKC', str(text)).lower())
+
+
+def normalize_alias(text) -> str:
+    """名称的规范化形式（词元拼接）"""
+    return ''.join(tokens(text))
+
+
+def discover_datasets(data_dir: pathlib.Path) -> Dict[str, Set[str]]:
+    """数据目录中已有测试结果的组件名：{'DB': {...}, 'MQ': {...}}"""
+    found = {'DB': set(), 'MQ': set()}
+    if not data_dir.exists():
+        return found
+    for kind, component_type in (('db', 'DB'), ('mq_summary', 'MQ')):
+        for path in list_csv_files(data_dir, kind):
+            component = component_from_filename(path, '')
+            if component:
+                found[component_type].add(component)
+    return found
+
+
+def _entry_aliases(item: Dict) -> Iterable[str]:
+    """目录条目的全部别名（已规范化）"""
+    name_tokens = tokens(item.get('name'))
+    version = normalize_alias(item.get('version'))
+    if 'id' in item:
+        yield f"#{item['id']}"
+    yield ''.join(name_tokens)
+    yield from name_tokens
+    yield normalize_alias(item.get('vendor'))
+    if version:
+        yield version
+        yield ''.join(name_tokens) + version
+
+
+def build_alias_index(components: Dict, datasets: Dict[str, Set[str]]) -> Dict:
+    """
+    构建别名索引
+
+    Args:
+        components: components.json 的解析结果
+        datasets: discover_datasets 的结果
+
+    Returns:
+        {'aliases': {组件类型: {规范化别名: 数据集组件名}},
+         'entries': {组件类型: {数据集组件名: [目录中的显示名称]}}}
+    """
+    aliases: Dict[str, Dict[str, str]] = {}
+    entries: Dict[str, Dict[str, List[str]]] = {}
+    for catalog_key, component_type in CATALOG_TYPES.items():
+        by_token = {normalize_alias(name): name for name in datasets.get(component_type, ())}
+        # 别名 -> 目标数据集（None 表示对应的目录条目没有测试数据）
+        candidates: Dict[str, Optional[str]] = {}
+        ambiguous: Set[str] = set()
+
+        def add(alias: str, target: Optional[str]):
+            if not alias or alias in ambiguous:
+                return
+            if alias in candidates and candidates[alias] != target:
+                ambiguous.add(alias)
+                del candidates[alias]
+                return
+            candidates[alias] = target
+
+        entries[component_type] = {name: [] for name in by_token.values()}
+        for item in components.get(catalog_key, []):
+            name_tokens = tokens(item.get('name'))
+            target = next((by_token[t] for t in [''.join(name_tokens)] + name_tokens if t in by_token), None)
+            if target is not None:
+                entries[component_type][target].append(item.get('name'))
+            for alias in _entry_aliases(item):
+                add(alias, target)
+
+        table = {alias: target for alias, target in candidates.items() if target is not None}
+        # 数据集组件名本身总是可以直接使用
+        table.update(by_token)
+        aliases[component_type] = table
+    return {'aliases': aliases, 'entries': entries}
+
+
+def resolve_alias(index: Dict, name, component_type: str) -> Optional[str]:
+    """
+    将请求中的组件名（或 ID）解析为数据集组件名
+
+    Returns:
+        数据集组件名；无匹配时为 None
+    """
+    if name is None:
+        return None
+    text = str(name).strip()
+    key = f"#{text}" if text.isdigit() else normalize_alias(text)
+    return index['aliases'].get(component_type, {}).get(key)
+
+
+def dataset_matches(path: pathlib.Path, dataset_name: str) -> bool:
+    """测试结果文件是否属于该数据集组件（按文件名中的组件名规范化后比较）"""
+    return normalize_alias(component_from_filename(path, '')) == normalize_alias(dataset_name)
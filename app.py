@@ -5,43 +5,213 @@
 
 from flask import Flask, jsonify, request
 from flask_cors import CORS
+from datetime import datetime
 import json
 import os
+import pathlib
+import threading
+import time
 
 # 创建Flask应用
 app = Flask(__name__)
 CORS(app)
 
+# 响应压缩（gzip，安装 brotli/zstandard 后同时支持 br/zstd）
+from compression import install_compression
+install_compression(app)
+
+# 链路追踪（TRACE_SAMPLE_RATE 大于 0 时按比例采样）
+from tracing import install_tracing
+install_tracing(app)
+
+# 慢请求日志（SLOW_REQUEST_MS 大于 0 时记录超过阈值的请求）
+from slowlog import install_slow_log
+install_slow_log(app)
+
+# 准入控制（开销大的接口限制并发，超出等待队列时返回 429/503）
+from admission import install_admission
+install_admission(app)
+
+def resolve_components_path():
+    """确定组件数据文件路径"""
+    # 组件数据从 datas 目录加载（真实数据）
+    components_path = 'datas/components.json'
+
+    # 向后兼容：如果 datas/components.json 不存在，尝试从 fake-data 或 data 加载
+    if not os.path.exists(components_path):
+        if os.path.exists('fake-data/components.json'):
+            components_path = 'fake-data/components.json'
+        elif os.path.exists('data/components.json'):
+            components_path = 'data/components.json'
+
+    return components_path
+
 # 加载JSON数据
 def load_data():
     """加载组件数据"""
     try:
-        # 组件数据从 datas 目录加载（真实数据）
-        components_path = 'datas/components.json'
-        
-        # 向后兼容：如果 datas/components.json 不存在，尝试从 fake-data 或 data 加载
-        if not os.path.exists(components_path):
-            if os.path.exists('fake-data/components.json'):
-                components_path = 'fake-data/components.json'
-            elif os.path.exists('data/components.json'):
-                components_path = 'data/components.json'
-        
+        components_path = resolve_components_path()
+
         components = {}
-        
+
         if os.path.exists(components_path):
             with open(components_path, 'r', encoding='utf-8') as f:
                 components = json.load(f)
-        
+
         return components
     except Exception as e:
         print(f"加载数据文件失败: {e}")
         return {}
 
+from aliases import build_alias_index, discover_datasets
+
+def build_catalog(components, source=None, mtime=None, datasets=None):
+    """
+    构建组件目录快照（组件数据及其派生索引）
+
+    快照构建完成后不再修改，读取方拿到引用即可无锁使用
+
+    Args:
+        components: components.json 的解析结果
+        source: 数据文件路径
+        mtime: 数据文件修改时间
+        datasets: datas/ 中已有测试结果的组件名（discover_datasets 的结果，默认现场扫描）
+
+    Returns:
+        组件目录快照字典
+    """
+    databases = components.get('databases', [])
+    message_queues = components.get('message_queues', [])
+    operating_systems = components.get('operating_systems', [])
+
+    # 按类型和ID建立索引，避免请求时遍历列表
+    by_id = {}
+    for comp_type, items in (('databases', databases),
+                             ('message_queues', message_queues),
+                             ('operating_systems', operating_systems)):
+        for item in items:
+            if 'id' in item:
+                by_id[(comp_type, item['id'])] = item
+
+    # 组件名/ID/厂商/版本 -> 测试数据集组件名，请求时按规范化名称查字典
+    if datasets is None:
+        datasets = discover_datasets(pathlib.Path('datas'))
+    alias_index = build_alias_index(components, datasets)
+
+    return {
+        'components': components,
+        'listing': {
+            'databases': databases,
+            'message_queues': message_queues,
+            'operating_systems': operating_systems
+        },
+        'by_id': by_id,
+        'aliases': alias_index,
+        'datasets': datasets,
+        'source': source,
+        'mtime': mtime,
+        'version': f"{mtime or 0:.6f}",
+        'loaded_at': datetime.now().isoformat(timespec='seconds')
+    }
+
+# 预热快照：有效时直接使用其中的组件数据，并预填充测试数据的解析和归一化缓存；
+# 快照不存在或源文件已变化时按原流程加载（设置 SNAPSHOT_PATH 为空可禁用）
+SNAPSHOT_PATH = os.environ.get('SNAPSHOT_PATH', 'datas/snapshot.npz')
+_warm_start = None
+if SNAPSHOT_PATH:
+    from snapshot import load_warm_start
+    _warm_start = load_warm_start(SNAPSHOT_PATH, resolve_components_path())
+
 # 全局数据
-COMPONENTS = load_data()
+if _warm_start is not None and _warm_start['components'] is not None:
+    COMPONENTS = _warm_start['components']
+else:
+    COMPONENTS = load_data()
+
+# 当前组件目录快照：重载时整体替换引用（赋值是原子的），读取方从不加锁
+_catalog_path = resolve_components_path()
+_catalog = build_catalog(
+    COMPONENTS,
+    source=_catalog_path,
+    mtime=os.path.getmtime(_catalog_path) if os.path.exists(_catalog_path) else None
+)
+# 仅用于串行化重载，读取路径不使用
+_reload_lock = threading.Lock()
+
+def get_catalog():
+    """获取当前组件目录快照"""
+    return _catalog
+
+def reload_components(force=False):
+    """
+    重新加载组件数据并原子替换快照
+
+    新快照在调用线程中完整构建后才替换，解析失败时保留旧快照；
+    components.json 未变化但 datas/ 中测试结果的组件集合变化时（新增或删除了组件的结果文件）也重建，
+    别名索引随之更新
+
+    Args:
+        force: 文件和测试数据都未变化时是否仍然重载
+
+    Returns:
+        (快照, 是否发生替换)
+    """
+    global _catalog, COMPONENTS
+
+    with _reload_lock:
+        current = _catalog
+        components_path = resolve_components_path()
+        if not os.path.exists(components_path):
+            raise FileNotFoundError(f"组件数据文件不存在: {components_path}")
+
+        mtime = os.path.getmtime(components_path)
+        datasets = discover_datasets(pathlib.Path('datas'))
+        if not force and components_path == current['source'] and mtime == current['mtime'] \
+                and datasets == current['datasets']:
+            return current, False
+
+        with open(components_path, 'r', encoding='utf-8') as f:
+            components = json.load(f)
+        if not isinstance(components, dict):
+            raise ValueError("组件数据格式错误：顶层必须是对象")
+
+        catalog = build_catalog(components, source=components_path, mtime=mtime, datasets=datasets)
+        _catalog = catalog
+        COMPONENTS = components
+        return catalog, True
+
+def start_components_watcher(interval):
+    """
+    启动后台线程轮询 components.json 和 datas/ 中的测试结果，变化时自动重载
+
+    Args:
+        interval: 轮询间隔（秒）
+    """
+    def watch():
+        while True:
+            time.sleep(interval)
+            try:
+                catalog, reloaded = reload_components()
+                if reloaded:
+                    print(f"组件数据已重载: {catalog['source']} (version={catalog['version']})")
+            except Exception as e:
+                print(f"组件数据重载失败，继续使用旧数据: {e}")
+
+    watcher = threading.Thread(target=watch, name='components-watcher', daemon=True)
+    watcher.start()
+    return watcher
+
+# 设置 COMPONENTS_WATCH_INTERVAL（秒）后自动监听组件数据文件和测试结果的变化
+_watch_interval = float(os.environ.get('COMPONENTS_WATCH_INTERVAL', '0') or 0)
+if _watch_interval > 0:
+    start_components_watcher(_watch_interval)
 
 # 导入路由
 from routes import *
 
+# 启动预热：后台预加载数据集并请求每个数据接口一次，完成后 /api/ready 返回 200
+from warmup import start_warmup
+start_warmup(app)
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ASGI 服务入口：事件循环只负责收发请求，Flask 处理函数在有界线程池中执行
+
+请求按路径分到两个线程池：
+1. fast：健康检查、组件列表等只读内存快照的轻量接口
+2. data：需要查找文件、解析CSV、归一化和外推计算的数据接口
+两个线程池互不占用，慢的外推计算排队时，轻量接口仍然立即响应
+
+开销大的数据接口先在事件循环中通过准入控制（admission.py）再提交到线程池：
+排队的请求不占用线程，超出等待队列的请求直接返回 429/503；
+所有 data 接口请求还要经过以 data 线程数为并发上限的全局限流器，提交到线程池时一定有空闲线程
+
+带 Content-Length 的响应在工作线程中整体取出后一次发送；流式响应（生成器响应体，包括其压缩输出）
+在工作线程中逐块迭代，每块生成后立即发送，不在内存中拼接整个响应体
+
+启动方式：
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+    python asgi.py
+
+环境变量：
+    ASGI_FAST_WORKERS：fast 线程池大小（默认 4）
+    ASGI_DATA_WORKERS：data 线程池大小（默认 8）
+"""
+
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple, Union
+
+from app import app
+from admission import ADMITTED_ENVIRON_KEY, FAST_PATHS, controller as admission_controller, rejection
+
+
+FAST_WORKERS = int(os.environ.get('ASGI_FAST_WORKERS', '4'))
+DATA_WORKERS = int(os.environ.get('ASGI_DATA_WORKERS', '8'))
+
+
+def route_pool(path: str) -> str:
+    """根据请求路径选择线程池：'fast' 或 'data'"""
+    return 'fast' if path.rstrip('/') in FAST_PATHS else 'data'
+
+
+def build_environ(scope: Dict, body: bytes) -> Dict:
+    """将 ASGI HTTP scope 转换为 WSGI environ（PEP 3333）"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': str(client[0]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            environ['CONTENT_LENGTH'] = value
+            continue
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    environ.setdefault('CONTENT_LENGTH', str(len(body)))
+    return environ
+
+
+def call_wsgi(environ: Dict) -> Tuple[int, List[Tuple[bytes, bytes]], Union[bytes, Iterable[bytes]]]:
+    """
+    在工作线程中调用 Flask 应用，返回 (状态码, 响应头, 响应体)
+
+    带 Content-Length 的响应体已在内存中，直接拼接为 bytes；
+    否则为流式响应，原样返回 WSGI 可迭代对象，由 stream_wsgi 逐块读取并关闭
+    """
+    captured = {}
+
+    def start_response(status, headers, exc_info=None):
+        captured['status'] = int(status.split(' ', 1)[0])
+        captured['headers'] = [
+            (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+        ]
+
+    result = app.wsgi_app(environ, start_response)
+    if not any(name == b'content-length' for name, _ in captured['headers']):
+        return captured['status'], captured['headers'], result
+    try:
+        body = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return captured['status'], captured['headers'], body
+
+
+def stream_wsgi(result: Iterable[bytes], loop: asyncio.AbstractEventLoop, send):
+    """
+    在工作线程中迭代流式响应体，每块交给事件循环发送（等待发送完成，客户端慢时形成背压）
+
+    迭代和 close 在同一线程中完成，生成器内使用的上下文不会跨线程
+    """
+    try:
+        for chunk in result:
+            if chunk:
+                asyncio.run_coroutine_threadsafe(
+                    send({'type': 'http.response.body', 'body': chunk, 'more_body': True}), loop
+                ).result()
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+
+
+class ThreadPoolASGI:
+    """将 WSGI 应用包装为 ASGI 应用，按路径分派到不同的有界线程池"""
+
+    def __init__(self, fast_workers: int = FAST_WORKERS, data_workers: int = DATA_WORKERS):
+        """
+        Args:
+            fast_workers: 轻量接口线程数
+            data_workers: 数据接口线程数
+        """
+        self.pools = {
+            'fast': ThreadPoolExecutor(max_workers=fast_workers, thread_name_prefix='asgi-fast'),
+            'data': ThreadPoolExecutor(max_workers=data_workers, thread_name_prefix='asgi-data'),
+        }
+        if admission_controller is not None:
+            admission_controller.bind_pool(data_workers)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        # 读取完整请求体（接口的请求体都是小 JSON）
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+
+        environ = build_environ(scope, b''.join(chunks))
+        pool = self.pools[route_pool(scope['path'])]
+        
+        if admission_controller is None:
+            await self.respond(pool, environ, send)
+            return
+
+        # 先过路由限流器，data 接口再过线程池的全局限流器：准入后一定有空闲线程
+        stages = [admission_controller.limiter_for(scope['path'])]
+        if pool is self.pools['data']:
+            stages.append(admission_controller.pool_limiter)
+        stages = [stage for stage in stages if stage is not None]
+
+        admitted = []
+        start = time.perf_counter()
+        begin = None
+        try:
+            for stage in stages:
+                # 两级排队共用一个排队超时
+                remaining = stage.queue_timeout_s - (time.perf_counter() - start)
+                reason = await stage.acquire_async(max(remaining, 0.0))
+                if reason is not None:
+                    await self.reject(stage, reason, send)
+                    return
+                admitted.append(stage)
+
+            environ[ADMITTED_ENVIRON_KEY] = True
+            begin = time.perf_counter()
+            await self.respond(pool, environ, send)
+        finally:
+            # 流式响应在响应体发送完毕后才释放槽位（生成响应体的工作仍在进行）
+            service_s = None if begin is None else time.perf_counter() - begin
+            for stage in reversed(admitted):
+                stage.release(service_s)
+
+    async def reject(self, limiter, reason: str, send):
+        """发送准入控制的拒绝响应（429/503）"""
+        status, payload, extra_headers = rejection(limiter, reason)
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+        headers += [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in extra_headers.items()]
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def respond(self, pool: ThreadPoolExecutor, environ: Dict, send):
+        """在线程池中调用 Flask 应用并发送响应（流式响应边生成边发送）"""
+        loop = asyncio.get_running_loop()
+        status, headers, body = await loop.run_in_executor(pool, call_wsgi, environ)
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        if isinstance(body, bytes):
+            await send({'type': 'http.response.body', 'body': body})
+            return
+        await loop.run_in_executor(pool, stream_wsgi, body, loop, send)
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def lifespan(self, receive, send):
+        """处理 ASGI lifespan：关闭时释放线程池"""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for pool in self.pools.values():
+                    pool.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+application = ThreadPoolASGI()
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        print("未安装 uvicorn，请先执行: pip install uvicorn")
+        sys.exit(1)
+    uvicorn.run(application, host='0.0.0.0', port=int(os.environ.get('PORT', '5000')))
@@ -8,9 +8,17 @@
 import pandas as pd
 import pathlib
 import argparse
+import json
+import sys
 from datetime import datetime
 from typing import Optional
-from normalize_metrics import NormalizedMetrics
+from normalize_metrics import NormalizedMetrics, compact_dtypes, memory_report, print_memory_report
+from warehouse import build_warehouse
+from snapshot import write_snapshot
+from regression import (DEFAULT_ALPHA, DEFAULT_TOLERANCE_PCT, load_baseline, print_regression_report,
+                        regression_report, write_baseline)
+from tracing import configure as configure_tracing, end_root, span, start_root
+from datasets import resolve_mq_timeseries_for
 
 
 def find_latest_csv(directory: pathlib.Path, pattern: str) -> Optional[pathlib.Path]:
@@ -25,6 +33,7 @@ def batch_process(
     data_dir: str = "datas",
     cpu_cores: int = 4,
     memory_gb: float = 4.0,
+    steady_state: bool = False,
 ):
     """
     批量处理测试结果并生成归一化指标（不保存文件，直接打印结果）
@@ -33,6 +42,7 @@ def batch_process(
         data_dir: 测试结果数据目录
         cpu_cores: 测试环境CPU核心数
         memory_gb: 测试环境内存大小GB
+        steady_state: 是否只使用时间序列稳态窗口内的数据计算MQ指标
     
     Returns:
         合并后的归一化指标DataFrame，如果无数据则返回None
@@ -58,7 +68,8 @@ def batch_process(
     if db_csv and db_csv.exists():
         print(f"处理数据库测试结果: {db_csv}")
         try:
-            db_df = pd.read_csv(db_csv)
+            with span('pandas.read_csv', path=str(db_csv)):
+                db_df = pd.read_csv(db_csv)
             # 从文件名猜测组件名（若包含前缀），否则使用 KingbaseES
             comp_name = "KingbaseES"
             name = db_csv.name
@@ -93,13 +104,29 @@ def batch_process(
     if mq_csv and mq_csv.exists():
         print(f"处理消息队列测试结果: {mq_csv}")
         try:
-            mq_df = pd.read_csv(mq_csv)
+            with span('pandas.read_csv', path=str(mq_csv)):
+                mq_df = pd.read_csv(mq_csv)
             # 从 perftest_summary 推断组件名：{Component}_perftest_summary_*.csv
             comp_name = "RabbitMQ"
             name = mq_csv.name
             if name.endswith('.csv') and "_perftest_summary_" in name:
                 comp_name = name.split("_perftest_summary_")[0]
-            mq_normalized = normalizer.normalize_mq_metrics(mq_df, comp_name)
+            # 同组件的时间序列用于回归单位消息内存占用（及稳态窗口检测）
+            memory_model = None
+            ts_csv = resolve_mq_timeseries_for(data_path, mq_csv)
+            if ts_csv is not None:
+                with span('pandas.read_csv', path=str(ts_csv)):
+                    ts_df = pd.read_csv(ts_csv)
+                if steady_state:
+                    ts_df = normalizer.detect_steady_state(ts_df)
+                    mq_df = normalizer.apply_steady_state(mq_df, ts_df)
+                    trimmed = int((~ts_df['steady']).sum())
+                    print(f"  ✓ 稳态窗口: 裁剪预热/收尾 {trimmed} 个点（共 {len(ts_df)} 个）")
+                    ts_df = ts_df[ts_df['steady']]
+                memory_model = normalizer.estimate_message_memory(ts_df, mq_df)
+            elif steady_state:
+                print("  ⚠ 未找到时间序列文件，无法检测稳态窗口，使用汇总数据")
+            mq_normalized = normalizer.normalize_mq_metrics(mq_df, comp_name, memory_model)
             
             if len(mq_normalized) > 0:
                 all_normalized.append(mq_normalized)
@@ -113,6 +140,10 @@ def batch_process(
                     print(f"  ✓ CPU使用率: 平均 {best['avg_cpu_percent']:.2f}%, 最大 {best.get('max_cpu_percent', 'N/A')}")
                 if pd.notna(best.get('avg_memory_percent')):
                     print(f"  ✓ 内存使用率: 平均 {best['avg_memory_percent']:.2f}%, 最大 {best.get('max_memory_percent', 'N/A')}")
+                for size_bytes, fit in (memory_model or {}).items():
+                    label = f"{size_bytes}B 消息" if size_bytes is not None else "全部消息"
+                    print(f"  ✓ 单位消息内存（{label}，时间序列回归）: {fit['memory_per_msg_bytes']:.0f} 字节/(msg/s), "
+                          f"基线 {fit['memory_baseline_gb']:.3f} GB, R²={fit['r2']:.3f}, 点数={fit['points']}")
             else:
                 print(f"  ⚠ 未找到有效数据")
         except Exception as e:
@@ -182,6 +213,14 @@ def batch_process(
                 print(f"\n消息丢失率:")
                 print(f"  平均: {comp_data['loss_ratio'].mean():.4f}")
                 
+                if 'sustainable' in comp_data.columns:
+                    print(f"\n饱和点（最大可持续吞吐）:")
+                    for _, knee in normalizer.saturation_summary(comp_data).iterrows():
+                        knee_rate = knee['knee_target_rate_msg_s']
+                        print(f"  生产者={knee['producers']:.0f}, 消费者={knee['consumers']:.0f}, 消息大小={knee['size_bytes']:.0f}B: "
+                              f"{knee['max_sustainable_msg_s']:.0f} 消息/秒"
+                              f"（拐点目标速率: {'未出现' if pd.isna(knee_rate) else int(knee_rate)}）")
+                
                 # 显示实际资源使用率（如果有）
                 if 'avg_cpu_percent' in comp_data.columns and comp_data['avg_cpu_percent'].notna().any():
                     print(f"\n资源使用率（实际监控）:")
@@ -204,6 +243,7 @@ def batch_process(
 def capacity_extrapolation_example(
     normalized_df: pd.DataFrame,
     target_slo: dict,
+    bootstrap_samples: int = 0,
 ):
     """
     容量外推示例：基于SLO反推所需资源（不保存文件，直接打印结果）
@@ -211,6 +251,7 @@ def capacity_extrapolation_example(
     Args:
         normalized_df: 归一化指标DataFrame
         target_slo: 目标SLO约束
+        bootstrap_samples: bootstrap 重采样次数（0 表示不计算置信区间）
     """
     print("\n=== 容量外推计算 ===")
     
@@ -221,8 +262,18 @@ def capacity_extrapolation_example(
     if len(recommendations) > 0:
         print("\n资源配置建议：")
         print("=" * 80)
-        print(recommendations.to_string(index=False))
+        print(recommendations.drop(columns=['warning'], errors='ignore').to_string(index=False))
         print("=" * 80)
+        for warning in recommendations.get('warning', pd.Series(dtype=object)).dropna():
+            print(f"⚠ {warning}")
+        
+        if bootstrap_samples > 0:
+            intervals = normalizer.bootstrap_capacity(normalized_df, target_slo, n_boot=bootstrap_samples)
+            if intervals is not None:
+                print(f"\n置信区间（bootstrap {intervals['samples']} 次，基准测试点 {intervals['runs']} 个）：")
+                for key, label in (('required_cpu_cores', 'CPU核心'), ('required_memory_gb', '内存GB')):
+                    values = intervals[key]
+                    print(f"  {label}: " + ", ".join(f"{p}={v}" for p, v in values.items()))
     else:
         print("⚠ 未找到满足SLO要求的基准数据")
 
@@ -270,15 +321,136 @@ def main():
         default=50,
         help='最大延迟ms（用于容量外推，默认：50）'
     )
+    parser.add_argument(
+        '--bootstrap',
+        type=int,
+        default=0,
+        metavar='N',
+        help='容量外推时用 N 次 bootstrap 重采样计算置信区间（默认：0，不计算）'
+    )
+    parser.add_argument(
+        '--steady-state',
+        action='store_true',
+        help='MQ指标只使用时间序列稳态窗口内的数据（裁剪预热和收尾阶段）'
+    )
+    parser.add_argument(
+        '--memory-report',
+        action='store_true',
+        help='打印归一化数据的内存占用（按列、按数据集）'
+    )
+    parser.add_argument(
+        '--warehouse',
+        type=str,
+        help='同时构建SQLite数据仓库的文件路径（如 datas/warehouse.sqlite）'
+    )
+    parser.add_argument(
+        '--snapshot',
+        type=str,
+        help='同时生成服务启动用的预热快照文件路径（如 datas/snapshot.npz）'
+    )
+    parser.add_argument(
+        '--trace',
+        type=str,
+        metavar='EXPORT',
+        help='记录各阶段耗时的追踪Span（stdout 或文件路径，OTLP/JSON 行格式）'
+    )
+    parser.add_argument(
+        '--baseline',
+        type=str,
+        help='性能基线文件路径（如 datas/baseline.json），与基线比较检测性能回归'
+    )
+    parser.add_argument(
+        '--update-baseline',
+        action='store_true',
+        help='以本次测试结果覆盖基线文件（不做比较）'
+    )
+    parser.add_argument(
+        '--regression-report',
+        type=str,
+        help='回归检测报告输出路径（JSON）；检测到回归时进程退出码为 1'
+    )
+    parser.add_argument(
+        '--regression-tolerance',
+        type=float,
+        default=DEFAULT_TOLERANCE_PCT,
+        help=f'允许的指标变差幅度百分比（默认：{DEFAULT_TOLERANCE_PCT}）'
+    )
+    parser.add_argument(
+        '--regression-alpha',
+        type=float,
+        default=DEFAULT_ALPHA,
+        help=f'Mann–Whitney 检验的显著性水平（默认：{DEFAULT_ALPHA}）'
+    )
     
     args = parser.parse_args()
     
+    if args.trace:
+        configure_tracing(sample_rate=1.0, export=args.trace)
+    root, token = start_root('collect_and_normalize', attributes={'data_dir': args.data_dir})
+    try:
+        exit_code = run(args)
+    except BaseException as e:
+        end_root(root, token, e)
+        raise
+    end_root(root, token)
+    if exit_code:
+        sys.exit(exit_code)
+
+
+def run(args) -> int:
+    """
+    按命令行参数执行批量处理、导出、回归检测和容量外推
+    
+    Returns:
+        进程退出码（检测到性能回归时为 1）
+    """
     # 批量处理（不保存文件，直接返回归一化结果）
-    normalized_df = batch_process(
-        data_dir=args.data_dir,
-        cpu_cores=args.cpu_cores,
-        memory_gb=args.memory_gb,
-    )
+    with span('batch_process', steady_state=args.steady_state):
+        normalized_df = batch_process(
+            data_dir=args.data_dir,
+            cpu_cores=args.cpu_cores,
+            memory_gb=args.memory_gb,
+            steady_state=args.steady_state,
+        )
+    
+    if args.memory_report and normalized_df is not None:
+        frames = {
+            f"normalized_{comp_type}": compact_dtypes(
+                normalized_df[normalized_df['component_type'] == comp_type].dropna(axis=1, how='all')
+            )
+            for comp_type in normalized_df['component_type'].unique()
+        }
+        print_memory_report(memory_report(frames))
+    
+    if args.warehouse:
+        with span('warehouse.build', output=args.warehouse):
+            counts = build_warehouse(args.warehouse, args.data_dir, args.cpu_cores, args.memory_gb)
+        print(f"\n数据仓库已生成: {args.warehouse}")
+        for table, count in counts.items():
+            print(f"  {table}: {count} 行")
+    
+    if args.snapshot:
+        with span('snapshot.write', output=args.snapshot):
+            write_snapshot(args.snapshot, args.data_dir)
+        print(f"\n预热快照已生成: {args.snapshot}")
+    
+    exit_code = 0
+    if args.baseline and normalized_df is not None:
+        if args.update_baseline:
+            baseline = write_baseline(args.baseline, normalized_df, {'data_dir': args.data_dir})
+            configs = sum(len(c) for c in baseline['components'].values())
+            print(f"\n性能基线已更新: {args.baseline}（{len(baseline['components'])} 个组件，{configs} 个配置）")
+        else:
+            with span('regression.compare', baseline=args.baseline):
+                report = regression_report(normalized_df, load_baseline(args.baseline), args.baseline,
+                                           args.regression_tolerance, args.regression_alpha)
+            print_regression_report(report)
+            if args.regression_report:
+                with open(args.regression_report, 'w', encoding='utf-8') as f:
+                    json.dump(report, f, ensure_ascii=False, indent=2)
+                print(f"回归检测报告已写入: {args.regression_report}")
+            if report['status'] == 'fail':
+                exit_code = 1
     
     # 容量外推示例（使用内存中的归一化数据）
     if args.extrapolate and normalized_df is not None:
@@ -288,7 +460,7 @@ def main():
                 'target_tps': args.target_tps,
                 'max_latency_ms': args.max_latency_ms,
             }
-            capacity_extrapolation_example(normalized_df, target_slo)
+            capacity_extrapolation_example(normalized_df, target_slo, args.bootstrap)
         
         if args.target_msg_per_sec:
             target_slo = {
@@ -296,9 +468,11 @@ def main():
                 'target_msg_per_sec': args.target_msg_per_sec,
                 'max_p95_ms': args.max_latency_ms,
             }
-            capacity_extrapolation_example(normalized_df, target_slo)
+            capacity_extrapolation_example(normalized_df, target_slo, args.bootstrap)
     elif args.extrapolate:
         print("\n⚠ 无法执行容量外推：未找到归一化数据")
+    
+    return exit_code
 
 
 if __name__ == "__main__":
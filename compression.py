@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+响应压缩：按 Accept-Encoding 协商 br / zstd / gzip
+
+1. gzip 使用标准库 zlib；brotli、zstd 为可选依赖（pip install brotli zstandard），未安装时不参与协商
+2. 小于 COMPRESS_MIN_BYTES 的响应不压缩（压缩收益抵不过CPU和首字节延迟）
+3. 已在内存中的响应体（jsonify 等）一次性压缩并设置 Content-Length；
+   流式响应（生成器响应体，如 /api/results/*、/api/timeseries）逐块压缩，边生成边压缩边发送（ASGI 入口逐块发送，见 asgi.py）
+4. 组件目录等静态响应的压缩结果按 (路径, 编码, 内容摘要) 缓存，重复请求直接返回压缩后的字节
+
+环境变量：
+    RESPONSE_COMPRESSION：设为 0 禁用压缩（默认启用）
+    COMPRESS_MIN_BYTES：压缩阈值（默认 1024）
+"""
+
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from flask import Flask, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+COMPRESSIBLE_MIMETYPES = frozenset({'application/json', 'text/plain', 'text/html', 'text/csv'})
+
+# 内容不随请求参数变化的接口：压缩结果缓存
+STATIC_ENDPOINTS = frozenset({
+    'get_components',
+    'get_databases',
+    'get_message_queues',
+    'get_operating_systems',
+})
+PRECOMPRESSED_CACHE_SIZE = 64
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """当前环境可用的编码（按服务端偏好排序）"""
+    encodings = []
+    if brotli is not None:
+        encodings.append('br')
+    if zstandard is not None:
+        encodings.append('zstd')
+    encodings.append('gzip')
+    return tuple(encodings)
+
+
+ENCODINGS = available_encodings()
+
+
+def negotiate(accept_encoding: Optional[str], encodings: Tuple[str, ...] = ENCODINGS) -> Optional[str]:
+    """
+    根据 Accept-Encoding 选择编码：q 值最高者优先，q 值相同时按服务端偏好
+
+    Returns:
+        编码名称；客户端不接受任何可用编码时为 None
+    """
+    if not accept_encoding:
+        return None
+
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(','):
+        fields = part.strip().split(';')
+        coding = fields[0].strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in fields[1:]:
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+
+    best, best_q = None, 0.0
+    for coding in encodings:
+        q = weights.get(coding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compressor(encoding: str) -> Tuple[Callable[[bytes], bytes], Callable[[], bytes], Callable[[], bytes]]:
+    """创建流式压缩器，返回 (压缩一块, 输出已压缩的全部数据但不结束流, 结束并输出剩余数据)"""
+    if encoding == 'br':
+        obj = brotli.Compressor(quality=BROTLI_QUALITY)
+        return obj.process, obj.flush, obj.finish
+    if encoding == 'zstd':
+        obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        return obj.compress, lambda: obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK), obj.flush
+    # wbits=31：带 gzip 头和尾
+    obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return obj.compress, lambda: obj.flush(zlib.Z_SYNC_FLUSH), obj.flush
+
+
+def compress_bytes(data: bytes, encoding: str) -> bytes:
+    """一次性压缩整个响应体"""
+    compress, _, finish = compressor(encoding)
+    return compress(data) + finish()
+
+
+def compress_chunks(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """
+    逐块压缩可迭代的响应体：每块压缩后立即刷出，客户端不必等压缩器攒满缓冲区
+    （每次刷出有少量额外字节，换取流式响应的及时送达）
+    """
+    compress, flush, finish = compressor(encoding)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        if not chunk:
+            continue
+        out = compress(chunk) + flush()
+        if out:
+            yield out
+    tail = finish()
+    if tail:
+        yield tail
+
+
+_precompressed: "OrderedDict[tuple, bytes]" = OrderedDict()
+_precompressed_lock = threading.Lock()
+
+
+def precompressed(path: str, encoding: str, data: bytes) -> bytes:
+    """静态响应的压缩结果（按内容摘要缓存，内容变化后自然不再命中）"""
+    key = (path, encoding, hashlib.sha1(data).digest())
+    with _precompressed_lock:
+        if key in _precompressed:
+            _precompressed.move_to_end(key)
+            return _precompressed[key]
+
+    compressed = compress_bytes(data, encoding)
+
+    with _precompressed_lock:
+        _precompressed[key] = compressed
+        while len(_precompressed) > PRECOMPRESSED_CACHE_SIZE:
+            _precompressed.popitem(last=False)
+    return compressed
+
+
+def compress_response(response):
+    """after_request 钩子：按协商结果压缩响应"""
+    if (response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'Content-Encoding' in response.headers
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or request.method == 'HEAD'
+            or response.direct_passthrough):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_chunks(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_BYTES:
+            return response
+        if request.endpoint in STATIC_ENDPOINTS:
+            response.set_data(precompressed(request.path, encoding, data))
+        else:
+            response.set_data(compress_bytes(data, encoding))
+
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def install_compression(app: Flask):
+    """为应用注册响应压缩钩子（RESPONSE_COMPRESSION=0 时不注册）"""
+    if os.environ.get('RESPONSE_COMPRESSION', '1') == '0':
+        return
+    app.after_request(compress_response)
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试数据文件定位与缓存
+统一 datas 目录下各类测试结果文件的查找规则，供路由、批处理和数据仓库共用；
+按文件签名缓存已解析的数据，文件变化后自动失效
+"""
+
+import hashlib
+import pathlib
+import threading
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from normalize_metrics import NormalizedMetrics, compact_dtypes
+from tracing import annotate, span
+
+
+# 数据库测试结果：优先 results.csv，其次 {Component}_kbbench_results_*.csv，最后包含 kbbench 的文件
+DB_PATTERNS = ("*_kbbench_results_*.csv", "*kbbench*.csv")
+MQ_SUMMARY_PATTERN = "*perftest_summary_*.csv"
+MQ_TIMESERIES_PATTERN = "*perftest_timeseries_*.csv"
+
+
+def find_latest_csv(directory: pathlib.Path, pattern: str) -> Optional[pathlib.Path]:
+    """查找最新的匹配CSV文件"""
+    with span('datasets.find_latest_csv', pattern=pattern):
+        files = list(directory.glob(pattern))
+        if not files:
+            return None
+        return max(files, key=lambda p: p.stat().st_mtime)
+
+
+def resolve_db_csv(data_dir: pathlib.Path) -> Optional[pathlib.Path]:
+    """查找数据库测试结果文件"""
+    db_csv = data_dir / "results.csv"
+    if db_csv.exists():
+        return db_csv
+    for pattern in DB_PATTERNS:
+        db_csv = find_latest_csv(data_dir, pattern)
+        if db_csv is not None:
+            return db_csv
+    return None
+
+
+def resolve_mq_summary_csv(data_dir: pathlib.Path) -> Optional[pathlib.Path]:
+    """查找消息队列测试汇总文件"""
+    return find_latest_csv(data_dir, MQ_SUMMARY_PATTERN)
+
+
+def resolve_mq_timeseries_csv(data_dir: pathlib.Path) -> Optional[pathlib.Path]:
+    """查找消息队列时间序列文件"""
+    return find_latest_csv(data_dir, MQ_TIMESERIES_PATTERN)
+
+
+def resolve_mq_timeseries_for(data_dir: pathlib.Path, summary_path: Optional[pathlib.Path]) -> Optional[pathlib.Path]:
+    """查找与汇总文件属于同一组件的最新时间序列文件（用于回归单位消息内存占用）"""
+    timeseries_path = resolve_mq_timeseries_csv(data_dir)
+    if summary_path is None or timeseries_path is None:
+        return None
+    if component_from_filename(timeseries_path, '') != component_from_filename(summary_path, ''):
+        return None
+    return timeseries_path
+
+
+def list_csv_files(data_dir: pathlib.Path, kind: str) -> List[pathlib.Path]:
+    """
+    列出某类测试结果的全部历史文件（按修改时间升序）
+
+    Args:
+        data_dir: 数据目录
+        kind: 'db'、'mq_summary' 或 'mq_timeseries'
+    """
+    if kind == 'db':
+        files = set(data_dir.glob("results.csv"))
+        for pattern in DB_PATTERNS:
+            files.update(data_dir.glob(pattern))
+    elif kind == 'mq_summary':
+        files = set(data_dir.glob(MQ_SUMMARY_PATTERN))
+    elif kind == 'mq_timeseries':
+        files = set(data_dir.glob(MQ_TIMESERIES_PATTERN))
+    else:
+        raise ValueError(f"未知的数据类型: {kind}")
+    return sorted(files, key=lambda p: p.stat().st_mtime)
+
+
+def component_from_filename(path: pathlib.Path, default: str) -> str:
+    """
+    从文件名推断组件名
+
+    约定：{Component}_kbbench_results_*.csv、{Component}_perftest_summary_*.csv、
+    {Component}_perftest_timeseries_*.csv；无法推断时返回 default
+    """
+    name = path.name
+    for marker in ("_kbbench_results_", "_perftest_summary_", "_perftest_timeseries_"):
+        if marker in name:
+            return name.split(marker)[0]
+    return default
+
+
+# 已解析的CSV缓存：路径 -> (文件签名, DataFrame)；文件变化后签名不同，自动重新解析
+_frame_cache: Dict[str, Tuple[tuple, pd.DataFrame]] = {}
+_frame_cache_lock = threading.Lock()
+
+
+def file_signature(path: pathlib.Path) -> tuple:
+    """文件签名（路径、修改时间、大小），用于判断缓存是否失效"""
+    stat = path.stat()
+    return (str(path), stat.st_mtime_ns, stat.st_size)
+
+
+def dataset_version(*paths: Optional[pathlib.Path]) -> str:
+    """由一组数据文件的签名生成数据集版本号"""
+    digest = hashlib.sha1()
+    for path in paths:
+        if path is not None and path.exists():
+            digest.update(repr(file_signature(path)).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def load_csv_cached(path: pathlib.Path) -> pd.DataFrame:
+    """
+    读取CSV并缓存（压缩列类型），文件未变化时直接返回缓存
+
+    返回的DataFrame被多个请求共享，调用方不得原地修改
+    """
+    signature = file_signature(path)
+    cached = _frame_cache.get(str(path))
+    if cached is not None and cached[0] == signature:
+        annotate('cache.csv', 'hit', overwrite=False)
+        return cached[1]
+
+    with _frame_cache_lock:
+        cached = _frame_cache.get(str(path))
+        if cached is not None and cached[0] == signature:
+            annotate('cache.csv', 'hit', overwrite=False)
+            return cached[1]
+        annotate('cache.csv', 'miss')
+        with span('pandas.read_csv', path=str(path)) as read_span:
+            df = compact_dtypes(pd.read_csv(path))
+            if read_span is not None:
+                read_span.set_attribute('rows', len(df))
+        _frame_cache[str(path)] = (signature, df)
+        return df
+
+
+def signature_tag(signature: tuple) -> str:
+    """文件签名的短标识（区分同一文件的不同版本）"""
+    return hashlib.sha1(repr(signature).encode('utf-8')).hexdigest()[:8]
+
+
+# 缓存持有的 DataFrame / numpy 数组登记表（仅用于内存占用统计）：弱引用，缓存淘汰后条目自动消失
+_resident: "weakref.WeakValueDictionary[str, object]" = weakref.WeakValueDictionary()
+
+
+def register_resident(name: str, value):
+    """登记 lru_cache 等无法遍历的缓存中持有的 DataFrame 或 numpy 数组"""
+    _resident[name] = value
+
+
+def _array_bytes(value) -> int:
+    """派生结果中 numpy 数组占用的字节数（递归统计字典、列表和元组）"""
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(_array_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_array_bytes(v) for v in value)
+    return 0
+
+
+def resident_data() -> Tuple[Dict[str, pd.DataFrame], Dict[str, int]]:
+    """
+    当前进程各缓存实际持有的数据：CSV 缓存、归一化缓存、预热快照中尚未取用的归一化结果、
+    派生结果缓存和时间序列数组
+
+    Returns:
+        (名称 -> DataFrame, 名称 -> numpy 数组字节数)
+    """
+    frames = {f"csv/{pathlib.Path(path).name}@{signature_tag(signature)}": df
+              for path, (signature, df) in list(_frame_cache.items())}
+    arrays = {}
+    for name, value in list(_resident.items()):
+        if isinstance(value, pd.DataFrame):
+            frames[name] = value
+        else:
+            arrays[name] = _array_bytes(value)
+    with _normalized_seed_lock:
+        for key, df in _normalized_seed.items():
+            frames[f"seed/{key[2]}/{key[3]}/{pathlib.Path(key[0]).name}@{signature_tag(key[1])}"] = df
+    with _derived_cache_lock:
+        derived = list(_derived_cache.items())
+    for key, value in derived:
+        name = 'derived/' + '/'.join(str(part) for part in key)
+        if isinstance(value, pd.DataFrame):
+            frames[name] = value
+        elif _array_bytes(value):
+            arrays[name] = _array_bytes(value)
+    return frames, arrays
+
+
+def seed_frame(path: pathlib.Path, df: pd.DataFrame):
+    """用预热快照中已解析的数据预填充CSV缓存（签名取文件当前状态，调用方需先校验内容哈希）"""
+    with _frame_cache_lock:
+        _frame_cache[str(path)] = (file_signature(path), df)
+
+
+# 归一化缓存使用的测试环境：单位核心/单位内存列即为原始吞吐，查询时再按实际测试环境换算
+_HARDWARE_INDEPENDENT = NormalizedMetrics(cpu_cores=1, memory_gb=1.0)
+
+# 预热快照中的归一化结果：键与 _load_normalized_cached 的参数一致；
+# 被缓存取用后即移除（之后由 lru_cache 持有），源文件变化后的过期条目也随之清理
+_normalized_seed: Dict[tuple, pd.DataFrame] = {}
+_normalized_seed_lock = threading.Lock()
+
+
+def _seed_is_current(key: tuple) -> bool:
+    """预填充条目的源文件（及时间序列文件）签名是否仍与磁盘一致"""
+    path, signature, _, _, timeseries_path, timeseries_signature = key
+    try:
+        if file_signature(pathlib.Path(path)) != signature:
+            return False
+        return timeseries_path is None or file_signature(pathlib.Path(timeseries_path)) == timeseries_signature
+    except OSError:
+        return False
+
+
+def _take_seed(key: tuple) -> Optional[pd.DataFrame]:
+    """取出预填充的归一化结果（取出即移除），同时清理源文件已变化的条目"""
+    with _normalized_seed_lock:
+        seeded = _normalized_seed.pop(key, None)
+        for stale in [k for k in _normalized_seed if not _seed_is_current(k)]:
+            del _normalized_seed[stale]
+    return seeded
+
+
+@lru_cache(maxsize=32)
+def _load_normalized_cached(path: str, signature: tuple, component_type: str, component_name: str,
+                            timeseries_path: Optional[str] = None,
+                            timeseries_signature: Optional[tuple] = None) -> pd.DataFrame:
+    """
+    归一化结果按 (文件版本, 组件) 缓存，与测试环境参数无关
+    （MQ 结果包含饱和点检测列和实测内存模型）
+    """
+    resident_name = f"normalized/{component_type}/{component_name}/{pathlib.Path(path).name}@{signature_tag(signature)}"
+    seeded = _take_seed((path, signature, component_type, component_name, timeseries_path, timeseries_signature))
+    if seeded is not None:
+        annotate('cache.normalized', 'snapshot')
+        register_resident(resident_name, seeded)
+        return seeded
+    
+    annotate('cache.normalized', 'miss')
+    with span('datasets.load_normalized', component_type=component_type, component=component_name):
+        df = load_csv_cached(pathlib.Path(path))
+        normalizer = _HARDWARE_INDEPENDENT
+        if component_type == 'DB':
+            normalized_df = normalizer.normalize_db_metrics(df, component_name)
+        else:
+            memory_model = None
+            if timeseries_path is not None:
+                memory_model = normalizer.estimate_message_memory(load_csv_cached(pathlib.Path(timeseries_path)), df)
+            normalized_df = normalizer.normalize_mq_metrics(df, component_name, memory_model)
+    register_resident(resident_name, normalized_df)
+    return normalized_df
+
+
+def load_normalized(path: pathlib.Path, component_type: str, component_name: str,
+                    cpu_cores: float = 4, memory_gb: float = 4.0,
+                    timeseries_path: Optional[pathlib.Path] = None) -> pd.DataFrame:
+    """
+    读取测试结果并归一化（结果缓存，文件未变化时不重复计算）
+    
+    Args:
+        path: 测试结果CSV文件
+        component_type: 'DB' 或 'MQ'
+        component_name: 组件名称
+        cpu_cores: 测试环境CPU核心数
+        memory_gb: 测试环境内存GB
+        timeseries_path: MQ 时间序列CSV文件（可选，用于回归单位消息内存占用）
+    
+    不同测试环境参数共享同一份缓存的归一化结果，与硬件相关的列在返回前向量化换算
+    """
+    timeseries_signature = None
+    if timeseries_path is not None:
+        timeseries_signature = file_signature(timeseries_path)
+        timeseries_path = str(timeseries_path)
+    normalized_df = _load_normalized_cached(str(path), file_signature(path), component_type, component_name,
+                                            timeseries_path, timeseries_signature)
+    annotate('cache.normalized', 'hit', overwrite=False)
+    with span('normalize.rescale', cpu_cores=cpu_cores, memory_gb=memory_gb):
+        return NormalizedMetrics(cpu_cores=cpu_cores, memory_gb=memory_gb).rescale(normalized_df)
+
+
+def seed_normalized(path: pathlib.Path, component_type: str, component_name: str, df: pd.DataFrame,
+                    timeseries_path: Optional[pathlib.Path] = None):
+    """用预热快照中的归一化结果预填充归一化缓存（调用方需先校验源文件内容哈希）"""
+    timeseries_signature = None
+    if timeseries_path is not None:
+        timeseries_signature = file_signature(timeseries_path)
+        timeseries_path = str(timeseries_path)
+    with _normalized_seed_lock:
+        _normalized_seed[(str(path), file_signature(path), component_type, component_name,
+                          timeseries_path, timeseries_signature)] = df
+
+
+# 派生结果缓存（如 bootstrap 置信区间）：键应包含数据集版本，数据变化后旧键自然不再命中
+_derived_cache: "OrderedDict[Hashable, object]" = OrderedDict()
+_derived_cache_lock = threading.Lock()
+DERIVED_CACHE_SIZE = 256
+
+
+def cached_derived(key: Hashable, compute: Callable[[], object]):
+    """
+    按键缓存派生计算结果（LRU，最多 DERIVED_CACHE_SIZE 项）
+
+    Args:
+        key: 缓存键，应包含数据集版本
+        compute: 未命中时调用的计算函数
+    """
+    # 键的第一项为派生结果类型（如 'bootstrap'、'slo_lookup'），用于记录缓存命中情况
+    with _derived_cache_lock:
+        if key in _derived_cache:
+            _derived_cache.move_to_end(key)
+            annotate(f"cache.{key[0]}", 'hit', overwrite=False)
+            return _derived_cache[key]
+    annotate(f"cache.{key[0]}", 'miss')
+
+    value = compute()
+
+    with _derived_cache_lock:
+        _derived_cache[key] = value
+        _derived_cache.move_to_end(key)
+        while len(_derived_cache) > DERIVED_CACHE_SIZE:
+            _derived_cache.popitem(last=False)
+    return value
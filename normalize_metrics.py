@@ -15,6 +15,175 @@ import pathlib
 from typing import Dict, List, Optional, Tuple
 import sys
 from datetime import datetime
+from tracing import traced
+
+
+# SLO过滤和外推计算直接使用的列，保持float64以免边界比较产生误差
+PRECISE_COLUMNS = {
+    'tps', 'latency_ms', 'tps_per_core', 'tps_per_gb_memory',
+    'avg_received_msg_s', 'avg_sent_msg_s', 'worst_p95_ms',
+    'msg_per_sec_per_core', 'msg_per_sec_per_gb_memory',
+    'memory_baseline_gb', 'memory_per_msg_bytes',
+}
+
+# 饱和判定：实际接收速率低于offered速率的该比例时视为不再跟随目标速率
+SATURATION_TRACKING_RATIO = 0.95
+
+# 没有时间序列实测数据时，单位消息内存占用按 消息大小 × 该系数 估算（消息本身 + 开销）
+MESSAGE_MEMORY_OVERHEAD = 1.5
+
+# 内存回归至少需要的时间序列点数
+MIN_MEMORY_FIT_POINTS = 3
+
+# 稳态检测：偏离运行中位数超过 k 倍稳健标准差（1.4826 × MAD）的点视为不稳定
+STEADY_STATE_K = 3.0
+# 稳态检测使用的指标，及各自的最小容差（避免 MAD 为 0 时把 1ms 的抖动判为异常）
+STEADY_STATE_METRICS = {'received_msg_s': 0.0, 'p95_ms': 1.0}
+# 稳态窗口至少保留的点数，不足时使用整个运行
+STEADY_STATE_MIN_POINTS = 3
+
+# 同一组速率扫描的配置列（同一配置下只有目标速率不同）
+SWEEP_CONFIG_COLUMNS = ['component', 'producers', 'consumers', 'size_bytes']
+
+# 整数列降位宽时优先尝试的列（并发数、线程数、生产者数等）
+INTEGER_COLUMNS = {
+    'clients', 'jobs', 'producers', 'consumers', 'size_bytes',
+    'duration_s', 'target_rate_msg_s', 'tx_processed', 'return_code',
+}
+
+
+def _float32_safe(values: np.ndarray) -> bool:
+    """判断浮点列能否无损转为float32（按列实际的小数位数判断）"""
+    finite = values[np.isfinite(values)]
+    if len(finite) == 0:
+        return True
+    for decimals in range(7):
+        if np.allclose(finite, np.round(finite, decimals), rtol=0, atol=1e-9):
+            # float32 约有 7 位有效数字，整数部分加小数位不能超过 2^24
+            return float(np.abs(finite).max()) * (10 ** decimals) < 2 ** 24
+    return False
+
+
+def compact_dtypes(df: pd.DataFrame, precise_columns: Optional[set] = None) -> pd.DataFrame:
+    """
+    压缩DataFrame的列类型以减少常驻内存
+    
+    - 重复度高的字符串列（component、component_type、run_id 等）转为 category
+    - 整数列（clients、jobs、producers 等）降为最小位宽
+    - 精度允许的浮点列转为 float32；PRECISE_COLUMNS 中的列保持 float64
+    
+    Args:
+        df: 待压缩的DataFrame
+        precise_columns: 需要保持float64的列，默认 PRECISE_COLUMNS
+        
+    Returns:
+        压缩后的新DataFrame
+    """
+    if precise_columns is None:
+        precise_columns = PRECISE_COLUMNS
+    
+    compact = df.copy()
+    for col in compact.columns:
+        series = compact[col]
+        
+        if series.dtype == object:
+            non_null = series.dropna()
+            if len(non_null) == 0 or not all(isinstance(v, str) for v in non_null):
+                continue
+            if series.nunique(dropna=True) <= max(1, len(series) // 2):
+                compact[col] = series.astype('category')
+        
+        elif pd.api.types.is_bool_dtype(series):
+            continue
+        
+        elif pd.api.types.is_integer_dtype(series):
+            compact[col] = pd.to_numeric(series, downcast='integer')
+        
+        elif pd.api.types.is_float_dtype(series):
+            values = series.to_numpy(dtype=np.float64)
+            if col in INTEGER_COLUMNS and not np.isnan(values).any() and np.array_equal(values, np.round(values)):
+                compact[col] = pd.to_numeric(series.astype(np.int64), downcast='integer')
+            elif col not in precise_columns and _float32_safe(values):
+                compact[col] = series.astype(np.float32)
+    
+    return compact
+
+
+def memory_report(frames: Dict[str, pd.DataFrame]) -> Dict:
+    """
+    统计各数据集的内存占用（按列和按数据集）
+    
+    Args:
+        frames: 数据集名称 -> DataFrame
+        
+    Returns:
+        内存占用报告字典（字节）
+    """
+    datasets = {}
+    total = 0
+    for name, df in frames.items():
+        usage = df.memory_usage(index=True, deep=True)
+        dataset_bytes = int(usage.sum())
+        datasets[name] = {
+            'rows': int(len(df)),
+            'total_bytes': dataset_bytes,
+            'columns': {
+                str(col): {'dtype': str(df[col].dtype), 'bytes': int(usage[col])}
+                for col in df.columns
+            }
+        }
+        total += dataset_bytes
+    
+    return {'datasets': datasets, 'total_bytes': total}
+
+
+def print_memory_report(report: Dict, title: str = "内存占用"):
+    """打印内存占用报告"""
+    print(f"\n=== {title} ===")
+    for name, info in report['datasets'].items():
+        print(f"{name}: {info['rows']} 行, {info['total_bytes']} 字节")
+        for col, col_info in info['columns'].items():
+            print(f"  {col:<32} {col_info['dtype']:<10} {col_info['bytes']:>10}")
+    print(f"总计: {report['total_bytes']} 字节")
+
+
+def to_python_scalar(value):
+    """将numpy标量转换为Python内置类型（float32按最短十进制表示还原）"""
+    if isinstance(value, np.floating):
+        return float(str(value))
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    return value
+
+
+def as_float64(values) -> np.ndarray:
+    """将数值列转为float64数组（float32直接拓宽，尾数在输出时由 to_python_scalar 处理）"""
+    return np.asarray(values).astype(np.float64)
+
+
+def float32_decimals(values) -> Optional[int]:
+    """
+    float32列还原为十进制取值所需的小数位数（拓宽后按该位数四舍五入，转回float32仍是原值）
+
+    只在数据版本变化时对整列计算一次，查询时用 np.round 向量化还原；无法还原时返回 None
+    """
+    array = np.asarray(values)
+    finite = array[np.isfinite(array)]
+    widened = finite.astype(np.float64)
+    for decimals in range(7):
+        if np.array_equal(np.round(widened, decimals).astype(np.float32), finite):
+            return decimals
+    return None
+
+
+def sustainable_warning(load: float, max_sustainable: Optional[float]) -> Optional[str]:
+    """目标负载超过速率扫描拐点处的最大可持续吞吐时的提示（未超过或无拐点数据时为 None）"""
+    if max_sustainable is None or pd.isna(max_sustainable) or load <= max_sustainable:
+        return None
+    return (f"目标吞吐 {load:g} 消息/秒超过实测最大可持续吞吐 {max_sustainable:g} 消息/秒（速率扫描拐点），"
+            f"超出部分没有实测依据，外推结果可能偏乐观")
 
 
 class NormalizedMetrics:
@@ -32,6 +201,68 @@ class NormalizedMetrics:
         self.memory_gb = memory_gb
         self.memory_bytes = memory_gb * 1024 * 1024 * 1024
     
+    def rescale(self, normalized_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        按本实例的测试环境（cpu_cores、memory_gb）重算归一化结果中与硬件相关的列
+        
+        单位核心/单位内存吞吐、无监控数据时的估算CPU利用率、单位事务内存都只是原始吞吐
+        （tps、avg_received_msg_s）的线性换算，因此归一化只需做一次，不同测试环境参数的
+        请求共享同一份缓存数据，查询时向量化重算这几列即可（结果与直接归一化一致）
+        
+        Args:
+            normalized_df: 任意测试环境参数下的归一化结果（可同时包含 DB 和 MQ）
+        
+        Returns:
+            重算后的副本
+        
+        Raises:
+            ValueError: cpu_cores 或 memory_gb 不是正数
+        """
+        if not (self.cpu_cores > 0 and self.memory_gb > 0):
+            raise ValueError(f"测试环境CPU核心数和内存必须为正数: cpu_cores={self.cpu_cores}, memory_gb={self.memory_gb}")
+        if len(normalized_df) == 0:
+            return normalized_df
+        
+        columns = {}
+        component_type = normalized_df['component_type'].astype(str).to_numpy()
+        
+        def rescaled(column, values, mask):
+            current = as_float64(normalized_df[column].to_numpy(dtype=np.float64, na_value=np.nan)) \
+                if column in normalized_df.columns else np.full(len(normalized_df), np.nan)
+            return np.where(mask, np.round(values, 2), current)
+        
+        for kind, raw_column, per_core_column, per_gb_column, max_per_core in (
+            ('DB', 'tps', 'tps_per_core', 'tps_per_gb_memory', 500),
+            ('MQ', 'avg_received_msg_s', 'msg_per_sec_per_core', 'msg_per_sec_per_gb_memory', 10000),
+        ):
+            mask = component_type == kind
+            if not mask.any() or raw_column not in normalized_df.columns:
+                continue
+            raw = as_float64(normalized_df[raw_column].to_numpy(dtype=np.float64, na_value=np.nan))
+            with np.errstate(invalid='ignore'):
+                columns[per_core_column] = rescaled(per_core_column, raw / self.cpu_cores, mask)
+                columns[per_gb_column] = rescaled(per_gb_column, raw / self.memory_gb, mask)
+                
+                # 有实际监控数据的行保持原值，否则按经验单核最大吞吐估算
+                if 'cpu_utilization_pct' in normalized_df.columns:
+                    monitored = normalized_df['avg_cpu_percent'].notna().to_numpy() \
+                        if 'avg_cpu_percent' in normalized_df.columns else np.zeros(len(normalized_df), dtype=bool)
+                    estimated = np.minimum(100, raw / (self.cpu_cores * max_per_core) * 100)
+                    base = columns.get('cpu_utilization_pct')
+                    if base is None:
+                        base = as_float64(normalized_df['cpu_utilization_pct'].to_numpy(dtype=np.float64, na_value=np.nan))
+                    columns['cpu_utilization_pct'] = np.where(mask & ~monitored, np.round(estimated, 2), base)
+                
+                if kind == 'DB' and 'memory_per_tx_bytes' in normalized_df.columns:
+                    columns['memory_per_tx_bytes'] = rescaled(
+                        'memory_per_tx_bytes', self.memory_bytes * 0.3 / (raw * 60), mask
+                    )
+        
+        columns['test_cpu_cores'] = self.cpu_cores
+        columns['test_memory_gb'] = self.memory_gb
+        return normalized_df.assign(**columns)
+    
+    @traced('normalize.normalize_db_metrics')
     def normalize_db_metrics(self, df: pd.DataFrame, component_name: str = "KingbaseES") -> pd.DataFrame:
         """
         归一化数据库性能指标
@@ -135,15 +366,204 @@ class NormalizedMetrics:
                 'test_memory_gb': self.memory_gb,
             })
         
-        return pd.DataFrame(results)
+        return compact_dtypes(pd.DataFrame(results))
     
-    def normalize_mq_metrics(self, summary_df: pd.DataFrame, component_name: str = "RabbitMQ") -> pd.DataFrame:
+    @traced('normalize.estimate_message_memory')
+    def estimate_message_memory(self, timeseries_df: pd.DataFrame,
+                                summary_df: Optional[pd.DataFrame] = None) -> Dict:
+        """
+        由时间序列回归单位消息内存占用：memory_used_gb = 基线内存 + k × received_msg_s
+        
+        汇集全部运行的逐秒数据做最小二乘拟合；提供汇总表时按 run_id 关联消息大小，
+        每种消息大小单独拟合。各组的和/平方和用 bincount 一次算出，不逐组循环
+        
+        Args:
+            timeseries_df: 时间序列DataFrame（run_id、received_msg_s、memory_used_gb）
+            summary_df: 测试汇总DataFrame（run_id、size_bytes），可选
+        
+        Returns:
+            {消息大小（不区分时为 None）: {'memory_baseline_gb', 'memory_per_msg_bytes', 'r2', 'points'}}；
+            斜率非正或点数不足的组不返回
+        """
+        if timeseries_df is None or len(timeseries_df) == 0 or \
+                not {'received_msg_s', 'memory_used_gb'}.issubset(timeseries_df.columns):
+            return {}
+        
+        x = as_float64(timeseries_df['received_msg_s'].to_numpy())
+        y = as_float64(timeseries_df['memory_used_gb'].to_numpy())
+        
+        # 按 run_id 关联消息大小；无法关联时所有点归为一组
+        sizes = None
+        if summary_df is not None and 'run_id' in timeseries_df.columns and \
+                {'run_id', 'size_bytes'}.issubset(summary_df.columns):
+            size_by_run = summary_df.drop_duplicates('run_id').set_index('run_id')['size_bytes']
+            sizes = timeseries_df['run_id'].astype(str).map(
+                size_by_run.set_axis(size_by_run.index.astype(str))
+            ).to_numpy(dtype=np.float64, na_value=np.nan)
+        
+        valid = ~np.isnan(x) & ~np.isnan(y)
+        if sizes is not None:
+            valid &= ~np.isnan(sizes)
+            keys, group = np.unique(sizes[valid], return_inverse=True)
+            keys = [int(k) for k in keys]
+        else:
+            keys, group = [None], np.zeros(int(valid.sum()), dtype=np.int64)
+        x, y = x[valid], y[valid]
+        
+        n = np.bincount(group, minlength=len(keys)).astype(np.float64)
+        sx = np.bincount(group, weights=x, minlength=len(keys))
+        sy = np.bincount(group, weights=y, minlength=len(keys))
+        sxx = np.bincount(group, weights=x * x, minlength=len(keys))
+        sxy = np.bincount(group, weights=x * y, minlength=len(keys))
+        syy = np.bincount(group, weights=y * y, minlength=len(keys))
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cxx = sxx - sx * sx / n
+            cxy = sxy - sx * sy / n
+            cyy = syy - sy * sy / n
+            slope = cxy / cxx
+            intercept = (sy - slope * sx) / n
+            r2 = np.where(cyy > 0, cxy * cxy / (cxx * cyy), 0.0)
+        
+        model = {}
+        for i, key in enumerate(keys):
+            if n[i] < MIN_MEMORY_FIT_POINTS or not cxx[i] > 0 or not slope[i] > 0:
+                continue
+            model[key] = {
+                'memory_baseline_gb': round(float(intercept[i]), 4),
+                'memory_per_msg_bytes': round(float(slope[i]) * 1024 ** 3, 2),
+                'r2': round(float(r2[i]), 4),
+                'points': int(n[i]),
+            }
+        return model
+    
+    @traced('normalize.detect_steady_state')
+    def detect_steady_state(self, timeseries_df: pd.DataFrame, k: float = STEADY_STATE_K,
+                            min_points: int = STEADY_STATE_MIN_POINTS) -> pd.DataFrame:
+        """
+        检测每个运行的稳态窗口，去掉开头的预热和结尾的收尾阶段
+        
+        对每个指标计算运行内的中位数和 MAD，偏离超过 max(k × 1.4826 × MAD, 最小容差) 的点视为不稳定；
+        从首个稳定点到最后一个稳定点之间为稳态窗口（窗口内部的波动保留，只裁剪首尾）。
+        全部运行一起按分组向量化计算；窗口点数少于 min_points 时保留整个运行
+        
+        Args:
+            timeseries_df: 时间序列DataFrame（run_id、time_s 及 STEADY_STATE_METRICS 中的列）
+            k: 稳健标准差倍数
+            min_points: 稳态窗口最少点数
+        
+        Returns:
+            按 (run_id, time_s) 排序的副本，增加 steady 列（是否位于稳态窗口内）
+        """
+        if len(timeseries_df) == 0:
+            return timeseries_df.assign(steady=pd.Series(dtype=bool))
+        
+        df = timeseries_df.sort_values(['run_id', 'time_s'], kind='stable').reset_index(drop=True)
+        run = df['run_id'].astype(str)
+        
+        unstable = np.zeros(len(df), dtype=bool)
+        for metric, min_tolerance in STEADY_STATE_METRICS.items():
+            if metric not in df.columns:
+                continue
+            values = pd.Series(as_float64(df[metric].to_numpy()), index=df.index)
+            median = values.groupby(run).transform('median')
+            deviation = (values - median).abs()
+            mad = deviation.groupby(run).transform('median')
+            tolerance = np.maximum(k * 1.4826 * mad, min_tolerance)
+            unstable |= (deviation > tolerance).to_numpy()
+        
+        # 每个运行首个和最后一个稳定点的位置
+        position = pd.Series(np.arange(len(df)), index=df.index)
+        stable_position = position.where(~unstable)
+        first = stable_position.groupby(run).transform('min')
+        last = stable_position.groupby(run).transform('max')
+        steady = (position >= first) & (position <= last)
+        
+        # 稳态窗口过短（或没有稳定点）时保留整个运行
+        window_points = steady.groupby(run).transform('sum')
+        steady |= window_points < min_points
+        
+        df['steady'] = steady.to_numpy()
+        return df
+    
+    def steady_state_summary(self, timeseries_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        按稳态窗口重新计算每个运行的汇总指标（与 perftest_summary 的列同名）
+        
+        Args:
+            timeseries_df: detect_steady_state 的结果
+        
+        Returns:
+            每个 run_id 一行：avg_sent_msg_s、avg_received_msg_s、worst_p95_ms、CPU/内存统计、
+            steady_start_s、steady_end_s、steady_points、trimmed_points，
+            以及按整个运行的发送/接收总量计算的 loss_ratio（截取窗口后，窗口之前发出、窗口内才收到的
+            消息会使窗口内的接收均值高于发送均值，不能用窗口均值计算丢失率）
+        """
+        df = timeseries_df
+        window = df[df['steady']]
+        aggregations = {
+            'avg_sent_msg_s': ('sent_msg_s', 'mean'),
+            'avg_received_msg_s': ('received_msg_s', 'mean'),
+            'worst_p95_ms': ('p95_ms', 'max'),
+            'avg_cpu_percent': ('cpu_percent', 'mean'),
+            'max_cpu_percent': ('cpu_percent', 'max'),
+            'avg_memory_percent': ('memory_percent', 'mean'),
+            'max_memory_percent': ('memory_percent', 'max'),
+            'avg_memory_used_gb': ('memory_used_gb', 'mean'),
+            'steady_start_s': ('time_s', 'min'),
+            'steady_end_s': ('time_s', 'max'),
+            'steady_points': ('time_s', 'size'),
+        }
+        aggregations = {name: spec for name, spec in aggregations.items() if spec[0] in df.columns}
+        summary = window.groupby(window['run_id'].astype(str)).agg(**aggregations)
+        summary['trimmed_points'] = df.groupby(df['run_id'].astype(str)).size() - summary['steady_points']
+        summary = summary.astype('float64').round(3)
+        summary[['steady_points', 'trimmed_points']] = summary[['steady_points', 'trimmed_points']].astype(int)
+        if 'sent_msg_s' in df.columns and 'received_msg_s' in df.columns:
+            totals = df.groupby(df['run_id'].astype(str))[['sent_msg_s', 'received_msg_s']].sum().astype('float64')
+            sent, received = totals['sent_msg_s'], totals['received_msg_s']
+            loss = (1 - received / sent.where(sent > 0)).clip(lower=0).fillna(0).round(4)
+            summary['loss_ratio'] = loss.reindex(summary.index)
+        return summary.rename_axis('run_id').reset_index()
+    
+    def apply_steady_state(self, summary_df: pd.DataFrame, timeseries_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        用稳态窗口内的统计替换汇总表中对应运行的吞吐、延迟和资源指标
+        
+        时间序列中没有的运行保持原值
+        
+        Args:
+            summary_df: perftest_summary DataFrame
+            timeseries_df: perftest_timeseries DataFrame（原始或 detect_steady_state 的结果）
+        
+        Returns:
+            替换后的汇总表副本（增加 steady_start_s、steady_end_s、steady_points、trimmed_points 列）
+        """
+        if 'steady' not in timeseries_df.columns:
+            timeseries_df = self.detect_steady_state(timeseries_df)
+        steady = self.steady_state_summary(timeseries_df).set_index('run_id')
+        
+        result = summary_df.copy()
+        run_ids = result['run_id'].astype(str)
+        matched = run_ids.isin(steady.index).to_numpy()
+        for column in steady.columns:
+            values = run_ids.map(steady[column])
+            if column in result.columns:
+                result[column] = values.where(matched, result[column].astype('float64'))
+            else:
+                result[column] = values
+        return result
+    
+    @traced('normalize.normalize_mq_metrics')
+    def normalize_mq_metrics(self, summary_df: pd.DataFrame, component_name: str = "RabbitMQ",
+                             memory_model: Optional[Dict] = None) -> pd.DataFrame:
         """
         归一化消息队列性能指标
         
         Args:
             summary_df: 包含MQ测试汇总结果的DataFrame
             component_name: 组件名称
+            memory_model: estimate_message_memory 的结果；为空时单位消息内存按消息大小估算
             
         Returns:
             包含归一化指标的DataFrame
@@ -181,9 +601,19 @@ class NormalizedMetrics:
             # 单位消息大小吞吐（msg/s/KB）
             msg_per_sec_per_kb = avg_received / (size_bytes / 1024) if size_bytes > 0 else 0
             
-            # 估算单位消息内存占用
-            # 基于消息大小和队列长度估算
-            estimated_mem_per_msg = size_bytes * 1.5  # 消息本身 + 开销
+            # 单位消息内存占用：优先使用时间序列回归的实测值，否则按消息大小估算
+            memory_fit = None
+            if memory_model:
+                memory_fit = memory_model.get(int(size_bytes) if pd.notna(size_bytes) else None,
+                                              memory_model.get(None))
+            if memory_fit is not None:
+                mem_per_msg = memory_fit['memory_per_msg_bytes']
+                memory_baseline_gb = memory_fit['memory_baseline_gb']
+                memory_per_msg_source = 'measured'
+            else:
+                mem_per_msg = size_bytes * MESSAGE_MEMORY_OVERHEAD  # 消息本身 + 开销
+                memory_baseline_gb = None
+                memory_per_msg_source = 'estimated'
             
             # 吞吐带宽（MB/s）
             throughput_mbps = (avg_received * size_bytes) / (1024 * 1024)
@@ -204,8 +634,10 @@ class NormalizedMetrics:
             else:
                 memory_utilization = None
             
-            # 消息丢失率
-            loss_ratio = 1 - (avg_received / avg_sent) if avg_sent > 0 else 0
+            # 消息丢失率：稳态窗口的汇总已按整个运行的总量给出；否则按均值计算，不小于 0
+            loss_ratio = row.get('loss_ratio')
+            if loss_ratio is None or pd.isna(loss_ratio):
+                loss_ratio = max(1 - (avg_received / avg_sent), 0.0) if avg_sent > 0 else 0
             
             results.append({
                 'component': component_name,
@@ -233,7 +665,9 @@ class NormalizedMetrics:
                 
                 # 单位消息开销
                 'latency_per_msg_ms': round(latency_per_msg, 2),
-                'memory_per_msg_bytes': round(estimated_mem_per_msg, 2),
+                'memory_per_msg_bytes': round(mem_per_msg, 2),
+                'memory_baseline_gb': memory_baseline_gb,
+                'memory_per_msg_source': memory_per_msg_source,
                 
                 # 吞吐指标
                 'throughput_mbps': round(throughput_mbps, 2),
@@ -253,9 +687,270 @@ class NormalizedMetrics:
                 'test_memory_gb': self.memory_gb,
             })
         
-        return pd.DataFrame(results)
+        if not results:
+            return pd.DataFrame(results)
+        
+        return self.detect_saturation(compact_dtypes(pd.DataFrame(results)))
     
-    def generate_capacity_extrapolation(self, normalized_df: pd.DataFrame, target_slo: Dict) -> pd.DataFrame:
+    @traced('normalize.detect_saturation')
+    def detect_saturation(self, mq_df: pd.DataFrame, tracking_ratio: float = SATURATION_TRACKING_RATIO) -> pd.DataFrame:
+        """
+        速率扫描饱和点（拐点）检测
+        
+        同一配置（生产者/消费者数、消息大小）下按offered速率升序，接收速率首次低于
+        offered速率的 tracking_ratio 之后的所有点都视为已饱和（不可持续）。
+        全部计算为分组向量化运算
+        
+        Args:
+            mq_df: normalize_mq_metrics 生成的DataFrame
+            tracking_ratio: 跟随比例阈值
+            
+        Returns:
+            增加以下列的新DataFrame：
+            offered_msg_s（目标总速率）、tracking_ratio（接收/目标）、
+            sustainable（是否位于拐点之前）、max_sustainable_msg_s（该配置的最大可持续吞吐）
+        """
+        df = mq_df.copy()
+        keys = [col for col in SWEEP_CONFIG_COLUMNS if col in df.columns]
+        
+        # perftest 的目标速率按单个生产者计，总速率 = 目标速率 × 生产者数
+        producers = df['producers'].to_numpy(dtype=np.float64)
+        target = df['target_rate_msg_s'].to_numpy(dtype=np.float64)
+        received = df['avg_received_msg_s'].to_numpy(dtype=np.float64)
+        offered = np.where(producers > 0, target * producers, df['avg_sent_msg_s'].to_numpy(dtype=np.float64))
+        ratio = np.divide(received, offered, out=np.ones_like(received), where=offered > 0)
+        
+        df['offered_msg_s'] = offered
+        df['tracking_ratio'] = np.round(ratio, 4)
+        
+        # 按配置分组、按offered速率排序后做累计最小：一旦跟不上，后续更高速率均不可持续
+        order = np.lexsort([offered] + [df[k].astype(str).to_numpy() for k in reversed(keys)])
+        ok = pd.Series((ratio >= tracking_ratio).astype(np.int8)[order], index=df.index[order])
+        group_keys = [df[k].astype(str).to_numpy()[order] for k in keys]
+        sustained = ok.groupby(group_keys).cummin().astype(bool)
+        df['sustainable'] = sustained.reindex(df.index)
+        
+        sustainable_received = df['avg_received_msg_s'].astype(np.float64).where(df['sustainable'])
+        df['max_sustainable_msg_s'] = sustainable_received.groupby(
+            [df[k].astype(str) for k in keys]
+        ).transform('max')
+        
+        return df
+    
+    def saturation_summary(self, mq_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        每个配置的饱和点汇总
+        
+        Args:
+            mq_df: 经 detect_saturation 处理的DataFrame
+            
+        Returns:
+            每个配置一行：最大可持续吞吐、拐点处的目标速率（未饱和时为空）
+        """
+        keys = [col for col in SWEEP_CONFIG_COLUMNS if col in mq_df.columns]
+        saturated = mq_df[~mq_df['sustainable'].fillna(False).astype(bool)]
+        knee = saturated.groupby(keys, observed=True)['target_rate_msg_s'].min().rename('knee_target_rate_msg_s')
+        summary = mq_df.groupby(keys, observed=True).agg(
+            max_sustainable_msg_s=('max_sustainable_msg_s', 'max'),
+            runs=('run_id', 'count'),
+        )
+        summary['max_sustainable_msg_per_sec_per_core'] = summary['max_sustainable_msg_s'] / self.cpu_cores
+        return summary.join(knee).reset_index()
+
+    
+    def valid_baselines(self, normalized_df: pd.DataFrame, target_slo: Dict) -> pd.DataFrame:
+        """
+        满足SLO延迟约束、可作为外推基准的测试数据
+        
+        DB：latency_ms <= max_latency_ms；
+        MQ：worst_p95_ms <= max_p95_ms，且位于饱和点之前（饱和点作为外推上限）
+        """
+        if target_slo.get('component_type') == 'DB':
+            max_latency = target_slo.get('max_latency_ms', 1000)
+            return normalized_df[
+                (normalized_df['component_type'] == 'DB') &
+                (normalized_df['latency_ms'] <= max_latency)
+            ]
+        
+        if target_slo.get('component_type') == 'MQ':
+            max_p95 = target_slo.get('max_p95_ms', 2000)
+            valid_data = normalized_df[
+                (normalized_df['component_type'] == 'MQ') &
+                (normalized_df['worst_p95_ms'] <= max_p95)
+            ]
+            # 拐点之后的速率无法持续，不能作为基准
+            if 'sustainable' in valid_data.columns:
+                valid_data = valid_data[valid_data['sustainable'].fillna(False).astype(bool)]
+            return valid_data
+        
+        return normalized_df.iloc[0:0]
+    
+    @traced('normalize.build_slo_lookup')
+    def build_slo_lookup(self, normalized_df: pd.DataFrame, component_type: str) -> Dict:
+        """
+        构建SLO查找表：按延迟（MQ 为 P95）升序排列，并记录每个前缀中每核吞吐最高的测试点
+        
+        "延迟上限 X 下的最佳基准" 即延迟 <= X 的最长前缀的最佳点，一次二分查找即可得到；
+        并列时取原始位置最靠前的点，与 idxmax 的结果一致
+        
+        Args:
+            normalized_df: 归一化指标DataFrame
+            component_type: 'DB' 或 'MQ'
+        
+        Returns:
+            {'component_type', 'latency': 升序延迟数组, 'best_position': 对应前缀最佳点在 normalized_df 中的位置}
+        """
+        if component_type == 'DB':
+            latency_col, per_core_col = 'latency_ms', 'tps_per_core'
+        else:
+            latency_col, per_core_col = 'worst_p95_ms', 'msg_per_sec_per_core'
+        
+        mask = (normalized_df['component_type'] == component_type).to_numpy()
+        if component_type == 'MQ' and 'sustainable' in normalized_df.columns:
+            # 拐点之后的速率无法持续，不能作为基准
+            mask &= normalized_df['sustainable'].fillna(False).astype(bool).to_numpy()
+        if latency_col in normalized_df.columns and per_core_col in normalized_df.columns:
+            latency = as_float64(normalized_df[latency_col].to_numpy())
+            per_core = as_float64(normalized_df[per_core_col].to_numpy())
+            mask &= ~np.isnan(latency) & ~np.isnan(per_core)
+        else:
+            mask[:] = False
+        
+        positions = np.flatnonzero(mask)
+        if len(positions) == 0:
+            return {'component_type': component_type, 'latency': np.empty(0), 'best_position': np.empty(0, dtype=np.int64)}
+        
+        order = np.lexsort((positions, latency[positions]))
+        positions = positions[order]
+        latency = latency[positions]
+        per_core = per_core[positions]
+        
+        # 前缀最大值；同一最大值可能由多个点取到，取原始位置最小者。
+        # running 每次严格增大开始一个新段，键 = 位置 - 段号 × big 使新段的键总小于旧段，
+        # 对记录点的键做前缀最小值即得到段内位置最小的记录点
+        running = np.maximum.accumulate(per_core)
+        segment = np.concatenate(([0], np.cumsum(running[1:] > running[:-1])))
+        big = int(positions.max()) + 1
+        key = np.where(per_core == running, positions - segment * big, np.iinfo(np.int64).max)
+        best_position = np.minimum.accumulate(key) + segment * big
+        
+        return {'component_type': component_type, 'latency': latency, 'best_position': best_position}
+    
+    def best_baseline_position(self, normalized_df: pd.DataFrame, target_slo: Dict,
+                               lookup: Optional[Dict] = None) -> Optional[int]:
+        """
+        满足SLO延迟约束、每核吞吐最高的测试点在 normalized_df 中的位置
+        
+        Args:
+            normalized_df: 归一化指标DataFrame
+            target_slo: 目标SLO约束
+            lookup: build_slo_lookup 的结果（可缓存复用；为空时现场构建）
+        
+        Returns:
+            位置下标；无满足约束的数据时返回 None
+        """
+        component_type = target_slo.get('component_type')
+        if component_type == 'DB':
+            max_latency = target_slo.get('max_latency_ms', 1000)
+        elif component_type == 'MQ':
+            max_latency = target_slo.get('max_p95_ms', 2000)
+        else:
+            return None
+        
+        if lookup is None or lookup['component_type'] != component_type:
+            lookup = self.build_slo_lookup(normalized_df, component_type)
+        
+        k = int(np.searchsorted(lookup['latency'], max_latency, side='right')) - 1
+        if k < 0:
+            return None
+        return int(lookup['best_position'][k])
+    
+    @traced('normalize.bootstrap_capacity')
+    def bootstrap_capacity(
+        self,
+        normalized_df: pd.DataFrame,
+        target_slo: Dict,
+        n_boot: int = 1000,
+        percentiles: Tuple[int, ...] = (50, 90, 99),
+        seed: int = 0,
+    ) -> Optional[Dict]:
+        """
+        自助法（bootstrap）估计所需资源的分布
+        
+        对满足SLO的测试记录有放回重采样 n_boot 次，每次按与 generate_capacity_extrapolation
+        相同的规则选出最佳基准并计算所需核心数和内存，最后取分位数。
+        重采样以 (n_boot, n) 的下标矩阵一次完成，不逐次循环
+        
+        Args:
+            normalized_df: 归一化后的指标DataFrame
+            target_slo: 目标SLO约束（同 generate_capacity_extrapolation）
+            n_boot: 重采样次数
+            percentiles: 输出的分位数
+            seed: 随机种子（固定种子保证同一数据集结果可复现）
+            
+        Returns:
+            {'required_cpu_cores': {'p50': ..}, 'required_memory_gb': {..}, 'samples': n_boot, 'runs': n}，
+            无满足SLO的数据时返回 None
+        """
+        valid_data = self.valid_baselines(normalized_df, target_slo)
+        n = len(valid_data)
+        if n == 0:
+            return None
+        
+        if target_slo.get('component_type') == 'DB':
+            target = target_slo.get('target_tps', 0)
+            per_core = as_float64(valid_data['tps_per_core'].to_numpy())
+            per_gb = as_float64(valid_data['tps_per_gb_memory'].to_numpy())
+        else:
+            target = target_slo.get('target_msg_per_sec', 0)
+            per_core = as_float64(valid_data['msg_per_sec_per_core'].to_numpy())
+            per_gb = as_float64(valid_data['msg_per_sec_per_gb_memory'].to_numpy())
+        
+        # 实际利用率：优先监控数据，否则使用估算值/默认值
+        cpu_util = as_float64(valid_data['avg_cpu_percent'].to_numpy()) if 'avg_cpu_percent' in valid_data else np.full(n, np.nan)
+        cpu_util = np.where(np.isnan(cpu_util), as_float64(valid_data['cpu_utilization_pct'].to_numpy()), cpu_util)
+        mem_util = as_float64(valid_data['avg_memory_percent'].to_numpy()) if 'avg_memory_percent' in valid_data else np.full(n, np.nan)
+        mem_util = np.where(np.isnan(mem_util), 70.0, mem_util)
+        
+        # 实测内存模型（MQ）：基线内存 + 吞吐 × 单位消息内存占用
+        measured = np.zeros(n, dtype=bool)
+        memory_baseline = np.full(n, np.nan)
+        memory_per_msg = np.full(n, np.nan)
+        if 'memory_per_msg_source' in valid_data and 'memory_baseline_gb' in valid_data:
+            memory_baseline = as_float64(valid_data['memory_baseline_gb'].to_numpy(dtype=np.float64, na_value=np.nan))
+            memory_per_msg = as_float64(valid_data['memory_per_msg_bytes'].to_numpy())
+            measured = (valid_data['memory_per_msg_source'] == 'measured').to_numpy() & ~np.isnan(memory_baseline)
+        
+        rng = np.random.default_rng(seed)
+        samples = rng.integers(0, n, size=(n_boot, n))
+        best = samples[np.arange(n_boot), np.argmax(per_core[samples], axis=1)]
+        
+        # 与单点外推相同的目标利用率规则：CPU 75%~85%，内存 70%~80%
+        target_cpu_util = np.clip(cpu_util[best], 75.0, 85.0)
+        target_mem_util = np.clip(mem_util[best], 70.0, 80.0)
+        cores = np.ceil(target / (per_core[best] * target_cpu_util / 100.0))
+        memory = np.where(
+            measured[best],
+            np.ceil((memory_baseline[best] + target * memory_per_msg[best] / 1024 ** 3) / (target_mem_util / 100.0)),
+            np.ceil(target / (per_gb[best] * target_mem_util / 100.0))
+        )
+        
+        def summarize(values: np.ndarray) -> Dict:
+            return {
+                f'p{p}': int(np.percentile(values, p, method='higher'))
+                for p in percentiles
+            }
+        
+        return {
+            'required_cpu_cores': summarize(cores),
+            'required_memory_gb': summarize(memory),
+            'samples': n_boot,
+            'runs': n,
+        }
+    
+    @traced('normalize.generate_capacity_extrapolation')
+    def generate_capacity_extrapolation(self, normalized_df: pd.DataFrame, target_slo: Dict,
+                                        lookup: Optional[Dict] = None) -> pd.DataFrame:
         """
         基于SLO反推所需资源
         
@@ -270,6 +965,7 @@ class NormalizedMetrics:
                     'target_msg_per_sec': 50000,
                     'max_p95_ms': 100
                 }
+            lookup: build_slo_lookup 的结果（可选，缓存后每次外推只需一次二分查找）
         
         Returns:
             资源配置建议DataFrame
@@ -281,15 +977,11 @@ class NormalizedMetrics:
             target_tps = target_slo.get('target_tps', 0)
             max_latency = target_slo.get('max_latency_ms', 1000)
             
-            # 找到满足延迟要求的基准数据
-            valid_data = normalized_df[
-                (normalized_df['component_type'] == 'DB') &
-                (normalized_df['latency_ms'] <= max_latency)
-            ]
+            # 满足延迟要求的基准数据中，使用最佳性能数据（最高TPS/核心）
+            position = self.best_baseline_position(normalized_df, target_slo, lookup)
             
-            if len(valid_data) > 0:
-                # 使用最佳性能数据（最高TPS/核心）
-                best = valid_data.loc[valid_data['tps_per_core'].idxmax()]
+            if position is not None:
+                best = normalized_df.iloc[position].map(to_python_scalar)
                 
                 # 考虑实际CPU利用率：如果测试时CPU利用率较低，说明还有余量
                 # 外推时假设CPU利用率会提高到合理水平（70-80%），但不超过实际测试值
@@ -344,15 +1036,11 @@ class NormalizedMetrics:
             target_msg_per_sec = target_slo.get('target_msg_per_sec', 0)
             max_p95 = target_slo.get('max_p95_ms', 2000)
             
-            # 找到满足延迟要求的基准数据
-            valid_data = normalized_df[
-                (normalized_df['component_type'] == 'MQ') &
-                (normalized_df['worst_p95_ms'] <= max_p95)
-            ]
+            # 满足延迟要求、且位于饱和点之前的基准数据中，使用最佳性能数据
+            position = self.best_baseline_position(normalized_df, target_slo, lookup)
             
-            if len(valid_data) > 0:
-                # 使用最佳性能数据
-                best = valid_data.loc[valid_data['msg_per_sec_per_core'].idxmax()]
+            if position is not None:
+                best = normalized_df.iloc[position].map(to_python_scalar)
                 
                 # 考虑实际CPU利用率：类似DB的处理方式
                 actual_cpu_util = best.get('cpu_utilization_pct', 80)  # 默认80%
@@ -376,12 +1064,20 @@ class NormalizedMetrics:
                 target_mem_util = max(actual_mem_util, 70.0) if actual_mem_util < 70.0 else actual_mem_util
                 target_mem_util = min(target_mem_util, 80.0)  # 不超过80%
                 
-                effective_msg_per_sec_per_gb = best['msg_per_sec_per_gb_memory'] * (target_mem_util / 100.0) if target_mem_util > 0 else best['msg_per_sec_per_gb_memory']
-                required_memory_gb = int(np.ceil(target_msg_per_sec / effective_msg_per_sec_per_gb))
+                if best.get('memory_per_msg_source') == 'measured' and pd.notna(best.get('memory_baseline_gb')):
+                    # 实测内存模型：基线内存 + 目标吞吐 × 单位消息内存占用
+                    working_set_gb = best['memory_baseline_gb'] + target_msg_per_sec * best['memory_per_msg_bytes'] / 1024 ** 3
+                    required_memory_gb = int(np.ceil(working_set_gb / (target_mem_util / 100.0)))
+                else:
+                    effective_msg_per_sec_per_gb = best['msg_per_sec_per_gb_memory'] * (target_mem_util / 100.0) if target_mem_util > 0 else best['msg_per_sec_per_gb_memory']
+                    required_memory_gb = int(np.ceil(target_msg_per_sec / effective_msg_per_sec_per_gb))
                 
                 # 估算实际延迟
                 estimated_p95 = best['worst_p95_ms'] * (target_msg_per_sec / best['avg_received_msg_s'])
                 
+                # 拐点处的最大可持续吞吐是外推上限：目标超过它时标记并给出提示
+                warning = sustainable_warning(target_msg_per_sec, best.get('max_sustainable_msg_s'))
+                
                 recommendations.append({
                     'component': best['component'],
                     'target_msg_per_sec': target_msg_per_sec,
@@ -393,6 +1089,12 @@ class NormalizedMetrics:
                     'baseline_msg_per_sec_per_gb': best['msg_per_sec_per_gb_memory'],
                     'baseline_test_msg_per_sec': best['avg_received_msg_s'],
                     'baseline_test_p95_ms': best['worst_p95_ms'],
+                    'max_sustainable_msg_s': best.get('max_sustainable_msg_s'),
+                    'exceeds_sustainable': warning is not None,
+                    'warning': warning,
+                    'memory_model': best.get('memory_per_msg_source', 'estimated'),
+                    'memory_per_msg_bytes': best.get('memory_per_msg_bytes'),
+                    'memory_baseline_gb': best.get('memory_baseline_gb'),
                     'baseline_cpu_utilization_pct': round(actual_cpu_util, 2),
                     'baseline_memory_utilization_pct': round(actual_mem_util, 2) if actual_mem_util is not None else None,
                     'extrapolation_target_cpu_util_pct': round(target_cpu_util, 2),
@@ -400,6 +1102,64 @@ class NormalizedMetrics:
                 })
         
         return pd.DataFrame(recommendations)
+    
+    @traced('normalize.capacity_curve')
+    def capacity_curve(self, normalized_df: pd.DataFrame, target_slo: Dict, loads: np.ndarray,
+                       lookup: Optional[Dict] = None) -> pd.DataFrame:
+        """
+        容量曲线：一组目标负载下所需的CPU核心、内存和估算延迟
+        
+        基准点只选一次（与目标负载无关），各负载点按 generate_capacity_extrapolation 的同一公式向量化计算，
+        每个点的结果与单独外推一致
+        
+        Args:
+            normalized_df: 归一化指标DataFrame
+            target_slo: 目标SLO约束（目标负载字段被忽略）
+            loads: 目标负载数组（DB 为TPS，MQ 为消息/秒）
+            lookup: build_slo_lookup 的结果（可选）
+        
+        Returns:
+            列为 load、required_cpu_cores、required_memory_gb、estimated_latency_ms 的DataFrame
+            （MQ 另有 exceeds_sustainable：负载是否超过拐点处的最大可持续吞吐）；
+            无满足SLO的基准数据时为空
+        """
+        component_type = target_slo.get('component_type')
+        load_key = 'target_tps' if component_type == 'DB' else 'target_msg_per_sec'
+        baseline = self.generate_capacity_extrapolation(normalized_df, {**target_slo, load_key: 1}, lookup)
+        if len(baseline) == 0:
+            return pd.DataFrame()
+        best = baseline.iloc[0]
+        
+        loads = np.asarray(loads, dtype=np.float64)
+        cpu_util = best['extrapolation_target_cpu_util_pct']
+        mem_util = best['extrapolation_target_mem_util_pct']
+        if component_type == 'DB':
+            per_core, per_gb = best['baseline_tps_per_core'], best['baseline_tps_per_gb']
+            baseline_load, baseline_latency = best['baseline_test_tps'], best['baseline_test_latency_ms']
+        else:
+            per_core, per_gb = best['baseline_msg_per_sec_per_core'], best['baseline_msg_per_sec_per_gb']
+            baseline_load, baseline_latency = best['baseline_test_msg_per_sec'], best['baseline_test_p95_ms']
+        
+        effective_per_core = per_core * (cpu_util / 100.0) if cpu_util > 0 else per_core
+        required_cores = np.ceil(loads / effective_per_core)
+        
+        if component_type == 'MQ' and best.get('memory_model') == 'measured' and pd.notna(best.get('memory_baseline_gb')):
+            working_set_gb = best['memory_baseline_gb'] + loads * best['memory_per_msg_bytes'] / 1024 ** 3
+            required_memory = np.ceil(working_set_gb / (mem_util / 100.0))
+        else:
+            effective_per_gb = per_gb * (mem_util / 100.0) if mem_util > 0 else per_gb
+            required_memory = np.ceil(loads / effective_per_gb)
+        
+        curve = pd.DataFrame({
+            'load': loads,
+            'required_cpu_cores': required_cores.astype(np.int64),
+            'required_memory_gb': required_memory.astype(np.int64),
+            'estimated_latency_ms': np.round(baseline_latency * (loads / baseline_load), 2),
+        })
+        if component_type == 'MQ':
+            max_sustainable = best.get('max_sustainable_msg_s')
+            curve['exceeds_sustainable'] = loads > max_sustainable if pd.notna(max_sustainable) else False
+        return curve
 
 
 def main():
@@ -416,6 +1176,16 @@ def main():
         type=str,
         help='消息队列测试汇总CSV文件路径'
     )
+    parser.add_argument(
+        '--mq-timeseries-csv',
+        type=str,
+        help='消息队列时间序列CSV文件路径（可选，用于回归单位消息内存占用）'
+    )
+    parser.add_argument(
+        '--steady-state',
+        action='store_true',
+        help='MQ指标只使用稳态窗口内的数据（需要 --mq-timeseries-csv）'
+    )
     parser.add_argument(
         '--output-dir',
         type=str,
@@ -446,6 +1216,11 @@ def main():
         default='RabbitMQ',
         help='消息队列组件名称（默认：RabbitMQ）'
     )
+    parser.add_argument(
+        '--memory-report',
+        action='store_true',
+        help='打印原始数据与归一化数据的内存占用（按列、按数据集）'
+    )
     
     args = parser.parse_args()
     
@@ -460,6 +1235,7 @@ def main():
     
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     all_normalized = []
+    memory_frames = {}
     
     # 处理数据库数据
     if args.db_csv:
@@ -469,6 +1245,8 @@ def main():
             db_df = pd.read_csv(db_path)
             db_normalized = normalizer.normalize_db_metrics(db_df, args.component_name_db)
             all_normalized.append(db_normalized)
+            memory_frames['db_raw'] = db_df
+            memory_frames['db_normalized'] = db_normalized
             
             output_file = output_dir / f"normalized_db_{args.component_name_db}_{timestamp}.csv"
             db_normalized.to_csv(output_file, index=False, encoding='utf-8')
@@ -483,8 +1261,24 @@ def main():
         if mq_path.exists():
             print(f"处理消息队列测试结果: {mq_path}")
             mq_df = pd.read_csv(mq_path)
-            mq_normalized = normalizer.normalize_mq_metrics(mq_df, args.component_name_mq)
+            memory_model = None
+            if args.mq_timeseries_csv:
+                ts_df = pd.read_csv(args.mq_timeseries_csv)
+                if args.steady_state:
+                    ts_df = normalizer.detect_steady_state(ts_df)
+                    mq_df = normalizer.apply_steady_state(mq_df, ts_df)
+                    print(f"  稳态窗口: 裁剪预热/收尾 {int((~ts_df['steady']).sum())} 个点（共 {len(ts_df)} 个）")
+                    ts_df = ts_df[ts_df['steady']]
+                memory_model = normalizer.estimate_message_memory(ts_df, mq_df)
+                for size_bytes, fit in memory_model.items():
+                    print(f"  单位消息内存（时间序列回归，消息大小={size_bytes}）: "
+                          f"{fit['memory_per_msg_bytes']:.0f} 字节/(msg/s), 基线 {fit['memory_baseline_gb']:.3f} GB, R²={fit['r2']:.3f}")
+            elif args.steady_state:
+                print("  警告: --steady-state 需要 --mq-timeseries-csv，使用汇总数据")
+            mq_normalized = normalizer.normalize_mq_metrics(mq_df, args.component_name_mq, memory_model)
             all_normalized.append(mq_normalized)
+            memory_frames['mq_raw'] = mq_df
+            memory_frames['mq_normalized'] = mq_normalized
             
             output_file = output_dir / f"normalized_mq_{args.component_name_mq}_{timestamp}.csv"
             mq_normalized.to_csv(output_file, index=False, encoding='utf-8')
@@ -520,6 +1314,9 @@ def main():
                 print(f"  消息/秒/GB内存: 平均 {comp_data['msg_per_sec_per_gb_memory'].mean():.2f}, "
                       f"最大 {comp_data['msg_per_sec_per_gb_memory'].max():.2f}")
                 print(f"  P95延迟: 平均 {comp_data['worst_p95_ms'].mean():.2f} ms")
+        
+        if args.memory_report:
+            print_memory_report(memory_report(memory_frames))
     
     else:
         print("错误: 没有找到有效的测试数据文件")
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DB + MQ 流水线瓶颈模拟：消息经消息队列到达，每 N 条消息写一个数据库事务
+
+1. 端到端延迟预算 = DB 平均延迟 + MQ P95 延迟；对 DB 的每个延迟断点，MQ 取剩余预算下的最佳基准点，
+   得到全部可行的预算拆分（SLO查找表上的一次二分查找）
+2. 端到端容量 = min(DB 每核有效TPS × DB核心 × N, MQ 每核有效吞吐 × MQ核心)，两侧分别满足目标即可行；
+   每种拆分下 DB核心数 × MQ核心数 网格一次性向量化计算，两侧各自的最少核心数 ceil(目标 / 每核吞吐) 作为下界裁剪网格：
+   每核成本为正时只剩下界一个单元格，计算量与拆分数成正比，不随核心数上限平方增长
+3. 每种拆分取成本最低的可行分配，成本相同（每核成本为 0）时取两侧利用率最接近（最均衡）者；
+   容量较小的一侧即为瓶颈
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from normalize_metrics import NormalizedMetrics, as_float64, to_python_scalar
+from scale_planner import DEFAULT_COST_PER_CORE, DEFAULT_COST_PER_GB
+from tracing import traced
+
+
+def minimal_cores(per_core_msg: np.ndarray, target_msg_per_sec: float) -> np.ndarray:
+    """
+    容量（每核吞吐 × 核心数）达到目标所需的最少核心数（逐点向量化；每核吞吐非正或缺失时为 inf）
+
+    ceil 的结果按容量的实际计算方式校正一次，避免浮点舍入使边界上的核心数差 1
+    """
+    rate = np.where(per_core_msg > 0, per_core_msg, np.nan)
+    with np.errstate(invalid='ignore'):
+        cores = np.ceil(target_msg_per_sec / rate)
+        cores = np.where(rate * (cores - 1) >= target_msg_per_sec, cores - 1, cores)
+        cores = np.where(rate * cores < target_msg_per_sec, cores + 1, cores)
+    return np.where(np.isnan(cores), np.inf, np.maximum(cores, 1.0))
+
+
+def _allocation_grid(db_rate: np.ndarray, mq_rate: np.ndarray, db_min: np.ndarray, mq_min: np.ndarray,
+                     max_cores: int, target_msg_per_sec: float, cost_per_core: float):
+    """
+    每种拆分在 DB核心 × MQ核心 网格上取成本最低的可行分配，成本相同时取两侧负载率最接近（最均衡）者
+
+    两侧的最少核心数是可行分配的下界，网格从下界开始（下界以下全部不可行）；每核成本为正时多一个核心
+    成本就高于下界分配，网格只剩下界一个单元格，为 0 时覆盖下界到 max_cores 的全部分配：(S, W, W)
+    """
+    lowest = min(db_min.min(), mq_min.min())
+    width = 1 if cost_per_core > 0 else int(max_cores - lowest + 1)
+    offsets = np.arange(width, dtype=np.float64)
+    db_cores = db_min[:, None] + offsets[None, :]
+    mq_cores = mq_min[:, None] + offsets[None, :]
+    db_capacity = db_rate[:, None] * db_cores
+    mq_capacity = mq_rate[:, None] * mq_cores
+
+    within = (db_cores[:, :, None] <= max_cores) & (mq_cores[:, None, :] <= max_cores)
+    cost = np.where(within, (db_cores[:, :, None] + mq_cores[:, None, :]) * cost_per_core, np.inf)
+    imbalance = np.abs(
+        target_msg_per_sec / db_capacity[:, :, None] - target_msg_per_sec / mq_capacity[:, None, :]
+    )
+
+    flat_cost = cost.reshape(len(db_rate), -1)
+    tie = np.where(flat_cost == flat_cost.min(axis=1)[:, None], imbalance.reshape(len(db_rate), -1), np.inf)
+    db_idx, mq_idx = np.unravel_index(tie.argmin(axis=1), (width, width))
+    rows = np.arange(len(db_rate))
+    return db_cores[rows, db_idx], mq_cores[rows, mq_idx]
+
+
+def _column(df: pd.DataFrame, col: str, positions: np.ndarray, default: float) -> np.ndarray:
+    """取指定位置的数值列（列不存在时为默认值）"""
+    if col not in df.columns:
+        return np.full(len(positions), default)
+    return as_float64(df[col].to_numpy()[positions])
+
+
+def effective_rates(normalized_df: pd.DataFrame, positions: np.ndarray, component_type: str,
+                    target_load: float) -> Dict[str, np.ndarray]:
+    """
+    基准点的有效每核吞吐和目标负载所需内存（与 generate_capacity_extrapolation 的利用率假设一致，逐点向量化）
+
+    Args:
+        normalized_df: 归一化指标DataFrame
+        positions: 基准点在 normalized_df 中的位置
+        component_type: 'DB' 或 'MQ'
+        target_load: 该组件的目标负载（DB 为TPS，MQ 为消息/秒）
+
+    Returns:
+        {'per_core': 有效每核吞吐, 'memory_gb': 所需内存GB, 'latency_ms': 基准延迟}
+    """
+    if component_type == 'DB':
+        per_core_col, per_gb_col, latency_col = 'tps_per_core', 'tps_per_gb_memory', 'latency_ms'
+    else:
+        per_core_col, per_gb_col, latency_col = 'msg_per_sec_per_core', 'msg_per_sec_per_gb_memory', 'worst_p95_ms'
+
+    cpu_util = _column(normalized_df, 'avg_cpu_percent', positions, np.nan)
+    cpu_util = np.where(np.isnan(cpu_util), _column(normalized_df, 'cpu_utilization_pct', positions, 80.0), cpu_util)
+    mem_util = _column(normalized_df, 'avg_memory_percent', positions, np.nan)
+    mem_util = np.where(np.isnan(mem_util), _column(normalized_df, 'memory_utilization_pct', positions, 70.0), mem_util)
+
+    # 外推利用率：低于 75%/70% 时按提高到该水平计算，上限 85%/80%
+    target_cpu_util = np.minimum(np.maximum(cpu_util, 75.0), 85.0)
+    target_mem_util = np.minimum(np.maximum(mem_util, 70.0), 80.0)
+
+    per_core = _column(normalized_df, per_core_col, positions, np.nan) * target_cpu_util / 100.0
+    per_gb = _column(normalized_df, per_gb_col, positions, np.nan) * target_mem_util / 100.0
+    memory_gb = np.ceil(target_load / per_gb)
+
+    if component_type == 'MQ' and 'memory_per_msg_source' in normalized_df.columns:
+        # 实测内存模型：基线内存 + 目标吞吐 × 单位消息内存占用
+        measured = (normalized_df['memory_per_msg_source'].astype(str).to_numpy()[positions] == 'measured')
+        baseline_gb = _column(normalized_df, 'memory_baseline_gb', positions, np.nan)
+        per_msg_bytes = _column(normalized_df, 'memory_per_msg_bytes', positions, np.nan)
+        measured &= ~np.isnan(baseline_gb)
+        working_set_gb = baseline_gb + target_load * per_msg_bytes / 1024 ** 3
+        memory_gb = np.where(measured, np.ceil(working_set_gb / (target_mem_util / 100.0)), memory_gb)
+
+    return {
+        'per_core': per_core,
+        'memory_gb': memory_gb,
+        'latency_ms': _column(normalized_df, latency_col, positions, np.nan),
+    }
+
+
+@traced('capacity.simulate_pipeline')
+def simulate_pipeline(
+    db_df: pd.DataFrame,
+    mq_df: pd.DataFrame,
+    target_msg_per_sec: float,
+    messages_per_transaction: float = 1.0,
+    max_latency_ms: float = 2000.0,
+    max_cores: int = 64,
+    cost_per_core: float = DEFAULT_COST_PER_CORE,
+    cost_per_gb: float = DEFAULT_COST_PER_GB,
+    db_lookup: Optional[Dict] = None,
+    mq_lookup: Optional[Dict] = None,
+) -> pd.DataFrame:
+    """
+    计算满足端到端目标的 DB/MQ 资源分配
+
+    Args:
+        db_df: 数据库归一化指标DataFrame
+        mq_df: 消息队列归一化指标DataFrame
+        target_msg_per_sec: 端到端目标消息速率
+        messages_per_transaction: 每个数据库事务对应的消息数（扇出比 N）
+        max_latency_ms: 端到端延迟上限（DB 平均延迟 + MQ P95）
+        max_cores: 每个组件最多考虑的核心数
+        cost_per_core: 每核心成本权重（不小于 0）
+        cost_per_gb: 每GB内存成本权重
+        db_lookup: DB 的 SLO 查找表（可选）
+        mq_lookup: MQ 的 SLO 查找表（可选）
+
+    Returns:
+        每种延迟预算拆分的最优分配（相同分配只保留一个），按成本升序（首行即推荐方案）；
+        load_pct 为目标负载占有效容量（已按外推目标CPU利用率折算）的比例；无可行方案时为空
+    """
+    normalizer = NormalizedMetrics()
+    if db_lookup is None or db_lookup['component_type'] != 'DB':
+        db_lookup = normalizer.build_slo_lookup(db_df, 'DB')
+    if mq_lookup is None or mq_lookup['component_type'] != 'MQ':
+        mq_lookup = normalizer.build_slo_lookup(mq_df, 'MQ')
+    if len(db_lookup['latency']) == 0 or len(mq_lookup['latency']) == 0:
+        return pd.DataFrame()
+
+    # 延迟预算拆分：DB 延迟上限取每个断点，MQ 使用剩余预算
+    db_budget = db_lookup['latency']
+    k = np.searchsorted(mq_lookup['latency'], max_latency_ms - db_budget, side='right') - 1
+    valid = (db_budget <= max_latency_ms) & (k >= 0)
+    if not valid.any():
+        return pd.DataFrame()
+    pairs = np.unique(np.column_stack([db_lookup['best_position'][valid], mq_lookup['best_position'][k[valid]]]), axis=0)
+    db_pos, mq_pos = pairs[:, 0], pairs[:, 1]
+
+    target_tps = target_msg_per_sec / messages_per_transaction
+    db = effective_rates(db_df, db_pos, 'DB', target_tps)
+    mq = effective_rates(mq_df, mq_pos, 'MQ', target_msg_per_sec)
+
+    # 两侧分别需要的最少核心数：(S,)
+    db_rate = db['per_core'] * messages_per_transaction   # 折算为消息/秒
+    mq_rate = mq['per_core']
+    db_min = minimal_cores(db_rate, target_msg_per_sec)
+    mq_min = minimal_cores(mq_rate, target_msg_per_sec)
+    memory_cost = (db['memory_gb'] + mq['memory_gb']) * cost_per_gb
+    has_plan = (db_min <= max_cores) & (mq_min <= max_cores) & np.isfinite(memory_cost)
+    if not has_plan.any():
+        return pd.DataFrame()
+    rows = np.flatnonzero(has_plan)
+    db_rate, mq_rate, db_min, mq_min = db_rate[rows], mq_rate[rows], db_min[rows], mq_min[rows]
+
+    db_cores, mq_cores = _allocation_grid(db_rate, mq_rate, db_min, mq_min, max_cores, target_msg_per_sec, cost_per_core)
+    min_cost = (db_cores + mq_cores) * cost_per_core + memory_cost[rows]
+
+    db_cap = db_rate * db_cores
+    mq_cap = mq_rate * mq_cores
+    latency = db['latency_ms'][rows] + mq['latency_ms'][rows]
+    plans = pd.DataFrame({
+        'db_component': db_df['component'].astype(str).to_numpy()[db_pos[rows]],
+        'mq_component': mq_df['component'].astype(str).to_numpy()[mq_pos[rows]],
+        'db_cpu_cores': db_cores.astype(int),
+        'db_memory_gb': db['memory_gb'][rows].astype(int),
+        'mq_cpu_cores': mq_cores.astype(int),
+        'mq_memory_gb': mq['memory_gb'][rows].astype(int),
+        'total_cpu_cores': (db_cores + mq_cores).astype(int),
+        'total_memory_gb': (db['memory_gb'][rows] + mq['memory_gb'][rows]).astype(int),
+        'db_capacity_msg_per_sec': np.round(db_cap, 2),
+        'mq_capacity_msg_per_sec': np.round(mq_cap, 2),
+        'end_to_end_capacity_msg_per_sec': np.round(np.minimum(db_cap, mq_cap), 2),
+        'db_load_pct': np.round(target_msg_per_sec / db_cap * 100.0, 2),
+        'mq_load_pct': np.round(target_msg_per_sec / mq_cap * 100.0, 2),
+        'bottleneck': np.where(db_cap <= mq_cap, 'DB', 'MQ'),
+        'db_latency_ms': np.round(db['latency_ms'][rows], 3),
+        'mq_p95_ms': np.round(mq['latency_ms'][rows], 3),
+        'end_to_end_latency_ms': np.round(latency, 3),
+        'latency_slack_ms': np.round(max_latency_ms - latency, 3),
+        'cost': np.round(min_cost, 3),
+    })
+    # 不同拆分可能得到相同的分配，只保留延迟最低的一个
+    plans = plans.sort_values(['cost', 'end_to_end_latency_ms'], kind='stable')
+    allocation = ['db_cpu_cores', 'db_memory_gb', 'mq_cpu_cores', 'mq_memory_gb']
+    return plans.drop_duplicates(allocation).reset_index(drop=True)
+
+
+def pipeline_summary(plans: pd.DataFrame, target_msg_per_sec: float, messages_per_transaction: float,
+                     max_latency_ms: float) -> Dict:
+    """将推荐方案（plans 首行）整理为接口返回结构"""
+    best = plans.iloc[0].map(to_python_scalar)
+    return {
+        'target_msg_per_sec': target_msg_per_sec,
+        'messages_per_transaction': messages_per_transaction,
+        'target_db_tps': round(target_msg_per_sec / messages_per_transaction, 3),
+        'bottleneck': best['bottleneck'],
+        'allocation': {
+            'database': {
+                'component': best['db_component'],
+                'cpu_cores': best['db_cpu_cores'],
+                'memory_gb': best['db_memory_gb'],
+                'capacity_msg_per_sec': best['db_capacity_msg_per_sec'],
+                'load_pct': best['db_load_pct'],
+            },
+            'message_queue': {
+                'component': best['mq_component'],
+                'cpu_cores': best['mq_cpu_cores'],
+                'memory_gb': best['mq_memory_gb'],
+                'capacity_msg_per_sec': best['mq_capacity_msg_per_sec'],
+                'load_pct': best['mq_load_pct'],
+            },
+            'total_cpu_cores': best['total_cpu_cores'],
+            'total_memory_gb': best['total_memory_gb'],
+            'end_to_end_capacity_msg_per_sec': best['end_to_end_capacity_msg_per_sec'],
+            'cost': best['cost'],
+        },
+        'latency_budget': {
+            'max_latency_ms': max_latency_ms,
+            'db_latency_ms': best['db_latency_ms'],
+            'mq_p95_ms': best['mq_p95_ms'],
+            'end_to_end_latency_ms': best['end_to_end_latency_ms'],
+            'slack_ms': best['latency_slack_ms'],
+        },
+    }
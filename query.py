@@ -0,0 +1,510 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+通用查询：对原始测试结果和归一化指标做过滤、分组和聚合
+
+查询条件在存储层求值（谓词下推）：
+1. 启用数据仓库时编译为参数化 SQL，过滤、分组、排序和 LIMIT 都在 SQLite 中完成，可利用已建的索引
+2. 未启用时在缓存的列式 DataFrame 上逐个谓词生成向量化布尔掩码，先过滤再投影/分组，只处理需要的列
+
+列名只能取自数据集的实际列（白名单），取值一律作为参数传入，不拼接到 SQL 中
+
+查询格式：
+    {
+        "dataset": "kbbench",
+        "filters": [{"column": "return_code", "op": "=", "value": 0},
+                    {"column": "latency_ms_avg", "op": "<=", "value": 100}],
+        "group_by": ["clients"],
+        "aggregations": [{"func": "max", "column": "tps_excluding", "as": "max_tps"}, {"func": "count"}],
+        "order_by": [{"column": "max_tps", "desc": true}],
+        "limit": 100
+    }
+不分组时可用 "columns" 指定返回的列（默认全部列）
+"""
+
+import pathlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from datasets import (
+    cached_derived,
+    component_from_filename,
+    dataset_version,
+    load_csv_cached,
+    load_normalized,
+    resolve_db_csv,
+    resolve_mq_summary_csv,
+    resolve_mq_timeseries_csv,
+    resolve_mq_timeseries_for,
+)
+from normalize_metrics import as_float64, float32_decimals, to_python_scalar
+from tracing import traced
+
+
+# 可查询的数据集（与数据仓库的表名一致）及其组件类型
+DATASETS = {
+    'kbbench': 'DB',
+    'perftest_summary': 'MQ',
+    'perftest_timeseries': 'MQ',
+    'normalized': None,
+}
+
+# 过滤运算符 -> SQL 运算符
+COMPARISONS = {'=': '=', '!=': '!=', '<': '<', '<=': '<=', '>': '>', '>=': '>='}
+SET_OPERATORS = ('in', 'not_in')
+NULL_OPERATORS = ('is_null', 'not_null')
+OPERATORS = tuple(COMPARISONS) + SET_OPERATORS + ('between',) + NULL_OPERATORS
+
+# 聚合函数 -> SQL 函数
+AGGREGATIONS = {'count': 'COUNT', 'sum': 'SUM', 'avg': 'AVG', 'min': 'MIN', 'max': 'MAX'}
+
+# 列的取值类别：number（数值）、bool（布尔）、text（字符串）、any（混合，只允许等值比较）
+ORDERED_OPERATORS = ('<', '<=', '>', '>=', 'between')
+NUMERIC_AGGREGATIONS = ('sum', 'avg')
+
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 10000
+MAX_SET_VALUES = 1000
+
+
+def _quote(column: str) -> str:
+    """SQL 标识符（列名已通过白名单校验，这里只做引号转义）"""
+    return '"' + column.replace('"', '""') + '"'
+
+
+def frame_column_kinds(df: pd.DataFrame) -> Dict[str, str]:
+    """DataFrame 各列的取值类别（object/category 列按非空值推断）"""
+    kinds = {}
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_bool_dtype(series.dtype):
+            kinds[column] = 'bool'
+            continue
+        if pd.api.types.is_numeric_dtype(series.dtype):
+            kinds[column] = 'number'
+            continue
+        values = series.cat.categories if isinstance(series.dtype, pd.CategoricalDtype) else series
+        inferred = pd.api.types.infer_dtype(values, skipna=True)
+        if inferred == 'boolean':
+            kinds[column] = 'bool'
+        elif inferred in ('integer', 'floating', 'mixed-integer-float', 'decimal'):
+            kinds[column] = 'number'
+        elif inferred in ('string', 'empty'):
+            kinds[column] = 'text'
+        else:
+            kinds[column] = 'any'
+    return kinds
+
+
+def sql_column_kinds(table_info: List[Dict]) -> Dict[str, str]:
+    """SQLite 表各列的取值类别（按声明类型的亲和性；布尔值以 INTEGER 存储）"""
+    kinds = {}
+    for row in table_info:
+        declared = (row['type'] or '').upper()
+        if any(token in declared for token in ('INT', 'REAL', 'FLOA', 'DOUB', 'NUM')):
+            kinds[row['name']] = 'number'
+        elif any(token in declared for token in ('TEXT', 'CHAR', 'CLOB')):
+            kinds[row['name']] = 'text'
+        else:
+            kinds[row['name']] = 'any'
+    return kinds
+
+
+def _check_value(column: str, kind: str, op: str, value):
+    """
+    过滤值与列的取值类别一致（两种执行方式对类型不匹配的比较给出相同的结果：拒绝）
+
+    Raises:
+        ValueError: 类型不匹配
+    """
+    if kind == 'number':
+        valid = isinstance(value, (int, float))
+    elif kind == 'bool':
+        valid = isinstance(value, bool) or (isinstance(value, int) and value in (0, 1))
+    elif kind == 'text':
+        valid = isinstance(value, str)
+    else:
+        valid = isinstance(value, (str, int, float))
+    if not valid:
+        expected = {'number': '数值', 'bool': '布尔值', 'text': '字符串'}.get(kind, '字符串或数值')
+        raise ValueError(f'列 {column} 的过滤值必须是{expected}: {value!r}')
+    if op in ORDERED_OPERATORS and kind == 'any':
+        raise ValueError(f'列 {column} 的取值类型不一，仅支持等值比较')
+
+
+def parse_query(body: Dict, columns: Dict[str, str]) -> Dict:
+    """
+    校验并规范化查询
+
+    Args:
+        body: 请求体
+        columns: 数据集的列名（白名单）-> 取值类别（frame_column_kinds / sql_column_kinds）
+
+    Returns:
+        规范化后的查询：filters、group_by、aggregations、columns、order_by、limit
+
+    Raises:
+        ValueError: 查询格式错误、引用了不存在的列或取值类型与列不匹配
+    """
+    allowed = set(columns)
+
+    def check_column(column, where: str) -> str:
+        if not isinstance(column, str) or column not in allowed:
+            raise ValueError(f'{where} 中的列不存在: {column}')
+        return column
+
+    filters = []
+    for item in body.get('filters') or []:
+        if not isinstance(item, dict):
+            raise ValueError('filters 的每一项必须是对象')
+        column = check_column(item.get('column'), 'filters')
+        op = item.get('op', '=')
+        if op not in OPERATORS:
+            raise ValueError(f'不支持的运算符: {op}，可选: {", ".join(OPERATORS)}')
+        value = item.get('value')
+        if op in SET_OPERATORS:
+            if not isinstance(value, list) or not value or len(value) > MAX_SET_VALUES:
+                raise ValueError(f'{op} 的 value 必须是 1~{MAX_SET_VALUES} 个元素的数组')
+        elif op == 'between':
+            if not isinstance(value, list) or len(value) != 2:
+                raise ValueError('between 的 value 必须是 [下限, 上限]')
+        elif op not in NULL_OPERATORS:
+            if value is None or isinstance(value, (list, dict)):
+                raise ValueError(f'{op} 的 value 必须是单个值')
+        if op not in NULL_OPERATORS:
+            for element in value if isinstance(value, list) else [value]:
+                _check_value(column, columns[column], op, element)
+        filters.append({'column': column, 'op': op, 'value': value})
+
+    group_by = [check_column(c, 'group_by') for c in body.get('group_by') or []]
+
+    aggregations = []
+    for item in body.get('aggregations') or []:
+        if not isinstance(item, dict):
+            raise ValueError('aggregations 的每一项必须是对象')
+        func = item.get('func')
+        if func not in AGGREGATIONS:
+            raise ValueError(f'不支持的聚合函数: {func}，可选: {", ".join(AGGREGATIONS)}')
+        column = item.get('column')
+        if column is None and func != 'count':
+            raise ValueError(f'{func} 需要指定 column')
+        if column is not None:
+            check_column(column, 'aggregations')
+            if func in NUMERIC_AGGREGATIONS and columns[column] not in ('number', 'bool'):
+                raise ValueError(f'{func} 只能用于数值列: {column}')
+        name = item.get('as') or (f"{func}_{column}" if column else 'count')
+        aggregations.append({'func': func, 'column': column, 'as': str(name)})
+
+    if aggregations or group_by:
+        output = group_by + [agg['as'] for agg in aggregations]
+        if len(set(output)) != len(output):
+            raise ValueError('group_by 与聚合结果的列名重复')
+        projection = None
+    else:
+        projection = [check_column(c, 'columns') for c in body.get('columns') or []] or list(columns)
+        output = projection
+
+    order_by = []
+    for item in body.get('order_by') or []:
+        if isinstance(item, str):
+            item = {'column': item}
+        column = item.get('column') if isinstance(item, dict) else None
+        if column not in output:
+            raise ValueError(f'order_by 中的列不在结果中: {column}')
+        order_by.append({'column': column, 'desc': bool(item.get('desc', False))})
+
+    try:
+        limit = int(body.get('limit', DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        raise ValueError('limit 必须是整数')
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f'limit 取值范围为 1~{MAX_LIMIT}')
+
+    return {
+        'filters': filters,
+        'group_by': group_by,
+        'aggregations': aggregations,
+        'columns': projection,
+        'order_by': order_by,
+        'limit': limit,
+    }
+
+
+def compile_sql(table: str, query: Dict) -> Tuple[str, list]:
+    """
+    将规范化后的查询编译为参数化 SQL
+
+    Returns:
+        (SQL, 参数)；多取一行用于判断结果是否被截断
+    """
+    where, params = [], []
+    for item in query['filters']:
+        column, op, value = _quote(item['column']), item['op'], item['value']
+        if op in COMPARISONS:
+            where.append(f"{column} {COMPARISONS[op]} ?")
+            params.append(value)
+        elif op in SET_OPERATORS:
+            placeholders = ', '.join('?' * len(value))
+            where.append(f"{column} {'IN' if op == 'in' else 'NOT IN'} ({placeholders})")
+            params.extend(value)
+        elif op == 'between':
+            where.append(f"{column} BETWEEN ? AND ?")
+            params.extend(value)
+        else:
+            where.append(f"{column} IS {'NULL' if op == 'is_null' else 'NOT NULL'}")
+
+    if query['aggregations'] or query['group_by']:
+        select = [_quote(c) for c in query['group_by']]
+        for agg in query['aggregations']:
+            argument = _quote(agg['column']) if agg['column'] else '*'
+            select.append(f"{AGGREGATIONS[agg['func']]}({argument}) AS {_quote(agg['as'])}")
+    else:
+        select = [_quote(c) for c in query['columns']]
+
+    sql = f"SELECT {', '.join(select)} FROM {_quote(table)}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if query['group_by']:
+        sql += " GROUP BY " + ", ".join(_quote(c) for c in query['group_by'])
+    if query['order_by']:
+        sql += " ORDER BY " + ", ".join(
+            f"{_quote(item['column'])} {'DESC' if item['desc'] else 'ASC'}" for item in query['order_by']
+        )
+    sql += " LIMIT ?"
+    params.append(query['limit'] + 1)
+    return sql, params
+
+
+def filter_mask(df: pd.DataFrame, filters: List[Dict]) -> Optional[np.ndarray]:
+    """
+    逐个谓词在列数组上求值并合并为布尔掩码（与 SQL 一致：与空值的比较不成立）
+
+    Returns:
+        布尔掩码；没有过滤条件时为 None
+    """
+    mask = None
+    for item in filters:
+        series = df[item['column']]
+        op, value = item['op'], item['value']
+        if op in ORDERED_OPERATORS and isinstance(series.dtype, pd.CategoricalDtype):
+            # 无序 category 不支持大小比较，按取值比较
+            series = series.astype(object)
+        if op == 'is_null':
+            current = series.isna().to_numpy()
+        elif op == 'not_null':
+            current = series.notna().to_numpy()
+        else:
+            if op == '=':
+                current = series == value
+            elif op == '!=':
+                current = (series != value) & series.notna()
+            elif op == '<':
+                current = series < value
+            elif op == '<=':
+                current = series <= value
+            elif op == '>':
+                current = series > value
+            elif op == '>=':
+                current = series >= value
+            elif op == 'in':
+                current = series.isin(value)
+            elif op == 'not_in':
+                current = ~series.isin(value) & series.notna()
+            else:
+                current = (series >= value[0]) & (series <= value[1])
+            current = current.to_numpy(dtype=bool, na_value=False)
+        mask = current if mask is None else mask & current
+        if not mask.any():
+            break
+    return mask
+
+
+def execute_frame(df: pd.DataFrame, query: Dict, decimals: Optional[Dict[str, Optional[int]]] = None) -> pd.DataFrame:
+    """
+    在内存中的列式数据上执行查询（先过滤，再只取需要的列做投影或分组聚合）
+
+    Args:
+        df: 数据集
+        query: parse_query 规范化后的查询
+        decimals: float32 列 -> 小数位数（float32_decimals），用于还原十进制取值
+    """
+    decimals = decimals or {}
+    needed = set(query['group_by']) | {a['column'] for a in query['aggregations'] if a['column']}
+    if not (query['aggregations'] or query['group_by']):
+        needed |= set(query['columns'])
+    mask = filter_mask(df, query['filters'])
+    # 只取需要的列，避免复制整个数据集
+    subset = df[[c for c in df.columns if c in needed]]
+    if mask is not None:
+        subset = subset[mask]
+    # float32 列拓宽为 float64 并按列的小数位数还原十进制取值再聚合，结果与 SQLite 的 REAL 一致；
+    # 被聚合的 category 列按普通取值聚合（无序 category 不支持 min/max）
+    float32 = {
+        c: as_float64(subset[c]) if decimals.get(c) is None else np.round(as_float64(subset[c]), decimals[c])
+        for c in subset.columns if subset[c].dtype == np.float32
+    }
+    if float32:
+        subset = subset.assign(**float32)
+
+    def aggregated_values(column: str) -> pd.Series:
+        values = subset[column]
+        return values.astype(object) if isinstance(values.dtype, pd.CategoricalDtype) else values
+
+    if query['aggregations'] or query['group_by']:
+        if query['group_by']:
+            keys = [subset[c] for c in query['group_by']]
+            grouped = subset.groupby(keys, observed=True, dropna=False, sort=False)
+            parts = {}
+            for agg in query['aggregations']:
+                if agg['column'] is None:
+                    parts[agg['as']] = grouped.size()
+                else:
+                    func = 'mean' if agg['func'] == 'avg' else agg['func']
+                    values = aggregated_values(agg['column'])
+                    parts[agg['as']] = values.groupby(keys, observed=True, dropna=False, sort=False).agg(func)
+            result = pd.DataFrame(parts) if parts else pd.DataFrame(index=grouped.size().index)
+            result = result.reset_index()
+        else:
+            row = {}
+            for agg in query['aggregations']:
+                if agg['column'] is None:
+                    row[agg['as']] = len(subset)
+                else:
+                    func = 'mean' if agg['func'] == 'avg' else agg['func']
+                    values = aggregated_values(agg['column'])
+                    row[agg['as']] = values.agg(func) if values.notna().any() or func == 'count' else None
+            result = pd.DataFrame([row])
+    else:
+        result = subset[query['columns']]
+
+    if query['order_by']:
+        # 与 SQLite 一致：升序时空值在前，降序时空值在后
+        columns = [item['column'] for item in query['order_by']]
+        ascending = [not item['desc'] for item in query['order_by']]
+        result = result.sort_values(columns, ascending=ascending, kind='stable',
+                                    na_position='first' if ascending[0] else 'last')
+    return result.head(query['limit'] + 1)
+
+
+def _with_component(df: pd.DataFrame, path: pathlib.Path, default: str) -> pd.DataFrame:
+    """附加 component 列（与数据仓库的表结构一致）"""
+    df = df.copy()
+    df.insert(0, 'component', pd.Categorical([component_from_filename(path, default)] * len(df)))
+    return df
+
+
+def load_query_frame(dataset: str, data_dir: pathlib.Path) -> Tuple[Optional[pd.DataFrame], str]:
+    """
+    内存查询使用的数据集（最新的测试结果文件；按数据集版本缓存）
+
+    Returns:
+        (DataFrame 或 None, 数据集版本)
+    """
+    if dataset == 'normalized':
+        db_csv = resolve_db_csv(data_dir)
+        mq_csv = resolve_mq_summary_csv(data_dir)
+        ts_csv = resolve_mq_timeseries_for(data_dir, mq_csv) if mq_csv else None
+        version = dataset_version(db_csv, mq_csv, ts_csv)
+
+        def build():
+            frames = []
+            if db_csv is not None:
+                frames.append(load_normalized(db_csv, 'DB', component_from_filename(db_csv, 'KingbaseES')))
+            if mq_csv is not None:
+                frames.append(load_normalized(mq_csv, 'MQ', component_from_filename(mq_csv, 'RabbitMQ'),
+                                              timeseries_path=ts_csv))
+            return pd.concat(frames, ignore_index=True) if frames else None
+    else:
+        resolve = {
+            'kbbench': resolve_db_csv,
+            'perftest_summary': resolve_mq_summary_csv,
+            'perftest_timeseries': resolve_mq_timeseries_csv,
+        }[dataset]
+        path = resolve(data_dir)
+        version = dataset_version(path)
+        default = 'KingbaseES' if DATASETS[dataset] == 'DB' else 'RabbitMQ'
+
+        def build():
+            if path is None or not path.exists():
+                return None
+            return _with_component(load_csv_cached(path), path, default)
+
+    return cached_derived(('query_frame', dataset, version), build), version
+
+
+def result_rows(df: pd.DataFrame) -> List[Dict]:
+    """结果转换为记录列表（numpy 标量转为 Python 类型，空值为 None）"""
+    rows = []
+    columns = list(df.columns)
+    for values in zip(*(df[c].to_numpy(dtype=object) for c in columns)):
+        rows.append({
+            column: None if value is None or (isinstance(value, float) and np.isnan(value))
+            else to_python_scalar(value)
+            for column, value in zip(columns, values)
+        })
+    return rows
+
+
+@traced('query.run')
+def run_query(body: Dict, warehouse=None, data_dir: pathlib.Path = pathlib.Path('datas')) -> Dict:
+    """
+    执行查询：启用数据仓库时编译为 SQL 在 SQLite 中执行，否则在内存列式数据上向量化执行
+
+    Raises:
+        ValueError: 查询格式错误
+        LookupError: 数据集不存在
+    """
+    dataset = body.get('dataset')
+    if not isinstance(dataset, str) or dataset not in DATASETS:
+        raise ValueError(f'dataset 仅支持 {", ".join(DATASETS)}')
+
+    if warehouse is not None:
+        if not warehouse.has_table(dataset):
+            raise LookupError(f'数据仓库中没有 {dataset} 数据')
+        columns = sql_column_kinds(warehouse.query(f"PRAGMA table_info({_quote(dataset)})"))
+        query = parse_query(body, columns)
+        sql, params = compile_sql(dataset, query)
+        result = warehouse.query_frame(sql, tuple(params))
+        backend, version = 'warehouse', dataset_version(pathlib.Path(warehouse.db_path))
+    else:
+        df, version = load_query_frame(dataset, data_dir)
+        if df is None:
+            raise LookupError(f'未找到 {dataset} 数据文件')
+        query = parse_query(body, frame_column_kinds(df))
+        decimals = cached_derived(('query_decimals', dataset, version), lambda: {
+            c: float32_decimals(df[c]) for c in df.columns if df[c].dtype == np.float32
+        })
+        result = execute_frame(df, query, decimals)
+        backend = 'memory'
+
+    truncated = len(result) > query['limit']
+    result = result.head(query['limit'])
+    return {
+        'dataset': dataset,
+        'backend': backend,
+        'dataset_version': version,
+        'columns': list(result.columns),
+        'rows': result_rows(result),
+        'row_count': len(result),
+        'truncated': truncated,
+    }
+
+
+def dataset_schema(warehouse=None, data_dir: pathlib.Path = pathlib.Path('datas')) -> Dict[str, List[Dict]]:
+    """各数据集可查询的列及类型"""
+    schema = {}
+    for dataset in DATASETS:
+        if warehouse is not None:
+            if warehouse.has_table(dataset):
+                table_info = warehouse.query(f"PRAGMA table_info({_quote(dataset)})")
+                kinds = sql_column_kinds(table_info)
+                schema[dataset] = [{'name': row['name'], 'type': row['type'] or 'ANY', 'kind': kinds[row['name']]}
+                                   for row in table_info]
+            continue
+        df, _ = load_query_frame(dataset, data_dir)
+        if df is not None:
+            kinds = frame_column_kinds(df)
+            schema[dataset] = [{'name': str(c), 'type': str(df[c].dtype), 'kind': kinds[c]} for c in df.columns]
+    return schema
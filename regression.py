@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能回归检测：把新一轮测试的归一化指标与同配置的基线比较，输出机器可读的通过/失败报告
+
+1. 基线文件（JSON）按 组件类型/组件 → 测试配置 → 指标 保存各次测试的原始样本
+   （DB 配置为 clients/jobs，MQ 配置为 producers/consumers/size_bytes/target_rate_msg_s）
+2. 每个 (配置, 指标) 用稳健统计量比较：中位数变化、基线 MAD 下的稳健 z 值，
+   两侧样本足以达到显著性水平时再做 Mann–Whitney U 检验（小样本精确分布，否则正态近似）
+3. 指标按方向判定：变差幅度超过容忍度且统计显著时为回归（fail）；
+   样本不足以做显著性检验时只按容忍度判定
+
+用法：
+    python collect_and_normalize.py --baseline datas/baseline.json --update-baseline   # 记录基线
+    python collect_and_normalize.py --baseline datas/baseline.json --regression-report report.json
+"""
+
+import itertools
+import json
+import math
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from normalize_metrics import as_float64, to_python_scalar
+
+
+BASELINE_FORMAT = 1
+
+# 同一配置的判定键
+CONFIG_KEYS = {
+    'DB': ('clients', 'jobs'),
+    'MQ': ('producers', 'consumers', 'size_bytes', 'target_rate_msg_s'),
+}
+
+# 比较的指标及方向：1 为越大越好，-1 为越小越好
+REGRESSION_METRICS = {
+    'DB': {'tps_per_core': 1, 'latency_ms': -1, 'avg_cpu_percent': -1},
+    'MQ': {'msg_per_sec_per_core': 1, 'worst_p95_ms': -1, 'avg_cpu_percent': -1},
+}
+
+DEFAULT_TOLERANCE_PCT = 5.0
+DEFAULT_ALPHA = 0.05
+# 只有基线有足够样本时使用：稳健 z 值超过该值视为显著
+ROBUST_Z_THRESHOLD = 3.0
+MIN_SAMPLES_FOR_TEST = 3
+# 组合数不超过该值时计算 Mann–Whitney U 的精确分布
+EXACT_MAX_COMBINATIONS = 20000
+
+
+def _config_value(value):
+    """配置取值（合并 DB/MQ 结果后整数列会变为浮点，整数值还原为 int）"""
+    value = to_python_scalar(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _config_key(component_type: str, row: Dict) -> str:
+    """测试配置的字符串键（如 clients=350,jobs=4）"""
+    return ','.join(f"{key}={_config_value(row[key])}" for key in CONFIG_KEYS[component_type] if key in row)
+
+
+def collect_samples(normalized_df: pd.DataFrame) -> Dict[str, Dict]:
+    """
+    按 组件 → 配置 → 指标 收集样本
+
+    Args:
+        normalized_df: batch_process 合并后的归一化指标（可同时包含 DB 和 MQ）
+
+    Returns:
+        {'DB/KingbaseES': {'clients=350,jobs=4': {'tps_per_core': [...], ...}}}
+    """
+    samples: Dict[str, Dict] = {}
+    for (component_type, component), group in normalized_df.groupby(['component_type', 'component'], observed=True):
+        component_type = str(component_type)
+        if component_type not in CONFIG_KEYS:
+            continue
+        keys = [key for key in CONFIG_KEYS[component_type] if key in group.columns]
+        metrics = [m for m in REGRESSION_METRICS[component_type] if m in group.columns]
+        configs: Dict[str, Dict] = {}
+        for values, config_rows in group.groupby(keys, observed=True, sort=True):
+            config = _config_key(component_type, dict(zip(keys, values if isinstance(values, tuple) else (values,))))
+            configs[config] = {}
+            for metric in metrics:
+                column = as_float64(config_rows[metric].to_numpy())
+                column = column[~np.isnan(column)]
+                if len(column):
+                    configs[config][metric] = [round(float(v), 6) for v in column]
+        samples[f"{component_type}/{component}"] = configs
+    return samples
+
+
+def write_baseline(path: str, normalized_df: pd.DataFrame, sources: Optional[Dict] = None) -> Dict:
+    """以当前归一化指标作为基线写入文件（先写临时文件再原子替换）"""
+    baseline = {
+        'format': BASELINE_FORMAT,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'sources': sources or {},
+        'components': collect_samples(normalized_df),
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return baseline
+
+
+def load_baseline(path: str) -> Optional[Dict]:
+    """读取基线文件；不存在时返回 None"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('format') != BASELINE_FORMAT:
+        raise ValueError(f"基线文件格式版本 {baseline.get('format')} 与当前版本 {BASELINE_FORMAT} 不一致")
+    return baseline
+
+
+def mad(values: np.ndarray) -> float:
+    """中位数绝对偏差（乘 1.4826 换算为正态分布下的标准差估计）"""
+    return float(np.median(np.abs(values - np.median(values))) * 1.4826)
+
+
+def mann_whitney_u(x: np.ndarray, y: np.ndarray) -> Dict:
+    """
+    Mann–Whitney U 检验（双侧）
+
+    组合数较小时枚举秩的全部分配得到精确 p 值，否则使用带结校正的正态近似
+
+    Returns:
+        {'u': x 的 U 统计量, 'p_value': 双侧 p 值, 'exact': 是否精确}
+    """
+    n1, n2 = len(x), len(y)
+    combined = np.concatenate([x, y])
+    ranks = pd.Series(combined).rank(method='average').to_numpy()
+    r1 = ranks[:n1].sum()
+    u = r1 - n1 * (n1 + 1) / 2.0
+    mean_u = n1 * n2 / 2.0
+
+    if math.comb(n1 + n2, n1) <= EXACT_MAX_COMBINATIONS:
+        # 精确分布：x 的秩和在全部 C(n1+n2, n1) 种分配下的取值
+        index = np.array(list(itertools.combinations(range(n1 + n2), n1)))
+        all_u = ranks[index].sum(axis=1) - n1 * (n1 + 1) / 2.0
+        p_value = float(np.mean(np.abs(all_u - mean_u) >= abs(u - mean_u) - 1e-9))
+        return {'u': float(u), 'p_value': min(p_value, 1.0), 'exact': True}
+
+    _, counts = np.unique(combined, return_counts=True)
+    n = n1 + n2
+    tie_term = (counts ** 3 - counts).sum() / (n * (n - 1))
+    sigma = math.sqrt(n1 * n2 / 12.0 * ((n + 1) - tie_term))
+    if sigma == 0:
+        return {'u': float(u), 'p_value': 1.0, 'exact': False}
+    # 连续性校正
+    z = (abs(u - mean_u) - 0.5) / sigma
+    p_value = math.erfc(max(z, 0.0) / math.sqrt(2))
+    return {'u': float(u), 'p_value': min(p_value, 1.0), 'exact': False}
+
+
+def compare_metric(baseline: List[float], current: List[float], direction: int,
+                   tolerance_pct: float = DEFAULT_TOLERANCE_PCT, alpha: float = DEFAULT_ALPHA) -> Dict:
+    """
+    比较单个指标的基线样本和当前样本
+
+    Args:
+        baseline: 基线样本
+        current: 当前样本
+        direction: 1 为越大越好，-1 为越小越好
+        tolerance_pct: 允许的变差幅度（%）
+        alpha: 显著性水平
+
+    Returns:
+        中位数、变化幅度、稳健 z 值、p 值、判定方法和结果（pass/fail）
+    """
+    b = np.asarray(baseline, dtype=np.float64)
+    c = np.asarray(current, dtype=np.float64)
+    baseline_median, current_median = float(np.median(b)), float(np.median(c))
+    baseline_mad = mad(b)
+
+    if baseline_median != 0:
+        change_pct = (current_median - baseline_median) / abs(baseline_median) * 100.0
+    else:
+        change_pct = 0.0 if current_median == 0 else math.copysign(math.inf, current_median)
+    # 正值表示变差
+    degradation_pct = -direction * change_pct
+
+    robust_z = None
+    if baseline_mad > 0:
+        robust_z = (current_median - baseline_median) / baseline_mad
+
+    p_value = None
+    # 样本太少时 Mann–Whitney 的最小可能 p 值（2/C(n1+n2, n1)）达不到显著性水平，改用 MAD
+    testable = (len(b) >= MIN_SAMPLES_FOR_TEST and len(c) >= MIN_SAMPLES_FOR_TEST
+                and 2.0 / math.comb(len(b) + len(c), len(c)) < alpha)
+    if testable:
+        method = 'mann-whitney'
+        p_value = mann_whitney_u(c, b)['p_value']
+        significant = p_value < alpha
+    elif len(b) >= MIN_SAMPLES_FOR_TEST and robust_z is not None:
+        method = 'mad'
+        significant = abs(robust_z) >= ROBUST_Z_THRESHOLD
+    else:
+        method = 'threshold'
+        significant = True
+
+    if degradation_pct > tolerance_pct and significant:
+        verdict = 'regressed'
+    elif degradation_pct < -tolerance_pct and significant:
+        verdict = 'improved'
+    else:
+        verdict = 'unchanged'
+
+    return {
+        'baseline_median': round(baseline_median, 4),
+        'current_median': round(current_median, 4),
+        'change_pct': round(change_pct, 2),
+        'baseline_mad': round(baseline_mad, 4),
+        'robust_z': None if robust_z is None else round(robust_z, 3),
+        'p_value': None if p_value is None else round(p_value, 5),
+        'method': method,
+        'n_baseline': len(b),
+        'n_current': len(c),
+        'verdict': verdict,
+        'status': 'fail' if verdict == 'regressed' else 'pass',
+    }
+
+
+def regression_report(normalized_df: pd.DataFrame, baseline: Optional[Dict], baseline_path: str,
+                      tolerance_pct: float = DEFAULT_TOLERANCE_PCT, alpha: float = DEFAULT_ALPHA) -> Dict:
+    """
+    生成回归检测报告
+
+    Args:
+        normalized_df: 当前测试的归一化指标
+        baseline: load_baseline 读取的基线（None 表示尚无基线）
+        baseline_path: 基线文件路径（写入报告）
+        tolerance_pct: 允许的变差幅度（%）
+        alpha: 显著性水平
+
+    Returns:
+        {'status': 'pass'|'fail'|'no_baseline', 'checks': [...], 'summary': {...}, ...}
+    """
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'baseline': baseline_path,
+        'baseline_created_at': baseline.get('created_at') if baseline else None,
+        'tolerance_pct': tolerance_pct,
+        'alpha': alpha,
+        'checks': [],
+        'missing_in_baseline': [],
+        'missing_in_current': [],
+    }
+    if baseline is None:
+        report['status'] = 'no_baseline'
+        report['summary'] = {'checked': 0, 'failed': 0, 'improved': 0}
+        return report
+
+    current = collect_samples(normalized_df)
+    for component_key in sorted(set(current) | set(baseline['components'])):
+        base_configs = baseline['components'].get(component_key, {})
+        cur_configs = current.get(component_key, {})
+        component_type, _, component = component_key.partition('/')
+        for config in sorted(set(cur_configs) | set(base_configs)):
+            if config not in base_configs:
+                report['missing_in_baseline'].append({'component': component_key, 'config': config})
+                continue
+            if config not in cur_configs:
+                report['missing_in_current'].append({'component': component_key, 'config': config})
+                continue
+            for metric, direction in REGRESSION_METRICS[component_type].items():
+                base_values = base_configs[config].get(metric)
+                cur_values = cur_configs[config].get(metric)
+                if not base_values or not cur_values:
+                    continue
+                check = {
+                    'component': component,
+                    'component_type': component_type,
+                    'config': config,
+                    'metric': metric,
+                    'direction': 'higher_is_better' if direction > 0 else 'lower_is_better',
+                }
+                check.update(compare_metric(base_values, cur_values, direction, tolerance_pct, alpha))
+                report['checks'].append(check)
+
+    failed = sum(check['status'] == 'fail' for check in report['checks'])
+    report['status'] = 'fail' if failed else 'pass'
+    report['summary'] = {
+        'checked': len(report['checks']),
+        'failed': failed,
+        'improved': sum(check['verdict'] == 'improved' for check in report['checks']),
+    }
+    return report
+
+
+def print_regression_report(report: Dict):
+    """打印回归检测结果摘要"""
+    print("\n=== 性能回归检测 ===")
+    if report['status'] == 'no_baseline':
+        print(f"⚠ 基线文件不存在: {report['baseline']}（使用 --update-baseline 记录基线）")
+        return
+    summary = report['summary']
+    print(f"基线: {report['baseline']}（{report['baseline_created_at']} 记录），"
+          f"容忍度 {report['tolerance_pct']}%，显著性水平 {report['alpha']}")
+    for check in report['checks']:
+        if check['verdict'] == 'unchanged':
+            continue
+        mark = '✗' if check['status'] == 'fail' else '✓'
+        label = '回归' if check['verdict'] == 'regressed' else '提升'
+        p_value = '' if check['p_value'] is None else f", p={check['p_value']}"
+        print(f"  {mark} {check['component']} [{check['config']}] {check['metric']}: "
+              f"{check['baseline_median']} → {check['current_median']} ({check['change_pct']:+.2f}%, "
+              f"{label}, {check['method']}{p_value})")
+    if report['missing_in_baseline']:
+        print(f"  ⚠ 基线中没有的配置: {len(report['missing_in_baseline'])} 个")
+    if report['missing_in_current']:
+        print(f"  ⚠ 本次未测试的基线配置: {len(report['missing_in_current'])} 个")
+    result = '通过' if report['status'] == 'pass' else '失败'
+    print(f"结果: {result}（检查 {summary['checked']} 项，回归 {summary['failed']} 项，提升 {summary['improved']} 项）")
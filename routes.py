@@ -2,14 +2,29 @@
 信创组件适配评估系统 - API路由
 """
 
-from flask import jsonify, request
-from app import app, COMPONENTS
+from flask import Response, jsonify, request
+from app import app, get_catalog, reload_components
 import json
 import os
+import numpy as np
 import pandas as pd
 import pathlib
-from typing import Optional, List, Dict
-from normalize_metrics import NormalizedMetrics
+from typing import Optional, Iterable, Iterator, List, Dict
+from normalize_metrics import NormalizedMetrics, as_float64, float32_decimals, memory_report, to_python_scalar
+from datasets import (resolve_db_csv, resolve_mq_summary_csv, resolve_mq_timeseries_csv,
+                      resolve_mq_timeseries_for,
+                      component_from_filename, dataset_version, list_csv_files, load_csv_cached, load_normalized,
+                      cached_derived, resident_data)
+from warehouse import BenchmarkWarehouse
+from singleflight import SingleFlight
+from tracing import annotate, traced
+from scale_planner import DEFAULT_COST_PER_CORE, DEFAULT_COST_PER_GB, parse_node_shapes, plan_scale_out
+from pipeline import pipeline_summary, simulate_pipeline
+from warmup import readiness
+from aliases import dataset_matches, resolve_alias
+from query import (AGGREGATIONS as QUERY_AGGREGATIONS, DATASETS as QUERY_DATASETS, MAX_LIMIT as QUERY_MAX_LIMIT,
+                   OPERATORS as QUERY_OPERATORS, dataset_schema, run_query)
+from timeseries import DOWNSAMPLE_METHODS, TIMESERIES_METRICS, iter_downsample_run, list_runs
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -19,29 +34,78 @@ def health_check():
         'message': '信创组件适配评估系统运行正常'
     })
 
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """就绪检查接口：启动预热完成前返回 503"""
+    state = readiness()
+    return jsonify(state), 200 if state['ready'] else 503
+
 @app.route('/api/components', methods=['GET'])
 def get_components():
     """获取所有组件列表"""
-    return jsonify({
-        'databases': COMPONENTS.get('databases', []),
-        'message_queues': COMPONENTS.get('message_queues', []),
-        'operating_systems': COMPONENTS.get('operating_systems', [])
-    })
+    return jsonify(get_catalog()['listing'])
 
 @app.route('/api/components/databases', methods=['GET'])
 def get_databases():
     """获取数据库组件列表"""
-    return jsonify(COMPONENTS.get('databases', []))
+    return jsonify(get_catalog()['listing']['databases'])
 
 @app.route('/api/components/message-queues', methods=['GET'])
 def get_message_queues():
     """获取消息队列组件列表"""
-    return jsonify(COMPONENTS.get('message_queues', []))
+    return jsonify(get_catalog()['listing']['message_queues'])
 
 @app.route('/api/components/operating-systems', methods=['GET'])
 def get_operating_systems():
     """获取操作系统组件列表"""
-    return jsonify(COMPONENTS.get('operating_systems', []))
+    return jsonify(get_catalog()['listing']['operating_systems'])
+
+def check_admin_token() -> bool:
+    """校验管理接口令牌（未设置 ADMIN_TOKEN 时管理接口一律拒绝）"""
+    admin_token = os.environ.get('ADMIN_TOKEN')
+    return bool(admin_token) and request.headers.get('X-Admin-Token') == admin_token
+
+@app.route('/api/admin/reload', methods=['POST'])
+def reload_catalog():
+    """
+    重新加载组件数据（原子替换，不影响正在处理的请求）
+
+    只替换处理本次请求的工作进程中的快照；多进程部署（gunicorn 等）需设置
+    COMPONENTS_WATCH_INTERVAL，由每个进程各自的文件监听线程完成重载
+    """
+    if not check_admin_token():
+        return jsonify({'error': '无权执行该操作（需配置 ADMIN_TOKEN 并携带 X-Admin-Token 请求头）'}), 403
+    
+    force = request.args.get('force', 'false').lower() in ('1', 'true', 'yes')
+    
+    try:
+        catalog, reloaded = reload_components(force=force)
+    except Exception as e:
+        return jsonify({'error': f'组件数据重载失败: {str(e)}'}), 500
+    
+    return jsonify({
+        'reloaded': reloaded,
+        'version': catalog['version'],
+        'source': catalog['source'],
+        'loaded_at': catalog['loaded_at'],
+        'counts': {k: len(v) for k, v in catalog['listing'].items()}
+    })
+
+@app.route('/api/debug/memory', methods=['GET'])
+def debug_memory():
+    """调试接口：本工作进程各缓存实际持有的数据集及其内存占用"""
+    if not check_admin_token():
+        return jsonify({'error': '无权执行该操作（需配置 ADMIN_TOKEN 并携带 X-Admin-Token 请求头）'}), 403
+    
+    frames, arrays = resident_data()
+    report = memory_report(frames)
+    arrays_bytes = sum(arrays.values())
+    
+    return jsonify({
+        'frames': report,
+        'arrays': {'items': arrays, 'total_bytes': arrays_bytes},
+        'total_bytes': report['total_bytes'] + arrays_bytes
+    })
 
 @app.route('/api/adaptation/component-based', methods=['POST'])
 def component_based_adaptation():
@@ -140,12 +204,13 @@ def calculate_compatibility_score(db, mq, os):
 def get_component_recommendations(db, mq, os):
     """获取组件推荐"""
     recommendations = []
+    listing = get_catalog()['listing']
     
     # 数据库推荐
     if db:
         recommendations.append({
             'type': 'database',
-            'recommended': COMPONENTS.get('databases', [])[:3],
+            'recommended': listing['databases'][:3],
             'reason': '基于协议兼容性推荐'
         })
     
@@ -153,7 +218,7 @@ def get_component_recommendations(db, mq, os):
     if mq:
         recommendations.append({
             'type': 'message_queue',
-            'recommended': COMPONENTS.get('message_queues', [])[:3],
+            'recommended': listing['message_queues'][:3],
             'reason': '基于性能表现推荐'
         })
     
@@ -168,74 +233,132 @@ def get_dependencies(db, mq, os):
         'os_requirements': ['Linux内核3.10+']
     }
 
-def get_task_recommendations_from_csv(task_type, max_response_time, min_throughput, resource_constraints):
-    """根据任务约束从CSV数据中获取推荐"""
-    recommendations = []
-    data_dir = pathlib.Path('datas')
+def get_warehouse() -> Optional[BenchmarkWarehouse]:
+    """
+    获取数据仓库（设置环境变量 WAREHOUSE_PATH 且文件存在时启用）
     
-    if not data_dir.exists():
-        return recommendations
+    未启用时返回 None，路由回退为直接读取CSV文件
+    """
+    global _warehouse
+    db_path = os.environ.get('WAREHOUSE_PATH')
+    if not db_path or not os.path.exists(db_path):
+        return None
+    if _warehouse is None or _warehouse.db_path != db_path:
+        _warehouse = BenchmarkWarehouse(db_path)
+    return _warehouse
+
+_warehouse = None
+
+def metric_value(row, key: str) -> float:
+    """读取记录中的数值指标（缺失时为0）"""
+    return float(row.get(key) or 0)
+
+def select_best_db_run(max_latency_ms: Optional[float] = None, min_tps: Optional[float] = None):
+    """
+    选择最新测试结果文件中TPS最高的有效数据库测试记录
+    
+    启用数据仓库时按该文件走索引范围查询，否则在缓存的CSV数据上过滤，两种方式结果一致
+    （仓库构建早于该文件时回退为读取CSV）
+    
+    Returns:
+        (组件名, 记录字典)，无满足条件的记录时返回 None
+    """
+    db_csv = resolve_db_csv(pathlib.Path('datas'))
+    if db_csv is None or not db_csv.exists():
+        return None
+    component = component_from_filename(db_csv, 'KingbaseES')
+    
+    warehouse = get_warehouse()
+    if warehouse is not None and warehouse.has_source('kbbench', db_csv.name):
+        row = warehouse.best_db_run(db_csv.name, max_latency_ms, min_tps or 0)
+        return (row['component'], row) if row else None
+    
+    df_db = load_csv_cached(db_csv)
+    # 过滤满足条件的记录：延迟 <= max_latency_ms, TPS >= min_tps
+    mask = df_db['return_code'] == 0
+    if max_latency_ms is not None:
+        mask &= df_db['latency_ms_avg'] <= max_latency_ms
+    if min_tps is not None:
+        mask &= df_db['tps_excluding'] >= min_tps
+    valid_db = df_db[mask]
+    if len(valid_db) == 0:
+        return None
+    
+    best_db = valid_db.loc[valid_db['tps_excluding'].idxmax()]
+    return component, best_db.map(to_python_scalar).to_dict()
+
+def select_best_mq_run(max_p95_ms: Optional[float] = None, min_throughput: Optional[float] = None):
+    """
+    选择最新测试汇总文件中吞吐最高的成功消息队列测试记录
     
-    # 查找数据库CSV文件
-    db_csv = data_dir / "results.csv"
-    if not db_csv.exists():
-        db_csv = find_latest_csv(data_dir, "*_kbbench_results_*.csv")
-    if db_csv is None:
-        db_csv = find_latest_csv(data_dir, "*kbbench*.csv")
+    启用数据仓库时按该文件走索引范围查询，否则在缓存的CSV数据上过滤，两种方式结果一致
+    （仓库构建早于该文件时回退为读取CSV）
     
-    # 查找消息队列CSV文件
-    mq_csv = find_latest_csv(data_dir, "*perftest_summary_*.csv")
+    Returns:
+        (组件名, 记录字典)，无满足条件的记录时返回 None
+    """
+    mq_csv = resolve_mq_summary_csv(pathlib.Path('datas'))
+    if mq_csv is None or not mq_csv.exists():
+        return None
+    component = component_from_filename(mq_csv, 'RabbitMQ')
+    
+    warehouse = get_warehouse()
+    if warehouse is not None and warehouse.has_source('perftest_summary', mq_csv.name):
+        row = warehouse.best_mq_run(mq_csv.name, max_p95_ms, min_throughput or 0)
+        return (row['component'], row) if row else None
+    
+    df_mq = load_csv_cached(mq_csv)
+    # 过滤满足条件的记录：P95延迟 <= max_p95_ms, 吞吐量 >= min_throughput
+    mask = df_mq['success'] == True
+    if max_p95_ms is not None:
+        mask &= df_mq['worst_p95_ms'] <= max_p95_ms
+    if min_throughput is not None:
+        mask &= df_mq['avg_received_msg_s'] >= min_throughput
+    valid_mq = df_mq[mask]
+    if len(valid_mq) == 0:
+        return None
+    
+    best_mq = valid_mq.loc[valid_mq['avg_received_msg_s'].idxmax()]
+    return component, best_mq.map(to_python_scalar).to_dict()
+
+def get_task_recommendations_from_csv(task_type, max_response_time, min_throughput, resource_constraints):
+    """根据任务约束从CSV数据中获取推荐"""
+    recommendations = []
     
     db_data = None
     mq_data = None
     
-    # 加载数据库数据
-    if db_csv and db_csv.exists():
-        try:
-            df_db = pd.read_csv(db_csv)
-            # 过滤满足条件的记录：延迟 <= max_response_time, TPS >= min_throughput
-            valid_db = df_db[
-                (df_db['latency_ms_avg'] <= max_response_time) &
-                (df_db['tps_excluding'] >= min_throughput) &
-                (df_db['return_code'] == 0)
-            ]
-            if len(valid_db) > 0:
-                # 选择最佳性能记录（最高TPS）
-                best_db = valid_db.loc[valid_db['tps_excluding'].idxmax()]
-                db_data = {
-                    'component': db_csv.name.split('_')[0] if '_' in db_csv.name else 'Unknown',
-                    'tps': float(best_db['tps_excluding']),
-                    'latency_ms': float(best_db['latency_ms_avg']),
-                    'cpu_usage': float(best_db.get('avg_cpu_percent', 0)),
-                    'memory_usage': float(best_db.get('avg_memory_percent', 0)),
-                    'memory_gb': float(best_db.get('avg_memory_used_gb', 0))
-                }
-        except Exception as e:
-            print(f"加载数据库CSV数据失败: {e}")
+    # 加载数据库数据：延迟 <= max_response_time, TPS >= min_throughput 中TPS最高的记录
+    try:
+        selected = select_best_db_run(max_response_time, min_throughput)
+        if selected:
+            component, best_db = selected
+            db_data = {
+                'component': component,
+                'tps': float(best_db['tps_excluding']),
+                'latency_ms': float(best_db['latency_ms_avg']),
+                'cpu_usage': metric_value(best_db, 'avg_cpu_percent'),
+                'memory_usage': metric_value(best_db, 'avg_memory_percent'),
+                'memory_gb': metric_value(best_db, 'avg_memory_used_gb')
+            }
+    except Exception as e:
+        print(f"加载数据库CSV数据失败: {e}")
     
-    # 加载消息队列数据
-    if mq_csv and mq_csv.exists():
-        try:
-            df_mq = pd.read_csv(mq_csv)
-            # 过滤满足条件的记录：延迟 <= max_response_time, 吞吐量 >= min_throughput
-            valid_mq = df_mq[
-                (df_mq['worst_p95_ms'] <= max_response_time) &
-                (df_mq['avg_received_msg_s'] >= min_throughput) &
-                (df_mq['success'] == True)
-            ]
-            if len(valid_mq) > 0:
-                # 选择最佳性能记录（最高吞吐量）
-                best_mq = valid_mq.loc[valid_mq['avg_received_msg_s'].idxmax()]
-                mq_data = {
-                    'component': mq_csv.name.split('_')[0] if '_' in mq_csv.name else 'Unknown',
-                    'throughput': float(best_mq['avg_received_msg_s']),
-                    'latency_p95_ms': float(best_mq['worst_p95_ms']),
-                    'cpu_usage': float(best_mq.get('avg_cpu_percent', 0)),
-                    'memory_usage': float(best_mq.get('avg_memory_percent', 0)),
-                    'memory_gb': float(best_mq.get('avg_memory_used_gb', 0))
-                }
-        except Exception as e:
-            print(f"加载消息队列CSV数据失败: {e}")
+    # 加载消息队列数据：P95延迟 <= max_response_time, 吞吐量 >= min_throughput 中吞吐最高的记录
+    try:
+        selected = select_best_mq_run(max_response_time, min_throughput)
+        if selected:
+            component, best_mq = selected
+            mq_data = {
+                'component': component,
+                'throughput': float(best_mq['avg_received_msg_s']),
+                'latency_p95_ms': float(best_mq['worst_p95_ms']),
+                'cpu_usage': metric_value(best_mq, 'avg_cpu_percent'),
+                'memory_usage': metric_value(best_mq, 'avg_memory_percent'),
+                'memory_gb': metric_value(best_mq, 'avg_memory_used_gb')
+            }
+    except Exception as e:
+        print(f"加载消息队列CSV数据失败: {e}")
     
     # 构建推荐结果
     if db_data and mq_data:
@@ -267,70 +390,116 @@ def get_task_recommendations_from_csv(task_type, max_response_time, min_throughp
 def get_performance_data_from_csv(db, mq):
     """从CSV数据中获取性能数据"""
     result = {}
-    data_dir = pathlib.Path('datas')
-    
-    if not data_dir.exists():
-        return result
     
     # 获取数据库性能数据
     if db:
-        db_csv = data_dir / "results.csv"
-        if not db_csv.exists():
-            db_csv = find_latest_csv(data_dir, "*_kbbench_results_*.csv")
-        if db_csv is None:
-            db_csv = find_latest_csv(data_dir, "*kbbench*.csv")
-        
-        if db_csv and db_csv.exists():
-            try:
-                df_db = pd.read_csv(db_csv)
-                # 过滤有效记录
-                valid_db = df_db[df_db['return_code'] == 0]
-                if len(valid_db) > 0:
-                    # 计算平均值或使用最佳值
-                    best_db = valid_db.loc[valid_db['tps_excluding'].idxmax()]
-                    result['database'] = {
-                        'throughput_tps': float(best_db['tps_excluding']),
-                        'latency_ms_avg': float(best_db['latency_ms_avg']),
-                        'cpu_usage_percent': float(best_db.get('avg_cpu_percent', 0)),
-                        'memory_usage_percent': float(best_db.get('avg_memory_percent', 0)),
-                        'memory_used_gb': float(best_db.get('avg_memory_used_gb', 0))
-                    }
-            except Exception as e:
-                print(f"加载数据库性能数据失败: {e}")
+        try:
+            selected = select_best_db_run()
+            if selected:
+                # 使用最佳值（最高TPS）
+                _, best_db = selected
+                result['database'] = {
+                    'throughput_tps': float(best_db['tps_excluding']),
+                    'latency_ms_avg': float(best_db['latency_ms_avg']),
+                    'cpu_usage_percent': metric_value(best_db, 'avg_cpu_percent'),
+                    'memory_usage_percent': metric_value(best_db, 'avg_memory_percent'),
+                    'memory_used_gb': metric_value(best_db, 'avg_memory_used_gb')
+                }
+        except Exception as e:
+            print(f"加载数据库性能数据失败: {e}")
     
     # 获取消息队列性能数据
     if mq:
-        mq_csv = find_latest_csv(data_dir, "*perftest_summary_*.csv")
-        
-        if mq_csv and mq_csv.exists():
-            try:
-                df_mq = pd.read_csv(mq_csv)
-                # 过滤成功记录
-                valid_mq = df_mq[df_mq['success'] == True]
-                if len(valid_mq) > 0:
-                    # 选择最佳性能记录
-                    best_mq = valid_mq.loc[valid_mq['avg_received_msg_s'].idxmax()]
-                    result['message_queue'] = {
-                        'throughput_msg_per_sec': float(best_mq['avg_received_msg_s']),
-                        'latency_p95_ms': float(best_mq['worst_p95_ms']),
-                        'cpu_usage_percent': float(best_mq.get('avg_cpu_percent', 0)),
-                        'memory_usage_percent': float(best_mq.get('avg_memory_percent', 0)),
-                        'memory_used_gb': float(best_mq.get('avg_memory_used_gb', 0))
-                    }
-            except Exception as e:
-                print(f"加载消息队列性能数据失败: {e}")
+        try:
+            selected = select_best_mq_run()
+            if selected:
+                # 选择最佳性能记录
+                _, best_mq = selected
+                result['message_queue'] = {
+                    'throughput_msg_per_sec': float(best_mq['avg_received_msg_s']),
+                    'latency_p95_ms': float(best_mq['worst_p95_ms']),
+                    'cpu_usage_percent': metric_value(best_mq, 'avg_cpu_percent'),
+                    'memory_usage_percent': metric_value(best_mq, 'avg_memory_percent'),
+                    'memory_used_gb': metric_value(best_mq, 'avg_memory_used_gb')
+                }
+        except Exception as e:
+            print(f"加载消息队列性能数据失败: {e}")
     
     return result
 
 # 真实环境数据读取函数
-def find_latest_csv(directory: pathlib.Path, pattern: str) -> Optional[pathlib.Path]:
-    """查找最新的匹配CSV文件"""
-    files = list(directory.glob(pattern))
-    if not files:
-        return None
-    return max(files, key=lambda p: p.stat().st_mtime)
+# 流式响应每块的目标大小（字节）与逐块转换记录时每块的行数
+STREAM_CHUNK_BYTES = 16 * 1024
+RECORD_CHUNK_ROWS = 500
+
+def iter_records(df: pd.DataFrame, limit: int, chunk_rows: int = RECORD_CHUNK_ROWS) -> Iterator[Dict]:
+    """逐块将测试结果DataFrame转换为记录（去除空的可选字段），流式响应边转换边发送"""
+    # 限制返回记录数
+    df = df.head(limit)
+    
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        # 紧凑类型的 float32 列按列的小数位数还原十进制取值
+        float32 = {}
+        for col in chunk.columns:
+            if chunk[col].dtype == np.float32:
+                decimals = float32_decimals(chunk[col])
+                values = as_float64(chunk[col])
+                float32[col] = values if decimals is None else np.round(values, decimals)
+        if float32:
+            chunk = chunk.assign(**float32)
+        # 处理可选字段：将 NaN 和空字符串转换为 None
+        chunk = chunk.replace([pd.NA, pd.NaT, ''], None)
+        # 先转为 object，否则全空的浮点列会把 None 还原为 NaN
+        chunk = chunk.astype(object).where(pd.notnull(chunk), None)
+        
+        # 清理数据：移除空字符串和 None 值的字段（可选字段），但保留数字 0 和 False 值
+        for record in chunk.to_dict('records'):
+            yield {k: v for k, v in record.items() if v is not None and v != ''}
 
-def load_db_csv_data(component: Optional[str] = None, limit: int = 100) -> List[Dict]:
+def records_from_frame(df: pd.DataFrame, limit: int) -> List[Dict]:
+    """将测试结果DataFrame转换为记录列表（去除空的可选字段）"""
+    return list(iter_records(df, limit))
+
+def stream_json(head: Dict, key: str, items: Iterable, pairs: bool = False) -> Response:
+    """
+    以生成器输出 JSON 对象：先输出 head 中的字段，再逐块输出 key 对应的数组
+    （pairs=True 时 items 为 (名称, 值)，输出为对象）
+    
+    响应体为生成器，压缩钩子逐块压缩（compression.compress_chunks），ASGI 入口每块生成后立即发送
+    """
+    def encode(value) -> str:
+        return app.json.dumps(value, separators=(',', ':'))
+    
+    def generate():
+        opening = encode(head)[:-1] + ',' if head else '{'
+        buffer = [opening + encode(key) + (':{' if pairs else ':[')]
+        size, first = len(buffer[0]), True
+        for item in items:
+            text = f"{encode(item[0])}:{encode(item[1])}" if pairs else encode(item)
+            buffer.append(text if first else ',' + text)
+            size += len(text) + 1
+            first = False
+            if size >= STREAM_CHUNK_BYTES:
+                yield ''.join(buffer)
+                buffer, size = [], 0
+        buffer.append('}}' if pairs else ']}')
+        yield ''.join(buffer)
+    
+    return Response(generate(), mimetype='application/json')
+
+def load_warehouse_records(table: str, component: Optional[str], limit: int) -> Iterator[Dict]:
+    """从数据仓库加载测试结果记录（按组件过滤）"""
+    warehouse = get_warehouse()
+    matched = None
+    if component:
+        component_type = 'DB' if table == 'kbbench' else 'MQ'
+        matched = warehouse.find_component(table, resolve_dataset_component(component, component_type))
+        if matched is None:
+            return iter(())
+    return iter_records(warehouse.raw_runs(table, matched, limit), limit)
+
+def load_db_csv_data(component: Optional[str] = None, limit: int = 100) -> Iterator[Dict]:
     """
     加载数据库测试结果CSV数据
     
@@ -339,59 +508,38 @@ def load_db_csv_data(component: Optional[str] = None, limit: int = 100) -> List[
         limit: 返回记录数限制
     
     Returns:
-        数据库测试结果列表
+        数据库测试结果的迭代器（逐块转换，供流式响应使用）
     """
+    if get_warehouse() is not None:
+        try:
+            return load_warehouse_records('kbbench', component, limit)
+        except Exception as e:
+            print(f"加载数据库仓库数据失败: {e}")
+            return iter(())
+    
     data_dir = pathlib.Path('datas')
     if not data_dir.exists():
-        return []
+        return iter(())
     
     # 查找数据库测试结果文件
-    db_csv = data_dir / "results.csv"
-    if not db_csv.exists():
-        db_csv = find_latest_csv(data_dir, "*_kbbench_results_*.csv")
-    if db_csv is None:
-        db_csv = find_latest_csv(data_dir, "*kbbench*.csv")
+    db_csv = resolve_db_csv(data_dir)
     
     if db_csv is None or not db_csv.exists():
-        return []
+        return iter(())
     
     try:
-        df = pd.read_csv(db_csv)
-        
         # 如果指定了组件名称，进行过滤
         if component:
-            # 从文件名或数据中匹配组件名
-            if component.lower() not in db_csv.name.lower():
-                return []
-        
-        # 处理可选字段：将 NaN 和空字符串转换为 None
-        df = df.replace([pd.NA, pd.NaT, ''], None)
-        df = df.where(pd.notnull(df), None)
-        
-        # 限制返回记录数
-        if len(df) > limit:
-            df = df.head(limit)
-        
-        # 转换为字典列表
-        records = df.to_dict('records')
-        
-        # 清理数据：移除空字符串和 None 值的字段（可选字段）
-        # 但保留数字 0 和 False 值
-        cleaned_records = []
-        for record in records:
-            cleaned = {}
-            for k, v in record.items():
-                # 保留所有非 None 和非空字符串的值
-                if v is not None and v != '':
-                    cleaned[k] = v
-            cleaned_records.append(cleaned)
+            # 按别名索引解析组件名后与文件名中的组件名比较
+            if not dataset_matches(db_csv, resolve_dataset_component(component, 'DB')):
+                return iter(())
         
-        return cleaned_records
+        return iter_records(load_csv_cached(db_csv), limit)
     except Exception as e:
         print(f"加载数据库CSV数据失败: {e}")
-        return []
+        return iter(())
 
-def load_mq_csv_data(component: Optional[str] = None, limit: int = 100) -> List[Dict]:
+def load_mq_csv_data(component: Optional[str] = None, limit: int = 100) -> Iterator[Dict]:
     """
     加载消息队列测试结果CSV数据
     
@@ -400,53 +548,376 @@ def load_mq_csv_data(component: Optional[str] = None, limit: int = 100) -> List[
         limit: 返回记录数限制
     
     Returns:
-        消息队列测试结果列表
+        消息队列测试结果的迭代器（逐块转换，供流式响应使用）
     """
+    if get_warehouse() is not None:
+        try:
+            return load_warehouse_records('perftest_summary', component, limit)
+        except Exception as e:
+            print(f"加载消息队列仓库数据失败: {e}")
+            return iter(())
+    
     data_dir = pathlib.Path('datas')
     if not data_dir.exists():
-        return []
+        return iter(())
     
     # 查找消息队列测试结果文件
-    mq_csv = find_latest_csv(data_dir, "*perftest_summary_*.csv")
+    mq_csv = resolve_mq_summary_csv(data_dir)
     
     if mq_csv is None or not mq_csv.exists():
-        return []
+        return iter(())
     
     try:
-        df = pd.read_csv(mq_csv)
-        
         # 如果指定了组件名称，进行过滤
         if component:
-            # 从文件名或数据中匹配组件名
-            if component.lower() not in mq_csv.name.lower():
-                return []
-        
-        # 处理可选字段：将 NaN 和空字符串转换为 None
-        df = df.replace([pd.NA, pd.NaT, ''], None)
-        df = df.where(pd.notnull(df), None)
-        
-        # 限制返回记录数
-        if len(df) > limit:
-            df = df.head(limit)
-        
-        # 转换为字典列表
-        records = df.to_dict('records')
-        
-        # 清理数据：移除空字符串和 None 值的字段（可选字段）
-        # 但保留数字 0 和 False 值
-        cleaned_records = []
-        for record in records:
-            cleaned = {}
-            for k, v in record.items():
-                # 保留所有非 None 和非空字符串的值
-                if v is not None and v != '':
-                    cleaned[k] = v
-            cleaned_records.append(cleaned)
+            # 按别名索引解析组件名后与文件名中的组件名比较
+            if not dataset_matches(mq_csv, resolve_dataset_component(component, 'MQ')):
+                return iter(())
         
-        return cleaned_records
+        return iter_records(load_csv_cached(mq_csv), limit)
     except Exception as e:
         print(f"加载消息队列CSV数据失败: {e}")
-        return []
+        return iter(())
+
+def parse_record_limit() -> int:
+    """
+    解析测试结果导出接口的 limit 参数（1~100000，默认 100）
+    
+    Raises:
+        ValueError: 不是整数或超出范围
+    """
+    limit = int(request.args.get('limit', 100))
+    if not 1 <= limit <= 100000:
+        raise ValueError('limit 取值范围为 1~100000')
+    return limit
+
+@app.route('/api/results/databases', methods=['GET'])
+def get_database_results():
+    """数据库测试结果导出接口（流式 JSON，边转换边压缩发送）"""
+    component = request.args.get('component')
+    try:
+        limit = parse_record_limit()
+    except ValueError as e:
+        return jsonify({'error': f'参数格式错误: {str(e)}'}), 400
+    
+    return stream_json({'component': component, 'limit': limit}, 'records',
+                       load_db_csv_data(component, limit))
+
+@app.route('/api/results/message-queues', methods=['GET'])
+def get_message_queue_results():
+    """消息队列测试结果导出接口（流式 JSON，边转换边压缩发送）"""
+    component = request.args.get('component')
+    try:
+        limit = parse_record_limit()
+    except ValueError as e:
+        return jsonify({'error': f'参数格式错误: {str(e)}'}), 400
+    
+    return stream_json({'component': component, 'limit': limit}, 'records',
+                       load_mq_csv_data(component, limit))
+
+@app.route('/api/timeseries', methods=['GET'])
+def get_timeseries():
+    """消息队列时间序列接口：按运行ID返回降采样后的指标曲线"""
+    run_id = request.args.get('run_id')
+    component = request.args.get('component')
+    metrics = [m.strip() for m in request.args.get('metrics', 'received_msg_s,p95_ms').split(',') if m.strip()]
+    method = request.args.get('method', 'lttb')
+    
+    try:
+        points = int(request.args.get('points', 500))
+    except ValueError:
+        return jsonify({'error': 'points 必须是整数'}), 400
+    
+    if not run_id:
+        return jsonify({'error': 'run_id 是必需的'}), 400
+    if method not in DOWNSAMPLE_METHODS:
+        return jsonify({'error': f'method 仅支持 {", ".join(DOWNSAMPLE_METHODS)}'}), 400
+    if not 4 <= points <= 10000:
+        return jsonify({'error': 'points 取值范围为 4~10000'}), 400
+    unknown = [m for m in metrics if m not in TIMESERIES_METRICS]
+    if not metrics or unknown:
+        return jsonify({'error': f'不支持的指标: {", ".join(unknown)}，可选: {", ".join(TIMESERIES_METRICS)}'}), 400
+    
+    # 查找时间序列文件：指定组件时选择该组件最新的文件
+    data_dir = pathlib.Path('datas')
+    ts_csv = None
+    if component:
+        dataset_name = resolve_dataset_component(component, 'MQ')
+        candidates = [p for p in list_csv_files(data_dir, 'mq_timeseries') if dataset_matches(p, dataset_name)]
+        ts_csv = candidates[-1] if candidates else None
+    elif data_dir.exists():
+        ts_csv = resolve_mq_timeseries_csv(data_dir)
+    
+    if ts_csv is None or not ts_csv.exists():
+        return jsonify({'error': '未找到时间序列数据文件'}), 404
+    
+    try:
+        series = iter_downsample_run(ts_csv, run_id, metrics, points, method)
+    except KeyError as e:
+        return jsonify({
+            'error': f'未找到运行 {run_id} 的数据: {e}',
+            'available_runs': list_runs(ts_csv)
+        }), 404
+    
+    # 各指标逐个降采样并逐块输出
+    return stream_json({
+        'component': component_from_filename(ts_csv, 'RabbitMQ'),
+        'run_id': run_id,
+        'method': method,
+        'points': points,
+        'dataset_version': dataset_version(ts_csv)
+    }, 'series', series, pairs=True)
+
+def resolve_query_components(dataset: str, filters: List[Dict]) -> List[Dict]:
+    """通用查询中 component 列的过滤值按别名索引解析为数据集组件名（归一化数据集依次尝试 DB、MQ）"""
+    component_types = [QUERY_DATASETS[dataset]] if QUERY_DATASETS.get(dataset) else ['DB', 'MQ']
+    
+    def resolve(value):
+        for component_type in component_types:
+            resolved = resolve_alias(get_catalog()['aliases'], value, component_type)
+            if resolved:
+                return resolved
+        return value
+    
+    resolved_filters = []
+    for item in filters:
+        if isinstance(item, dict) and item.get('column') == 'component' and item.get('op', '=') in ('=', '!=', 'in', 'not_in'):
+            value = item.get('value')
+            item = dict(item, value=[resolve(v) for v in value] if isinstance(value, list) else resolve(value))
+        resolved_filters.append(item)
+    return resolved_filters
+
+@app.route('/api/query', methods=['POST'])
+def query_benchmarks():
+    """通用查询接口：对原始测试结果和归一化指标做过滤、分组和聚合（谓词下推到数据仓库或列式数据）"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': '请求体必须是 JSON 对象'}), 400
+    if not isinstance(data.get('dataset'), str) or data['dataset'] not in QUERY_DATASETS:
+        return jsonify({'error': f'dataset 仅支持 {", ".join(QUERY_DATASETS)}'}), 400
+    if not isinstance(data.get('filters', []), list):
+        return jsonify({'error': 'filters 必须是数组'}), 400
+    
+    body = dict(data, filters=resolve_query_components(data.get('dataset'), data.get('filters') or []))
+    try:
+        result = run_query(body, warehouse=get_warehouse(), data_dir=pathlib.Path('datas'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    return jsonify(result)
+
+@app.route('/api/query/schema', methods=['GET'])
+def query_schema():
+    """通用查询可用的数据集和列"""
+    return jsonify({
+        'backend': 'warehouse' if get_warehouse() is not None else 'memory',
+        'operators': list(QUERY_OPERATORS),
+        'aggregations': list(QUERY_AGGREGATIONS),
+        'max_limit': QUERY_MAX_LIMIT,
+        'datasets': dataset_schema(warehouse=get_warehouse(), data_dir=pathlib.Path('datas'))
+    })
+
+def resolve_dataset_component(component_name, component_type: str) -> Optional[str]:
+    """
+    将请求中的组件名（显示名称、ID、厂商、版本等）解析为测试数据集的组件名
+    
+    查询组件目录快照中的别名索引；索引中没有时原样返回（名称本身可能就是索引构建后新增的数据集组件名）
+    """
+    if component_name is None:
+        return None
+    return resolve_alias(get_catalog()['aliases'], component_name, component_type) or str(component_name)
+
+@traced('routes.load_component_normalized')
+def load_component_normalized(component_name: str, component_type: str,
+                              cpu_cores: float = 4, memory_gb: float = 4.0):
+    """
+    加载组件的归一化数据（CSV 结果按文件版本缓存；启用数据仓库时从仓库读取）
+    
+    归一化结果与测试环境参数无关地缓存，cpu_cores/memory_gb 只在返回前做向量化换算
+    
+    Returns:
+        (归一化DataFrame, 数据集版本)
+    
+    Raises:
+        LookupError: 未找到组件的测试数据
+    """
+    data_dir = pathlib.Path('datas')
+    warehouse = get_warehouse()
+    # 别名解析为数据集组件名：不同别名共享同一份归一化缓存
+    dataset_name = resolve_dataset_component(component_name, component_type)
+    
+    if warehouse is not None and component_type in ('DB', 'MQ'):
+        table = 'kbbench' if component_type == 'DB' else 'perftest_summary'
+        matched = warehouse.find_component(table, dataset_name)
+        if matched is None:
+            raise LookupError(f'未找到组件 {component_name} 的测试数据文件')
+        
+        def normalize():
+            # 按单核单GB归一化（与测试环境无关），查询时再换算
+            normalizer = NormalizedMetrics(cpu_cores=1, memory_gb=1.0)
+            df = warehouse.raw_runs(table, matched)
+            if component_type == 'DB':
+                return normalizer.normalize_db_metrics(df, dataset_name)
+            memory_model = normalizer.estimate_message_memory(
+                warehouse.raw_runs('perftest_timeseries', matched), df
+            )
+            return normalizer.normalize_mq_metrics(df, dataset_name, memory_model)
+        
+        version = dataset_version(pathlib.Path(warehouse.db_path))
+        annotate(f"dataset.version.{component_type.lower()}", version)
+        normalized_df = cached_derived(('normalized', version, table, matched, dataset_name), normalize)
+        return NormalizedMetrics(cpu_cores=cpu_cores, memory_gb=memory_gb).rescale(normalized_df), version
+    
+    csv_path = None
+    if component_type == 'DB':
+        # 查找数据库CSV文件
+        csv_path = resolve_db_csv(data_dir)
+    elif component_type == 'MQ':
+        # 查找消息队列CSV文件
+        csv_path = resolve_mq_summary_csv(data_dir)
+    
+    if csv_path is None or not csv_path.exists():
+        raise LookupError(f'未找到组件 {component_name} 的测试数据')
+    
+    # 检查组件是否匹配（文件名中的组件名与解析后的数据集组件名一致）
+    if not dataset_matches(csv_path, dataset_name):
+        raise LookupError(f'未找到组件 {component_name} 的测试数据文件')
+    
+    # MQ：同组件的时间序列用于回归单位消息内存占用
+    timeseries_path = resolve_mq_timeseries_for(data_dir, csv_path) if component_type == 'MQ' else None
+    normalized_df = load_normalized(csv_path, component_type, component_from_filename(csv_path, dataset_name),
+                                    cpu_cores, memory_gb, timeseries_path)
+    version = dataset_version(csv_path, timeseries_path)
+    annotate(f"dataset.version.{component_type.lower()}", version)
+    return normalized_df, version
+
+def load_slo_lookup(normalized_df: pd.DataFrame, version: str, component_name: str, component_type: str,
+                    cpu_cores: float, memory_gb: float) -> dict:
+    """组件的SLO查找表（按数据集版本和测试环境缓存）"""
+    return cached_derived(
+        ('slo_lookup', version, component_name, component_type, cpu_cores, memory_gb),
+        lambda: NormalizedMetrics().build_slo_lookup(normalized_df, component_type)
+    )
+
+def build_target_slo(component_type: str, target_tps, target_msg_per_sec, max_latency_ms) -> dict:
+    """构建容量计算使用的目标SLO（MQ 的延迟约束为 P95）"""
+    if component_type == 'DB':
+        return {
+            'component_type': 'DB',
+            'target_tps': target_tps,
+            'max_latency_ms': max_latency_ms
+        }
+    return {
+        'component_type': 'MQ',
+        'target_msg_per_sec': target_msg_per_sec,
+        'max_p95_ms': max_latency_ms
+    }
+
+def parse_test_environment(data: dict):
+    """
+    请求中的测试环境参数（test_cpu_cores 默认 4，test_memory_gb 默认 4.0）
+    
+    Returns:
+        (CPU核心数, 内存GB)；整数核心数保持为 int
+    
+    Raises:
+        ValueError: 不是正数
+    """
+    try:
+        test_cpu_cores = float(data.get('test_cpu_cores', 4))
+        test_memory_gb = float(data.get('test_memory_gb', 4.0))
+    except (TypeError, ValueError):
+        raise ValueError('test_cpu_cores 和 test_memory_gb 必须是正数')
+    if not (0 < test_cpu_cores < float('inf') and 0 < test_memory_gb < float('inf')):
+        raise ValueError('test_cpu_cores 和 test_memory_gb 必须是正数')
+    if test_cpu_cores.is_integer():
+        test_cpu_cores = int(test_cpu_cores)
+    return test_cpu_cores, test_memory_gb
+
+def component_data_version(component_type: str) -> str:
+    """组件测试数据的当前数据集版本（只读取文件签名，不加载数据）"""
+    warehouse = get_warehouse()
+    if warehouse is not None:
+        return dataset_version(pathlib.Path(warehouse.db_path))
+    
+    data_dir = pathlib.Path('datas')
+    if component_type == 'DB':
+        return dataset_version(resolve_db_csv(data_dir))
+    if component_type == 'MQ':
+        summary_path = resolve_mq_summary_csv(data_dir)
+        return dataset_version(summary_path, resolve_mq_timeseries_for(data_dir, summary_path))
+    return dataset_version()
+
+# 容量外推请求合并：仪表盘刷新时大量相同请求同时到达，只计算一次
+extrapolation_flight = SingleFlight()
+
+@traced('routes.compute_capacity_extrapolation')
+def compute_capacity_extrapolation(component_name: str, component_type: str, target_slo: dict,
+                                   test_cpu_cores, test_memory_gb,
+                                   confidence_intervals: bool, bootstrap_samples: int):
+    """
+    执行容量外推（可被多个合并的请求共享，返回值不得被调用方修改）
+    
+    Returns:
+        (响应字典, HTTP状态码)
+    """
+    # 加载归一化数据
+    normalizer = NormalizedMetrics(cpu_cores=test_cpu_cores, memory_gb=test_memory_gb)
+    
+    # 直接从CSV文件（或数据仓库）加载数据并归一化
+    try:
+        normalized_df, version = load_component_normalized(
+            component_name, component_type, test_cpu_cores, test_memory_gb
+        )
+    except LookupError as e:
+        return {'error': str(e)}, 404
+    
+    # 执行容量外推（SLO查找表随归一化数据按数据集版本缓存，每次外推只需一次二分查找）
+    lookup = load_slo_lookup(normalized_df, version, component_name, component_type, test_cpu_cores, test_memory_gb)
+    recommendations = normalizer.generate_capacity_extrapolation(normalized_df, target_slo, lookup)
+    
+    if len(recommendations) == 0:
+        return {
+            'error': '未找到满足SLO要求的基准数据',
+            'component_name': component_name,
+            'component_type': component_type
+        }, 404
+    
+    # 转换为字典格式返回
+    result = recommendations.iloc[0].to_dict()
+    
+    response = {
+        'component_name': component_name,
+        'component_type': component_type,
+        'recommendations': {
+            'required_cpu_cores': int(result.get('required_cpu_cores', 0)),
+            'required_memory_gb': int(result.get('required_memory_gb', 0)),
+            'estimated_latency_ms': result.get('estimated_latency_ms') if component_type == 'DB' else result.get('estimated_p95_ms'),
+            'max_sustainable_msg_s': result.get('max_sustainable_msg_s') if component_type == 'MQ' else None,
+            'exceeds_sustainable': bool(result.get('exceeds_sustainable')) if component_type == 'MQ' else None,
+            'warning': result.get('warning') if component_type == 'MQ' else None,
+            'baseline_metrics': {
+                'tps_per_core': result.get('baseline_tps_per_core') if component_type == 'DB' else None,
+                'msg_per_sec_per_core': result.get('baseline_msg_per_sec_per_core') if component_type == 'MQ' else None,
+                'memory_model': result.get('memory_model') if component_type == 'MQ' else None,
+                'memory_per_msg_bytes': result.get('memory_per_msg_bytes') if component_type == 'MQ' else None,
+                'cpu_utilization_pct': result.get('baseline_cpu_utilization_pct'),
+                'memory_utilization_pct': result.get('baseline_memory_utilization_pct')
+            }
+        }
+    }
+    
+    # bootstrap置信区间：按 (数据集版本, SLO) 缓存，同一数据集只计算一次
+    if confidence_intervals:
+        cache_key = ('bootstrap', version, component_name, test_cpu_cores, test_memory_gb,
+                     tuple(sorted(target_slo.items())), bootstrap_samples)
+        response['confidence_intervals'] = cached_derived(
+            cache_key,
+            lambda: normalizer.bootstrap_capacity(normalized_df, target_slo, n_boot=bootstrap_samples)
+        )
+    
+    return response, 200
 
 @app.route('/api/capacity/extrapolation', methods=['POST'])
 def capacity_extrapolation():
@@ -461,8 +932,8 @@ def capacity_extrapolation():
     target_tps = data.get('target_tps')  # 数据库目标TPS
     target_msg_per_sec = data.get('target_msg_per_sec')  # 消息队列目标消息/秒
     max_latency_ms = data.get('max_latency_ms', 1000)  # 最大延迟（ms）
-    test_cpu_cores = data.get('test_cpu_cores', 4)  # 测试环境CPU核心数
-    test_memory_gb = data.get('test_memory_gb', 4.0)  # 测试环境内存GB
+    confidence_intervals = bool(data.get('confidence_intervals', False))  # 是否计算bootstrap置信区间
+    bootstrap_samples = data.get('bootstrap_samples', 1000)  # bootstrap重采样次数
     
     if not component_name or not component_type:
         return jsonify({'error': 'component_name 和 component_type 是必需的'}), 400
@@ -473,91 +944,256 @@ def capacity_extrapolation():
     if component_type == 'MQ' and not target_msg_per_sec:
         return jsonify({'error': '消息队列类型需要提供 target_msg_per_sec'}), 400
     
+    if confidence_intervals and (not isinstance(bootstrap_samples, int) or not 100 <= bootstrap_samples <= 20000):
+        return jsonify({'error': 'bootstrap_samples 取值范围为 100~20000'}), 400
+    
     try:
-        # 加载归一化数据
-        normalizer = NormalizedMetrics(cpu_cores=test_cpu_cores, memory_gb=test_memory_gb)
-        
-        # 直接从CSV文件加载数据并归一化
-        normalized_data = []
-        data_dir = pathlib.Path('datas')
-        
-        if component_type == 'DB':
-            # 查找数据库CSV文件
-            db_csv = data_dir / "results.csv"
-            if not db_csv.exists():
-                db_csv = find_latest_csv(data_dir, "*_kbbench_results_*.csv")
-            if db_csv is None:
-                db_csv = find_latest_csv(data_dir, "*kbbench*.csv")
-            
-            if db_csv and db_csv.exists():
-                # 检查组件名称是否匹配
-                if component_name.lower() not in db_csv.name.lower():
-                    return jsonify({'error': f'未找到组件 {component_name} 的测试数据文件'}), 404
-                
-                df = pd.read_csv(db_csv)
-                normalized_df = normalizer.normalize_db_metrics(df, component_name)
-                normalized_data.append(normalized_df)
-        elif component_type == 'MQ':
-            # 查找消息队列CSV文件
-            mq_csv = find_latest_csv(data_dir, "*perftest_summary_*.csv")
-            
-            if mq_csv and mq_csv.exists():
-                # 检查组件名称是否匹配
-                if component_name.lower() not in mq_csv.name.lower():
-                    return jsonify({'error': f'未找到组件 {component_name} 的测试数据文件'}), 404
-                
-                df = pd.read_csv(mq_csv)
-                normalized_df = normalizer.normalize_mq_metrics(df, component_name)
-                normalized_data.append(normalized_df)
+        test_cpu_cores, test_memory_gb = parse_test_environment(data)  # 测试环境CPU核心数、内存GB
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # 构建目标SLO
+    target_slo = build_target_slo(component_type, target_tps, target_msg_per_sec, max_latency_ms)
+    
+    try:
+        # 合并键：规范化后的请求参数 + 数据集版本，数据变化后的请求不会共享旧结果
+        flight_key = (
+            component_name, component_type, tuple(sorted(target_slo.items())),
+            test_cpu_cores, test_memory_gb,
+            bootstrap_samples if confidence_intervals else None,
+            component_data_version(component_type)
+        )
+        (payload, status), shared = extrapolation_flight.do(
+            flight_key,
+            lambda: compute_capacity_extrapolation(
+                component_name, component_type, target_slo, test_cpu_cores, test_memory_gb,
+                confidence_intervals, bootstrap_samples
+            )
+        )
+        annotate('singleflight.shared', shared)
+        return jsonify(payload), status
         
-        if not normalized_data:
-            return jsonify({'error': f'未找到组件 {component_name} 的测试数据'}), 404
+    except Exception as e:
+        return jsonify({'error': f'容量外推计算失败: {str(e)}'}), 500
+
+@app.route('/api/capacity/scale-out', methods=['POST'])
+def capacity_scale_out():
+    """横向扩展规划接口：计算满足目标负载的节点规格与节点数（按成本排序）"""
+    data = request.get_json()
+    
+    if not data:
+        return jsonify({'error': '请求数据不能为空'}), 400
+    
+    component_name = data.get('component_name')
+    component_type = data.get('component_type')  # 'DB' 或 'MQ'
+    target_tps = data.get('target_tps')
+    target_msg_per_sec = data.get('target_msg_per_sec')
+    max_latency_ms = data.get('max_latency_ms', 1000)
+    
+    if not component_name or component_type not in ('DB', 'MQ'):
+        return jsonify({'error': 'component_name 是必需的，component_type 仅支持 DB 或 MQ'}), 400
+    
+    if component_type == 'DB' and not target_tps:
+        return jsonify({'error': '数据库类型需要提供 target_tps'}), 400
+    
+    if component_type == 'MQ' and not target_msg_per_sec:
+        return jsonify({'error': '消息队列类型需要提供 target_msg_per_sec'}), 400
+    
+    try:
+        node_shapes = parse_node_shapes(data['node_shapes']) if data.get('node_shapes') else None
+        max_nodes = int(data.get('max_nodes', 64))
+        min_nodes = int(data.get('min_nodes', 1))
+        efficiency_loss = float(data.get('efficiency_loss', 0.05))
+        headroom = float(data.get('headroom', 0.2))
+        cost_per_core = float(data.get('cost_per_core', DEFAULT_COST_PER_CORE))
+        cost_per_gb = float(data.get('cost_per_gb', DEFAULT_COST_PER_GB))
+        top_k = int(data.get('top_k', 10))
+        test_cpu_cores, test_memory_gb = parse_test_environment(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'参数格式错误: {str(e)}'}), 400
+    
+    if not 1 <= min_nodes <= max_nodes <= 1000:
+        return jsonify({'error': '需要满足 1 <= min_nodes <= max_nodes <= 1000'}), 400
+    if not 0 <= efficiency_loss < 1 or not 0 <= headroom < 1:
+        return jsonify({'error': 'efficiency_loss 和 headroom 取值范围为 [0, 1)'}), 400
+    if node_shapes is not None and len(node_shapes) > 200:
+        return jsonify({'error': 'node_shapes 最多 200 种'}), 400
+    
+    try:
+        normalized_df, version = load_component_normalized(
+            component_name, component_type, test_cpu_cores, test_memory_gb
+        )
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    
+    try:
+        target_slo = build_target_slo(component_type, target_tps, target_msg_per_sec, max_latency_ms)
+        plans = plan_scale_out(
+            normalized_df, target_slo,
+            lookup=load_slo_lookup(normalized_df, version, component_name, component_type,
+                                   test_cpu_cores, test_memory_gb),
+            node_shapes=node_shapes,
+            max_nodes=max_nodes,
+            min_nodes=min_nodes,
+            efficiency_loss=efficiency_loss,
+            headroom=headroom,
+            cost_per_core=cost_per_core,
+            cost_per_gb=cost_per_gb,
+            top_k=max(top_k, 1)
+        )
         
-        # 合并归一化数据
-        normalized_df = pd.concat(normalized_data, ignore_index=True)
+        if len(plans) == 0:
+            return jsonify({
+                'error': '在给定的节点规格和节点数范围内没有可行方案（或无满足SLO的基准数据）',
+                'component_name': component_name,
+                'component_type': component_type
+            }), 404
         
-        # 构建目标SLO
-        if component_type == 'DB':
-            target_slo = {
-                'component_type': 'DB',
-                'target_tps': target_tps,
-                'max_latency_ms': max_latency_ms
-            }
-        else:
-            target_slo = {
-                'component_type': 'MQ',
-                'target_msg_per_sec': target_msg_per_sec,
-                'max_p95_ms': max_latency_ms
-            }
+        return jsonify({
+            'component_name': component_name,
+            'component_type': component_type,
+            'target_load': target_tps if component_type == 'DB' else target_msg_per_sec,
+            'parameters': {
+                'max_nodes': max_nodes,
+                'min_nodes': min_nodes,
+                'efficiency_loss': efficiency_loss,
+                'headroom': headroom,
+                'cost_per_core': cost_per_core,
+                'cost_per_gb': cost_per_gb
+            },
+            'plans': records_from_frame(plans.drop(columns=['component']), len(plans))
+        })
         
-        # 执行容量外推
-        recommendations = normalizer.generate_capacity_extrapolation(normalized_df, target_slo)
+    except Exception as e:
+        return jsonify({'error': f'扩展规划计算失败: {str(e)}'}), 500
+
+@app.route('/api/capacity/curve', methods=['POST'])
+def capacity_curve():
+    """容量曲线接口：一次返回负载区间内各点所需的CPU核心、内存和估算延迟"""
+    data = request.get_json()
+    
+    if not data:
+        return jsonify({'error': '请求数据不能为空'}), 400
+    
+    component_name = data.get('component_name')
+    component_type = data.get('component_type')  # 'DB' 或 'MQ'
+    max_latency_ms = data.get('max_latency_ms', 1000)
+    
+    if not component_name or component_type not in ('DB', 'MQ'):
+        return jsonify({'error': 'component_name 是必需的，component_type 仅支持 DB 或 MQ'}), 400
+    
+    try:
+        min_load = float(data.get('min_load'))
+        max_load = float(data.get('max_load'))
+        steps = int(data.get('steps', 100))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'min_load 和 max_load 是必需的数值，steps 必须是整数'}), 400
+    try:
+        test_cpu_cores, test_memory_gb = parse_test_environment(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not 0 < min_load <= max_load:
+        return jsonify({'error': '需要满足 0 < min_load <= max_load'}), 400
+    if not 2 <= steps <= 10000:
+        return jsonify({'error': 'steps 取值范围为 2~10000'}), 400
+    
+    try:
+        normalized_df, version = load_component_normalized(
+            component_name, component_type, test_cpu_cores, test_memory_gb
+        )
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    
+    try:
+        target_slo = build_target_slo(component_type, None, None, max_latency_ms)
+        curve = NormalizedMetrics().capacity_curve(
+            normalized_df, target_slo, np.linspace(min_load, max_load, steps),
+            lookup=load_slo_lookup(normalized_df, version, component_name, component_type,
+                                   test_cpu_cores, test_memory_gb)
+        )
         
-        if len(recommendations) == 0:
+        if len(curve) == 0:
             return jsonify({
                 'error': '未找到满足SLO要求的基准数据',
                 'component_name': component_name,
                 'component_type': component_type
             }), 404
         
-        # 转换为字典格式返回
-        result = recommendations.iloc[0].to_dict()
-        
         return jsonify({
             'component_name': component_name,
             'component_type': component_type,
-            'recommendations': {
-                'required_cpu_cores': int(result.get('required_cpu_cores', 0)),
-                'required_memory_gb': int(result.get('required_memory_gb', 0)),
-                'estimated_latency_ms': result.get('estimated_latency_ms') if component_type == 'DB' else result.get('estimated_p95_ms'),
-                'baseline_metrics': {
-                    'tps_per_core': result.get('baseline_tps_per_core') if component_type == 'DB' else None,
-                    'msg_per_sec_per_core': result.get('baseline_msg_per_sec_per_core') if component_type == 'MQ' else None,
-                    'cpu_utilization_pct': result.get('baseline_cpu_utilization_pct'),
-                    'memory_utilization_pct': result.get('baseline_memory_utilization_pct')
-                }
-            }
+            'max_latency_ms': max_latency_ms,
+            'steps': steps,
+            'dataset_version': version,
+            'curve': {col: curve[col].tolist() for col in curve.columns}
         })
         
     except Exception as e:
-        return jsonify({'error': f'容量外推计算失败: {str(e)}'}), 500
+        return jsonify({'error': f'容量曲线计算失败: {str(e)}'}), 500
+
+@app.route('/api/capacity/pipeline', methods=['POST'])
+def capacity_pipeline():
+    """DB+MQ 流水线模拟接口：按扇出比和端到端目标计算两侧核心分配，识别瓶颈和延迟预算"""
+    data = request.get_json()
+    
+    if not data:
+        return jsonify({'error': '请求数据不能为空'}), 400
+    
+    database = data.get('database')
+    message_queue = data.get('message_queue')
+    target_msg_per_sec = data.get('target_msg_per_sec')
+    
+    if not database or not message_queue:
+        return jsonify({'error': 'database 和 message_queue 是必需的'}), 400
+    
+    try:
+        target_msg_per_sec = float(target_msg_per_sec)
+        messages_per_transaction = float(data.get('messages_per_transaction', 1))
+        max_latency_ms = float(data.get('max_latency_ms', 1000))
+        max_cores = int(data.get('max_cores', 64))
+        cost_per_core = float(data.get('cost_per_core', DEFAULT_COST_PER_CORE))
+        cost_per_gb = float(data.get('cost_per_gb', DEFAULT_COST_PER_GB))
+        top_k = int(data.get('top_k', 5))
+        test_cpu_cores, test_memory_gb = parse_test_environment(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'参数格式错误: {str(e)}'}), 400
+    
+    if target_msg_per_sec <= 0 or messages_per_transaction <= 0 or max_latency_ms <= 0:
+        return jsonify({'error': 'target_msg_per_sec、messages_per_transaction 和 max_latency_ms 必须为正数'}), 400
+    if not 1 <= max_cores <= 256:
+        return jsonify({'error': 'max_cores 取值范围为 1~256'}), 400
+    if cost_per_core < 0 or cost_per_gb < 0:
+        return jsonify({'error': 'cost_per_core 和 cost_per_gb 不能为负数'}), 400
+    
+    try:
+        db_df, db_version = load_component_normalized(database, 'DB', test_cpu_cores, test_memory_gb)
+        mq_df, mq_version = load_component_normalized(message_queue, 'MQ', test_cpu_cores, test_memory_gb)
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    
+    try:
+        plans = simulate_pipeline(
+            db_df, mq_df, target_msg_per_sec,
+            messages_per_transaction=messages_per_transaction,
+            max_latency_ms=max_latency_ms,
+            max_cores=max_cores,
+            cost_per_core=cost_per_core,
+            cost_per_gb=cost_per_gb,
+            db_lookup=load_slo_lookup(db_df, db_version, database, 'DB', test_cpu_cores, test_memory_gb),
+            mq_lookup=load_slo_lookup(mq_df, mq_version, message_queue, 'MQ', test_cpu_cores, test_memory_gb)
+        )
+        
+        if len(plans) == 0:
+            return jsonify({
+                'error': f'在 {max_cores} 核以内没有满足端到端目标和延迟预算的分配（或无满足SLO的基准数据）',
+                'database': database,
+                'message_queue': message_queue
+            }), 404
+        
+        response = pipeline_summary(plans, target_msg_per_sec, messages_per_transaction, max_latency_ms)
+        response['alternatives'] = records_from_frame(plans.iloc[1:], max(top_k, 0))
+        return jsonify(response)
+        
+    except Exception as e:
+        return jsonify({'error': f'流水线模拟计算失败: {str(e)}'}), 500
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+横向扩展规划：给定目标负载，计算需要多少台某种规格（CPU核心 × 内存）的节点
+
+在单机容量外推（NormalizedMetrics.generate_capacity_extrapolation）的基础上：
+1. 单节点容量 = min(核心数 × 每核吞吐, 内存可承载吞吐) × (1 - 预留余量)；
+   内存可承载吞吐在有实测内存模型时为 (可用内存 - 基线内存) / 单位消息内存占用，否则为 内存 × 每GB吞吐
+2. 集群扩展效率 = 1 / (1 + 效率损失 × (节点数 - 1))，节点越多协调开销越大
+3. 所有节点规格 × 节点数一次性向量化计算，返回成本最低的可行方案
+4. 消息队列方案标记单节点负载（目标负载 / 节点数）是否超过速率扫描拐点处的最大可持续吞吐
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from normalize_metrics import NormalizedMetrics
+from tracing import traced
+
+
+# 默认候选节点规格：(CPU核心, 内存GB)
+DEFAULT_NODE_SHAPES: Tuple[Tuple[int, float], ...] = (
+    (4, 8), (4, 16),
+    (8, 16), (8, 32),
+    (16, 32), (16, 64),
+    (32, 64), (32, 128),
+    (64, 128), (64, 256),
+)
+
+# 成本权重（相对单位）：1 个核心约等于 8GB 内存的价格
+DEFAULT_COST_PER_CORE = 1.0
+DEFAULT_COST_PER_GB = 0.125
+
+
+def scaling_efficiency(nodes: np.ndarray, efficiency_loss: float) -> np.ndarray:
+    """n 个节点的扩展效率：1 / (1 + loss × (n - 1))"""
+    return 1.0 / (1.0 + efficiency_loss * (nodes - 1))
+
+
+@traced('capacity.plan_scale_out')
+def plan_scale_out(
+    normalized_df: pd.DataFrame,
+    target_slo: Dict,
+    node_shapes: Optional[Sequence[Tuple[int, float]]] = None,
+    max_nodes: int = 64,
+    min_nodes: int = 1,
+    efficiency_loss: float = 0.05,
+    headroom: float = 0.2,
+    cost_per_core: float = DEFAULT_COST_PER_CORE,
+    cost_per_gb: float = DEFAULT_COST_PER_GB,
+    top_k: int = 10,
+    lookup: Optional[Dict] = None,
+) -> pd.DataFrame:
+    """
+    计算满足目标负载的集群方案
+
+    Args:
+        normalized_df: 归一化指标DataFrame
+        target_slo: 目标SLO约束（同 generate_capacity_extrapolation）
+        node_shapes: 候选节点规格 [(CPU核心, 内存GB), ...]，默认 DEFAULT_NODE_SHAPES
+        max_nodes: 每种规格最多考虑的节点数
+        min_nodes: 最少节点数（如高可用要求至少 3 个节点）
+        efficiency_loss: 每增加一个节点的扩展效率损失系数
+        headroom: 单节点预留余量比例（0~1）
+        cost_per_core: 每核心成本权重
+        cost_per_gb: 每GB内存成本权重
+        top_k: 返回的方案数
+        lookup: NormalizedMetrics.build_slo_lookup 的结果（可选）
+
+    Returns:
+        按成本升序的可行方案DataFrame（MQ 另有 exceeds_sustainable 列）；无满足SLO的基准数据或无可行方案时为空
+    """
+    normalizer = NormalizedMetrics()
+    baseline = normalizer.generate_capacity_extrapolation(normalized_df, target_slo, lookup)
+    if len(baseline) == 0:
+        return pd.DataFrame()
+    best = baseline.iloc[0]
+
+    # 单机外推使用的每核/每GB有效吞吐（已折算到目标CPU/内存利用率）
+    if target_slo.get('component_type') == 'DB':
+        target_load = float(target_slo.get('target_tps', 0))
+        per_core = best['baseline_tps_per_core']
+        per_gb = best['baseline_tps_per_gb']
+    else:
+        target_load = float(target_slo.get('target_msg_per_sec', 0))
+        per_core = best['baseline_msg_per_sec_per_core']
+        per_gb = best['baseline_msg_per_sec_per_gb']
+    per_core *= best['extrapolation_target_cpu_util_pct'] / 100.0
+    per_gb *= best['extrapolation_target_mem_util_pct'] / 100.0
+
+    shapes = np.asarray(node_shapes or DEFAULT_NODE_SHAPES, dtype=np.float64).reshape(-1, 2)
+    cores, memory = shapes[:, 0], shapes[:, 1]
+
+    cpu_capacity = cores * per_core
+    if best.get('memory_model') == 'measured' and pd.notna(best.get('memory_baseline_gb')):
+        # 实测内存模型：扣除基线内存后，剩余内存可承载的吞吐
+        usable_gb = np.maximum(memory * best['extrapolation_target_mem_util_pct'] / 100.0 - best['memory_baseline_gb'], 0.0)
+        mem_capacity = usable_gb * 1024 ** 3 / best['memory_per_msg_bytes']
+    else:
+        mem_capacity = memory * per_gb
+    node_capacity = np.minimum(cpu_capacity, mem_capacity) * (1.0 - headroom)
+    bottleneck = np.where(cpu_capacity <= mem_capacity, 'cpu', 'memory')
+
+    # 规格 × 节点数 网格：(S, N)
+    nodes = np.arange(min_nodes, max_nodes + 1, dtype=np.float64)
+    efficiency = scaling_efficiency(nodes, efficiency_loss)
+    cluster_capacity = node_capacity[:, None] * nodes[None, :] * efficiency[None, :]
+    feasible = cluster_capacity >= target_load
+
+    # 每种规格取最少的可行节点数
+    has_plan = feasible.any(axis=1)
+    if not has_plan.any():
+        return pd.DataFrame()
+    first = feasible.argmax(axis=1)
+    rows = np.flatnonzero(has_plan)
+    cols = first[rows]
+
+    n = nodes[cols]
+    capacity = cluster_capacity[rows, cols]
+    node_cost = cores[rows] * cost_per_core + memory[rows] * cost_per_gb
+    plans = pd.DataFrame({
+        'component': best['component'],
+        'node_cpu_cores': cores[rows].astype(int),
+        'node_memory_gb': memory[rows],
+        'nodes': n.astype(int),
+        'total_cpu_cores': (cores[rows] * n).astype(int),
+        'total_memory_gb': memory[rows] * n,
+        'node_capacity': np.round(node_capacity[rows], 2),
+        'cluster_capacity': np.round(capacity, 2),
+        'scaling_efficiency': np.round(efficiency[cols], 4),
+        'load_pct': np.round(target_load / capacity * 100.0, 2),
+        'bottleneck': bottleneck[rows],
+        'cost': np.round(node_cost * n, 3),
+    })
+    if target_slo.get('component_type') == 'MQ':
+        max_sustainable = best.get('max_sustainable_msg_s')
+        plans['exceeds_sustainable'] = target_load / n > max_sustainable if pd.notna(max_sustainable) else False
+    return plans.sort_values(['cost', 'nodes', 'node_cpu_cores'], kind='stable').head(top_k).reset_index(drop=True)
+
+
+def parse_node_shapes(shapes: List) -> List[Tuple[int, float]]:
+    """
+    解析节点规格：支持 {"cpu_cores": 8, "memory_gb": 16} 或 "8C16G"
+
+    Raises:
+        ValueError: 格式错误或取值非正
+    """
+    parsed = []
+    for shape in shapes:
+        if isinstance(shape, dict):
+            cores, memory = shape.get('cpu_cores'), shape.get('memory_gb')
+        elif isinstance(shape, str) and 'C' in shape.upper():
+            text = shape.upper().rstrip('B').rstrip('G')
+            cores, memory = text.split('C', 1)
+        else:
+            raise ValueError(f"无法解析节点规格: {shape}")
+        try:
+            cores, memory = int(cores), float(memory)
+        except (TypeError, ValueError):
+            raise ValueError(f"无法解析节点规格: {shape}")
+        if cores <= 0 or memory <= 0:
+            raise ValueError(f"节点规格必须为正数: {shape}")
+        parsed.append((cores, memory))
+    return parsed
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求合并（single-flight）：相同键的并发调用只执行一次，其余调用等待并共享结果
+
+与缓存不同，结果在计算完成后即释放，不会返回过期数据；
+键中应包含数据集版本，数据变化后的新请求不会合并到旧的计算上
+"""
+
+import threading
+from typing import Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    """一次进行中的计算"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """按键合并并发调用"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], object]) -> Tuple[object, bool]:
+        """
+        执行 fn；若相同键的调用正在进行，则等待其完成并返回同一结果
+
+        Args:
+            key: 合并键
+            fn: 计算函数
+
+        Returns:
+            (结果, 是否共享了其他调用的结果)
+
+        Raises:
+            fn 抛出的异常（所有等待者都会收到同一个异常）
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self) -> Dict[str, int]:
+        """执行次数、共享次数和进行中的调用数"""
+        with self._lock:
+            return {
+                'executed': self.executed,
+                'shared': self.shared,
+                'in_flight': len(self._calls)
+            }
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+慢请求日志：耗时超过阈值或失败的请求记录为一行结构化 JSON
+
+每条记录包含路由、状态码、耗时、查询参数、规范化后的请求体（按比例抽样）、数据集版本、
+缓存命中情况以及各阶段耗时（来自 tracing 的子 Span 汇总）。
+日志写入按令牌桶限流：先取令牌再组装记录，超出速率的记录不组装、只计数，计数随下一条记录输出，日志本身不会成为热点。
+
+环境变量：
+    SLOW_REQUEST_MS：慢请求阈值（毫秒，默认 0，不记录）
+    SLOW_LOG_PATH：stdout（默认）或文件路径（追加写入）
+    SLOW_LOG_RATE：每秒最多写入的记录数（默认 5，允许突发同样条数）
+    SLOW_LOG_BODY_RATE：记录请求体的抽样比例 0~1（默认 1）
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+import tracing
+
+
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '0') or 0)
+SLOW_LOG_PATH = os.environ.get('SLOW_LOG_PATH', 'stdout') or 'stdout'
+SLOW_LOG_RATE = float(os.environ.get('SLOW_LOG_RATE', '5') or 0)
+SLOW_LOG_BODY_RATE = float(os.environ.get('SLOW_LOG_BODY_RATE', '1') or 0)
+
+# 请求体最多记录的字符数（超出部分截断）
+BODY_MAX_CHARS = 2048
+
+
+class TokenBucket:
+    """令牌桶限流（线程安全）"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.suppressed = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        尝试取一个令牌
+
+        Returns:
+            (是否允许, 上次允许以来被丢弃的记录数)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1.0:
+                self.suppressed += 1
+                return False, 0
+            self.tokens -= 1.0
+            suppressed, self.suppressed = self.suppressed, 0
+            return True, suppressed
+
+
+def normalize_body(body) -> Optional[str]:
+    """请求体规范化为按键排序的紧凑 JSON（超长时截断）"""
+    if body is None:
+        return None
+    text = json.dumps(body, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+    if len(text) > BODY_MAX_CHARS:
+        text = text[:BODY_MAX_CHARS] + '...'
+    return text
+
+
+class SlowRequestLog:
+    """慢请求日志写入器"""
+
+    def __init__(self, threshold_ms: float = SLOW_REQUEST_MS, target: str = SLOW_LOG_PATH,
+                 rate: float = SLOW_LOG_RATE, body_rate: float = SLOW_LOG_BODY_RATE):
+        self.threshold_ms = threshold_ms
+        self.target = target
+        self.body_rate = body_rate
+        self.bucket = TokenBucket(rate)
+        self._lock = threading.Lock()
+
+    def should_log(self, duration_ms: float, status: Optional[int], error: Optional[BaseException]) -> bool:
+        """超过阈值、5xx 或未处理异常的请求需要记录"""
+        return (duration_ms >= self.threshold_ms
+                or error is not None
+                or (status is not None and status >= 500))
+
+    def build_entry(self, root: tracing.Span, method: str, route: str, status: Optional[int],
+                    args: Dict, body, error: Optional[BaseException]) -> Dict:
+        """组装一条记录（根 Span 上的 dataset.version.* 和 cache.* 属性原样带出）"""
+        attributes = root.attributes
+        entry = {
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            'method': method,
+            'route': route,
+            'status': status,
+            'duration_ms': round(root.duration_ms, 3),
+            'trace_id': root.trace_id,
+            'args': args,
+            'body': normalize_body(body) if random.random() < self.body_rate else None,
+            'dataset_version': {k[len('dataset.version.'):]: v for k, v in attributes.items()
+                                if k.startswith('dataset.version.')},
+            'cache': {k[len('cache.'):]: v for k, v in attributes.items() if k.startswith('cache.')},
+            'stages': tracing.stage_timings(root),
+        }
+        if 'singleflight.shared' in attributes:
+            entry['singleflight_shared'] = attributes['singleflight.shared']
+        if error is not None:
+            entry['error'] = f"{type(error).__name__}: {error}"
+        return entry
+
+    def admit(self):
+        """
+        取一个写入令牌（组装记录之前调用，超出速率时不必组装）
+
+        Returns:
+            (是否允许, 上次允许以来被丢弃的记录数)
+        """
+        return self.bucket.acquire()
+
+    def write(self, entry: Dict, suppressed: int = 0):
+        """写入一行（调用方已通过 admit 取得令牌）；被丢弃的条数记在 suppressed 字段"""
+        if suppressed:
+            entry['suppressed'] = suppressed
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with self._lock:
+            if self.target == 'stdout':
+                sys.stdout.write(line + '\n')
+                sys.stdout.flush()
+            else:
+                with open(self.target, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+
+
+def install_slow_log(app, slow_log: Optional[SlowRequestLog] = None):
+    """
+    为 Flask 应用注册慢请求日志（需在 install_tracing 之后调用；SLOW_REQUEST_MS 未设置时不注册）
+
+    开启 tracing 的记录模式，使未采样的请求也收集各阶段耗时
+    """
+    if slow_log is None:
+        if SLOW_REQUEST_MS <= 0:
+            return
+        slow_log = SlowRequestLog()
+
+    from flask import g, request
+
+    tracing.configure(record_all=True)
+
+    @app.after_request
+    def _record_status(response):
+        g.slow_log_status = response.status_code
+        return response
+
+    # teardown 钩子按注册的逆序执行：此钩子先于 tracing 的 _end_request_span，根 Span 仍在 g 中
+    @app.teardown_request
+    def _log_slow_request(error=None):
+        root = g.get('trace_span')
+        if root is None:
+            return
+        status = g.get('slow_log_status')
+        if not slow_log.should_log(root.duration_ms, status, error):
+            return
+        allowed, suppressed = slow_log.admit()
+        if not allowed:
+            return
+        try:
+            rule = request.url_rule.rule if request.url_rule is not None else request.path
+            body = request.get_json(silent=True) if request.is_json else None
+            slow_log.write(slow_log.build_entry(root, request.method, rule, status,
+                                                request.args.to_dict(), body, error), suppressed)
+        except Exception as e:
+            print(f"慢请求日志写入失败: {e}")
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预热快照：把启动时需要的全部内存状态写成一个二进制文件，工作进程启动时直接加载
+
+快照内容（单个 .npz 文件）：
+1. __meta__：紧凑的 JSON 元数据（格式版本、源文件路径与 SHA-256、components.json 内容、各列的类型信息）
+2. 已解析的测试结果（DB、MQ 汇总、MQ 时间序列，压缩列类型后）的各列数组
+3. 与测试环境无关的归一化结果（含饱和点检测列和实测内存模型）的各列数组
+
+启动时逐个校验源文件哈希，且数据文件的查找结果必须与写快照时一致；
+任一不符即视为过期，回退到按原流程解析和归一化
+
+生成方式：
+    python snapshot.py --data-dir datas --output datas/snapshot.npz
+    python collect_and_normalize.py --snapshot datas/snapshot.npz
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import datasets
+from datasets import (
+    component_from_filename,
+    file_signature,
+    load_csv_cached,
+    resolve_db_csv,
+    resolve_mq_summary_csv,
+    resolve_mq_timeseries_for,
+)
+from normalize_metrics import to_python_scalar
+
+
+# 快照格式版本：编码方式或归一化列定义变化时递增，旧快照自动失效
+SNAPSHOT_FORMAT = 1
+DEFAULT_SNAPSHOT_PATH = 'datas/snapshot.npz'
+
+
+def file_sha256(path: pathlib.Path) -> str:
+    """文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _encode_frame(prefix: str, df: pd.DataFrame, arrays: Dict[str, np.ndarray]) -> Dict:
+    """
+    将DataFrame按列编码：数值/布尔列直接存数组，category 列存编码数组（类别放在元数据中），
+    其余（字符串、混合类型）列的取值放在元数据中
+
+    Returns:
+        该DataFrame的元数据（列名、编码方式、dtype、索引）
+    """
+    columns = []
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        key = f"{prefix}/{i}"
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            arrays[key] = series.cat.codes.to_numpy()
+            columns.append({
+                'name': col,
+                'kind': 'category',
+                'categories': [to_python_scalar(v) for v in series.cat.categories],
+                'categories_dtype': str(series.cat.categories.dtype),
+                'ordered': bool(series.cat.ordered),
+            })
+        elif series.dtype != object and isinstance(series.dtype, np.dtype):
+            arrays[key] = series.to_numpy()
+            columns.append({'name': col, 'kind': 'array'})
+        else:
+            columns.append({
+                'name': col,
+                'kind': 'values',
+                'dtype': str(series.dtype),
+                'values': [None if v is None or (isinstance(v, float) and np.isnan(v)) else to_python_scalar(v)
+                           for v in series.tolist()],
+            })
+
+    index = df.index
+    if isinstance(index, pd.RangeIndex):
+        index_meta = {'start': index.start, 'stop': index.stop, 'step': index.step}
+    else:
+        arrays[f"{prefix}/index"] = index.to_numpy()
+        index_meta = None
+    return {'columns': columns, 'index': index_meta, 'rows': len(df)}
+
+
+def _decode_frame(prefix: str, frame_meta: Dict, arrays) -> pd.DataFrame:
+    """_encode_frame 的逆过程"""
+    index_meta = frame_meta['index']
+    if index_meta is not None:
+        index = pd.RangeIndex(index_meta['start'], index_meta['stop'], index_meta['step'])
+    else:
+        index = pd.Index(arrays[f"{prefix}/index"])
+
+    data = {}
+    for i, column in enumerate(frame_meta['columns']):
+        key = f"{prefix}/{i}"
+        if column['kind'] == 'category':
+            categories = pd.Index(column['categories'], dtype=column['categories_dtype'])
+            data[column['name']] = pd.Categorical.from_codes(arrays[key], categories=categories,
+                                                             ordered=column['ordered'])
+        elif column['kind'] == 'array':
+            data[column['name']] = arrays[key]
+        else:
+            data[column['name']] = pd.Series(column['values'], dtype=column['dtype'], index=index)
+    return pd.DataFrame(data, index=index, columns=[c['name'] for c in frame_meta['columns']])
+
+
+def resolve_sources(data_dir: pathlib.Path, components_path: Optional[str]) -> Dict[str, Optional[pathlib.Path]]:
+    """快照覆盖的源文件（与路由使用相同的查找规则）"""
+    mq_summary = resolve_mq_summary_csv(data_dir)
+    return {
+        'components': pathlib.Path(components_path) if components_path and os.path.exists(components_path) else None,
+        'db': resolve_db_csv(data_dir),
+        'mq_summary': mq_summary,
+        'mq_timeseries': resolve_mq_timeseries_for(data_dir, mq_summary),
+    }
+
+
+def write_snapshot(output: str, data_dir: str = 'datas', components_path: Optional[str] = None) -> Dict:
+    """
+    解析并归一化全部测试数据，写入预热快照（先写临时文件再原子替换）
+
+    Args:
+        output: 快照文件路径（.npz）
+        data_dir: 测试结果数据目录
+        components_path: components.json 路径，默认 {data_dir}/components.json
+
+    Returns:
+        快照元数据
+    """
+    data_dir = pathlib.Path(data_dir)
+    if components_path is None:
+        components_path = str(data_dir / 'components.json')
+    sources = resolve_sources(data_dir, components_path)
+
+    components = None
+    if sources['components'] is not None:
+        with open(sources['components'], 'r', encoding='utf-8') as f:
+            components = json.load(f)
+
+    arrays: Dict[str, np.ndarray] = {}
+    frames: Dict[str, Dict] = {}
+    normalized: List[Dict] = []
+
+    # 已解析的原始数据
+    for kind in ('db', 'mq_summary', 'mq_timeseries'):
+        path = sources[kind]
+        if path is not None:
+            frames[kind] = _encode_frame(f"raw/{kind}", load_csv_cached(path), arrays)
+
+    # 与测试环境无关的归一化结果（与 datasets.load_normalized 的缓存键一致）
+    for kind, component_type in (('db', 'DB'), ('mq_summary', 'MQ')):
+        path = sources[kind]
+        if path is None:
+            continue
+        component_name = component_from_filename(path, 'Unknown')
+        timeseries_path = str(sources['mq_timeseries']) if component_type == 'MQ' and sources['mq_timeseries'] else None
+        df = datasets._load_normalized_cached(
+            str(path), file_signature(path), component_type, component_name,
+            timeseries_path, file_signature(pathlib.Path(timeseries_path)) if timeseries_path else None
+        )
+        prefix = f"normalized/{component_type}"
+        normalized.append({
+            'component_type': component_type,
+            'component': component_name,
+            'source': kind,
+            'frame': _encode_frame(prefix, df, arrays),
+        })
+
+    meta = {
+        'format': SNAPSHOT_FORMAT,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'data_dir': str(data_dir),
+        'sources': {
+            kind: None if path is None else {'path': str(path), 'sha256': file_sha256(path)}
+            for kind, path in sources.items()
+        },
+        'components': components,
+        'frames': frames,
+        'normalized': normalized,
+    }
+    arrays['__meta__'] = np.frombuffer(json.dumps(meta, ensure_ascii=False).encode('utf-8'), dtype=np.uint8)
+
+    # np.savez 会给不带 .npz 后缀的文件名补后缀，临时文件保持 .npz 结尾
+    tmp_path = f"{output}.tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, output)
+    return meta
+
+
+def read_snapshot(path: str) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    """读取快照文件，返回 (元数据, 数组)"""
+    with np.load(path, allow_pickle=False) as npz:
+        arrays = {key: npz[key] for key in npz.files}
+    meta = json.loads(arrays.pop('__meta__').tobytes().decode('utf-8'))
+    return meta, arrays
+
+
+def stale_reason(meta: Dict, components_path: Optional[str]) -> Optional[str]:
+    """
+    检查快照是否过期
+
+    Returns:
+        过期原因；快照有效时为 None
+    """
+    if meta.get('format') != SNAPSHOT_FORMAT:
+        return f"格式版本 {meta.get('format')} 与当前版本 {SNAPSHOT_FORMAT} 不一致"
+
+    current = resolve_sources(pathlib.Path(meta['data_dir']), components_path)
+    for kind, path in current.items():
+        recorded = meta['sources'].get(kind)
+        if path is None or recorded is None:
+            if path is not None or recorded is not None:
+                return f"{kind} 数据文件已增加或删除"
+            continue
+        if str(path) != recorded['path']:
+            return f"{kind} 数据文件已变为 {path}"
+        if file_sha256(path) != recorded['sha256']:
+            return f"{path} 内容已变化"
+    return None
+
+
+def load_warm_start(path: str = DEFAULT_SNAPSHOT_PATH, components_path: Optional[str] = None) -> Optional[Dict]:
+    """
+    加载预热快照并预填充 datasets 的解析缓存和归一化缓存
+
+    快照不存在、损坏或过期时返回 None，调用方按原流程加载
+
+    Args:
+        path: 快照文件路径
+        components_path: 当前使用的 components.json 路径
+
+    Returns:
+        {'components': components.json 内容, 'meta': 元数据, 'elapsed_ms': 加载耗时}；不可用时为 None
+    """
+    if not os.path.exists(path):
+        return None
+
+    start = time.perf_counter()
+    try:
+        meta, arrays = read_snapshot(path)
+        reason = stale_reason(meta, components_path)
+        if reason is not None:
+            print(f"预热快照已过期（{reason}），回退到完整加载: {path}")
+            return None
+
+        for kind, frame_meta in meta['frames'].items():
+            source = pathlib.Path(meta['sources'][kind]['path'])
+            datasets.seed_frame(source, _decode_frame(f"raw/{kind}", frame_meta, arrays))
+
+        timeseries = meta['sources'].get('mq_timeseries')
+        for entry in meta['normalized']:
+            source = pathlib.Path(meta['sources'][entry['source']]['path'])
+            timeseries_path = None
+            if entry['component_type'] == 'MQ' and timeseries is not None:
+                timeseries_path = pathlib.Path(timeseries['path'])
+            df = _decode_frame(f"normalized/{entry['component_type']}", entry['frame'], arrays)
+            datasets.seed_normalized(source, entry['component_type'], entry['component'], df, timeseries_path)
+    except Exception as e:
+        print(f"预热快照加载失败，回退到完整加载: {e}")
+        return None
+
+    elapsed_ms = (time.perf_counter() - start) * 1000.0
+    print(f"已加载预热快照: {path}（{meta['created_at']} 生成，耗时 {elapsed_ms:.1f} ms）")
+    return {'components': meta['components'], 'meta': meta, 'elapsed_ms': elapsed_ms}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="生成预热快照（解析和归一化后的内存状态）"
+    )
+    parser.add_argument(
+        '--data-dir',
+        type=str,
+        default='datas',
+        help='测试结果数据目录（默认：datas）'
+    )
+    parser.add_argument(
+        '--output',
+        type=str,
+        default=DEFAULT_SNAPSHOT_PATH,
+        help=f'快照文件路径（默认：{DEFAULT_SNAPSHOT_PATH}）'
+    )
+    parser.add_argument(
+        '--check',
+        action='store_true',
+        help='只检查已有快照是否过期，不重新生成'
+    )
+
+    args = parser.parse_args()
+
+    components_path = str(pathlib.Path(args.data_dir) / 'components.json')
+    if args.check:
+        if not os.path.exists(args.output):
+            print(f"快照不存在: {args.output}")
+            return
+        meta, _ = read_snapshot(args.output)
+        reason = stale_reason(meta, components_path)
+        print(f"快照有效: {args.output}" if reason is None else f"快照已过期: {reason}")
+        return
+
+    meta = write_snapshot(args.output, args.data_dir, components_path)
+    print(f"预热快照已生成: {args.output}（{os.path.getsize(args.output) / 1024:.1f} KB）")
+    for kind, source in meta['sources'].items():
+        if source is not None:
+            print(f"  {kind}: {source['path']} ({source['sha256'][:12]})")
+
+
+if __name__ == "__main__":
+    main()
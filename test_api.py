@@ -1,43 +1,89 @@
 """
-信创组件适配评估系统 - API测试脚本
-
-测试列表：
-1. 测试健康检查接口
-2. 测试组件列表接口
-3. 测试基于组件的适配评估（使用数据：datas/components.json）
-4. 测试基于任务的适配评估（使用真实数据：datas目录下的CSV文件）
-5. 测试性能评估接口（使用真实数据：datas目录下的CSV文件）
-6. 测试容量外推接口（使用真实数据：datas目录下的CSV文件）
+信创组件适配评估系统 - API 压测与冒烟测试脚本
+
+按可配置的接口混合比例，以开环到达（泊松或恒定速率，不受响应快慢影响）和多并发连接
+驱动本地启动的服务，按接口统计 RPS、p50/p95/p99/max 延迟和错误率，并写入 JSON 文件。
+延迟从计划到达时间开始计算，服务处理不过来时排队时间也计入延迟。
+
+用法：
+    python test_api.py                                  # 默认混合，50 RPS，30 秒
+    python test_api.py --rate 200 --concurrency 64 --duration 60 --output results.json
+    python test_api.py --mix contention                 # 外推持续占满服务时轻量接口的延迟
+    python test_api.py --smoke                          # 每个接口请求一次并打印结果
+
+接口混合（--mix）：
+    default：覆盖全部接口，轻量接口和数据接口各占一半左右
+    dashboard：仪表盘刷新，以组件列表、性能评估和时间序列为主
+    contention：80% 为开启 bootstrap 的容量外推（重采样次数随机，绕过结果缓存），
+                20% 为健康检查和组件列表；分别对同步部署（gunicorn）和 ASGI 部署运行，
+                比较轻量接口的延迟
 """
 
-import requests
+import argparse
 import json
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+import requests
 
 BASE_URL = "http://localhost:5000"
 
-def test_health():
-    """测试健康检查接口"""
-    response = requests.get(f"{BASE_URL}/api/health")
-    print("健康检查:", response.json())
 
-def test_components():
-    """测试组件列表接口"""
-    response = requests.get(f"{BASE_URL}/api/components")
-    print("组件列表:", json.dumps(response.json(), indent=2, ensure_ascii=False))
+def extrapolation_db():
+    return {
+        "component_name": "KingbaseES",
+        "component_type": "DB",
+        "target_tps": 1000,
+        "max_latency_ms": 100,
+        "test_cpu_cores": 4,
+        "test_memory_gb": 4.0
+    }
+
 
-def test_component_based_adaptation():
-    """测试基于组件的适配评估"""
-    data = {
+def extrapolation_mq():
+    return {
+        "component_name": "RabbitMQ",
+        "component_type": "MQ",
+        "target_msg_per_sec": 10000,
+        "max_latency_ms": 100,
+        "test_cpu_cores": 4,
+        "test_memory_gb": 4.0
+    }
+
+
+def extrapolation_bootstrap():
+    """开启 bootstrap 的容量外推：重采样次数随机，每次都重新计算"""
+    return {
+        "component_name": "RabbitMQ",
+        "component_type": "MQ",
+        "target_msg_per_sec": 10000,
+        "max_latency_ms": 2000,
+        "confidence_intervals": True,
+        "bootstrap_samples": random.randint(10000, 20000)
+    }
+
+
+# 场景：名称 -> (方法, 路径, 查询参数, 请求体生成函数)
+SCENARIOS = {
+    'health': ('GET', '/api/health', None, None),
+    'ready': ('GET', '/api/ready', None, None),
+    'components': ('GET', '/api/components', None, None),
+    'components_databases': ('GET', '/api/components/databases', None, None),
+    'components_message_queues': ('GET', '/api/components/message-queues', None, None),
+    'components_operating_systems': ('GET', '/api/components/operating-systems', None, None),
+    'component_based': ('POST', '/api/adaptation/component-based', None, lambda: {
         "target_database": "人大金仓 KingbaseES",
         "target_message_queue": "阿里 RabbitMQ",
         "target_operating_system": "麒麟 Kylin V10"
-    }
-    response = requests.post(f"{BASE_URL}/api/adaptation/component-based", json=data)
-    print("基于组件的适配评估:", json.dumps(response.json(), indent=2, ensure_ascii=False))
-
-def test_task_based_adaptation():
-    """测试基于任务的适配评估"""
-    data = {
+    }),
+    'task_based': ('POST', '/api/adaptation/task-based', None, lambda: {
         "task_type": "OLTP",
         "max_response_time": 1000,
         "min_throughput": 1000,
@@ -45,72 +91,309 @@ def test_task_based_adaptation():
             "max_cpu_cores": 8,
             "max_memory_gb": 16
         }
-    }
-    response = requests.post(f"{BASE_URL}/api/adaptation/task-based", json=data)
-    print("基于任务的适配评估:", json.dumps(response.json(), indent=2, ensure_ascii=False))
-
-def test_performance_evaluation():
-    """测试性能评估接口（基于CSV真实数据）"""
-    data = {
+    }),
+    'performance_evaluate': ('POST', '/api/performance/evaluate', None, lambda: {
         "database": "人大金仓 KingbaseES",
         "message_queue": "阿里 RabbitMQ",
         "operating_system": "麒麟 Kylin V10"
-    }
-    response = requests.post(f"{BASE_URL}/api/performance/evaluate", json=data)
-    print("性能评估:", json.dumps(response.json(), indent=2, ensure_ascii=False))
-
-def test_capacity_extrapolation():
-    """测试容量外推接口：根据组件名称和目标性能计算所需CPU和内存"""
-    # 测试数据库容量外推
-    data_db = {
+    }),
+    'extrapolation_db': ('POST', '/api/capacity/extrapolation', None, extrapolation_db),
+    'extrapolation_mq': ('POST', '/api/capacity/extrapolation', None, extrapolation_mq),
+    'extrapolation_bootstrap': ('POST', '/api/capacity/extrapolation', None, extrapolation_bootstrap),
+    'scale_out': ('POST', '/api/capacity/scale-out', None, lambda: {
+        "component_name": "RabbitMQ",
+        "component_type": "MQ",
+        "target_msg_per_sec": 200000,
+        "max_latency_ms": 2000,
+        "min_nodes": 3,
+        "top_k": 3
+    }),
+    'capacity_curve': ('POST', '/api/capacity/curve', None, lambda: {
         "component_name": "KingbaseES",
         "component_type": "DB",
-        "target_tps": 1000,
-        "max_latency_ms": 100,
-        "test_cpu_cores": 4,
-        "test_memory_gb": 4.0
+        "min_load": 1000,
+        "max_load": 100000,
+        "steps": 1000,
+        "max_latency_ms": 100
+    }),
+    'pipeline': ('POST', '/api/capacity/pipeline', None, lambda: {
+        "database": "KingbaseES",
+        "message_queue": "RabbitMQ",
+        "target_msg_per_sec": 20000,
+        "messages_per_transaction": 10,
+        "max_latency_ms": 2000
+    }),
+    'timeseries': ('GET', '/api/timeseries', {
+        "run_id": "auto-r1000",
+        "metrics": "received_msg_s,p95_ms",
+        "points": 10,
+        "method": "lttb"
+    }, None),
+    'results_db': ('GET', '/api/results/databases', {"component": "KingbaseES", "limit": 1000}, None),
+    'results_mq': ('GET', '/api/results/message-queues', {"component": "RabbitMQ", "limit": 1000}, None),
+    'query': ('POST', '/api/query', None, lambda: {
+        "dataset": "kbbench",
+        "filters": [
+            {"column": "return_code", "op": "=", "value": 0},
+            {"column": "latency_ms_avg", "op": "<=", "value": 100}
+        ],
+        "group_by": ["clients"],
+        "aggregations": [{"func": "max", "column": "tps_excluding", "as": "max_tps"}, {"func": "count"}],
+        "order_by": [{"column": "max_tps", "desc": True}],
+        "limit": 10
+    }),
+}
+
+# 接口混合：场景名 -> 权重
+MIXES = {
+    'default': {
+        'health': 10, 'components': 10,
+        'components_databases': 2, 'components_message_queues': 2, 'components_operating_systems': 2,
+        'component_based': 8, 'task_based': 8, 'performance_evaluate': 8,
+        'extrapolation_db': 12, 'extrapolation_mq': 12, 'scale_out': 6, 'capacity_curve': 6, 'pipeline': 6,
+        'timeseries': 10, 'query': 6, 'results_db': 2, 'results_mq': 2,
+    },
+    'dashboard': {
+        'components': 20, 'performance_evaluate': 30, 'timeseries': 30,
+        'extrapolation_db': 10, 'extrapolation_mq': 10,
+    },
+    'contention': {
+        'extrapolation_bootstrap': 80, 'health': 10, 'components': 10,
+    },
+}
+
+
+def send(session: requests.Session, base_url: str, scenario: str, timeout: float = 60) -> requests.Response:
+    """按场景发送一次请求"""
+    method, path, params, body = SCENARIOS[scenario]
+    return session.request(method, base_url + path, params=params,
+                           json=body() if body else None, timeout=timeout)
+
+
+def run_smoke(base_url: str) -> bool:
+    """每个场景请求一次并打印结果，返回是否全部成功"""
+    session = requests.Session()
+    ok = True
+    for scenario in SCENARIOS:
+        if scenario == 'extrapolation_bootstrap':
+            continue
+        response = send(session, base_url, scenario)
+        print(f"{scenario} [{response.status_code}]:",
+              json.dumps(response.json(), indent=2, ensure_ascii=False))
+        print("\n" + "=" * 50)
+        ok = ok and response.status_code < 400
+    return ok
+
+
+def run_load(base_url: str, mix: Dict[str, float], rate: float, duration: float,
+             concurrency: int, arrival: str = 'poisson', seed: int = 0) -> Dict:
+    """
+    开环压测：按到达过程调度请求，交给 concurrency 个连接执行
+
+    Args:
+        base_url: 服务地址
+        mix: 场景权重
+        rate: 总到达速率（请求/秒）
+        duration: 持续时间（秒）
+        concurrency: 并发连接数
+        arrival: 'poisson'（指数分布间隔）或 'constant'
+        seed: 随机种子
+
+    Returns:
+        压测报告字典
+    """
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+
+    local = threading.local()
+    results = defaultdict(lambda: {'latencies': [], 'errors': 0, 'status': defaultdict(int)})
+    lock = threading.Lock()
+
+    def task(scenario: str, scheduled: float):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        try:
+            status = send(session, base_url, scenario).status_code
+        except requests.RequestException:
+            status = 'connection_error'
+        # 从计划到达时间开始计时，排队等待连接的时间计入延迟
+        elapsed_ms = (time.perf_counter() - scheduled) * 1000
+        with lock:
+            entry = results[scenario]
+            entry['latencies'].append(elapsed_ms)
+            entry['status'][str(status)] += 1
+            if status == 'connection_error' or status >= 500:
+                entry['errors'] += 1
+
+    started_at = datetime.now().isoformat(timespec='seconds')
+    start = time.perf_counter()
+    next_arrival = start
+    scheduled = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while True:
+            next_arrival += rng.expovariate(rate) if arrival == 'poisson' else 1.0 / rate
+            if next_arrival - start >= duration:
+                break
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(task, rng.choices(names, weights)[0], next_arrival)
+            scheduled += 1
+    elapsed = time.perf_counter() - start
+
+    routes = {name: summarize(entry, elapsed) for name, entry in sorted(results.items())}
+    overall = summarize({
+        'latencies': [v for entry in results.values() for v in entry['latencies']],
+        'errors': sum(entry['errors'] for entry in results.values()),
+        'status': {}
+    }, elapsed)
+    return {
+        'started_at': started_at,
+        'base_url': base_url,
+        'config': {
+            'mix': mix,
+            'rate': rate,
+            'duration_s': duration,
+            'concurrency': concurrency,
+            'arrival': arrival,
+            'seed': seed
+        },
+        'elapsed_s': round(elapsed, 3),
+        'scheduled': scheduled,
+        'overall': overall,
+        'routes': routes
     }
-    response = requests.post(f"{BASE_URL}/api/capacity/extrapolation", json=data_db)
-    print("数据库容量外推:", json.dumps(response.json(), indent=2, ensure_ascii=False))
-    
-    # 测试消息队列容量外推
-    data_mq = {
-        "component_name": "RabbitMQ",
-        "component_type": "MQ",
-        "target_msg_per_sec": 10000,
-        "max_latency_ms": 100,
-        "test_cpu_cores": 4,
-        "test_memory_gb": 4.0
+
+
+def summarize(entry: Dict, elapsed: float) -> Dict:
+    """汇总一个场景的请求数、RPS、错误率和延迟分位数"""
+    latencies = np.asarray(entry['latencies'], dtype=np.float64)
+    count = len(latencies)
+    summary = {
+        'requests': count,
+        'errors': entry['errors'],
+        'error_rate': round(entry['errors'] / count, 4) if count else 0.0,
+        'rps': round(count / elapsed, 2) if elapsed > 0 else 0.0,
     }
-    response = requests.post(f"{BASE_URL}/api/capacity/extrapolation", json=data_mq)
-    print("\n消息队列容量外推:", json.dumps(response.json(), indent=2, ensure_ascii=False))
+    if count:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        summary.update({
+            'p50_ms': round(float(p50), 2),
+            'p95_ms': round(float(p95), 2),
+            'p99_ms': round(float(p99), 2),
+            'max_ms': round(float(latencies.max()), 2),
+        })
+    # 准入控制拒绝（429 队列已满 / 503 排队超时）的请求数
+    shed = sum(n for status, n in entry['status'].items() if status in ('429', '503'))
+    if shed:
+        summary['shed'] = shed
+    if entry['status']:
+        summary['status'] = dict(entry['status'])
+    return summary
+
+
+def print_report(report: Dict):
+    """打印按场景的汇总表"""
+    print(f"{'场景':<30}{'请求':>8}{'错误率':>8}{'RPS':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    rows = list(report['routes'].items()) + [('overall', report['overall'])]
+    for name, s in rows:
+        print(f"{name:<30}{s['requests']:>8}{s['error_rate']:>8.2%}{s['rps']:>9.1f}"
+              f"{s.get('p50_ms', 0):>9.1f}{s.get('p95_ms', 0):>9.1f}{s.get('p99_ms', 0):>9.1f}{s.get('max_ms', 0):>9.1f}")
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """解析接口混合：预设名称，或 "health=1,extrapolation_db=3" 形式的自定义权重"""
+    if value in MIXES:
+        return MIXES[value]
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"未知场景: {name}（可选: {', '.join(SCENARIOS)}）")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="API 压测与冒烟测试（需要先启动服务）"
+    )
+    parser.add_argument(
+        '--url',
+        type=str,
+        default=BASE_URL,
+        help=f'服务地址（默认：{BASE_URL}）'
+    )
+    parser.add_argument(
+        '--smoke',
+        action='store_true',
+        help='冒烟测试：每个接口请求一次并打印结果'
+    )
+    parser.add_argument(
+        '--mix',
+        type=parse_mix,
+        default='default',
+        help=f'接口混合：{"/".join(MIXES)} 或 "场景=权重,..."（默认：default）'
+    )
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=50,
+        help='总到达速率 请求/秒（默认：50）'
+    )
+    parser.add_argument(
+        '--duration',
+        type=float,
+        default=30,
+        help='压测持续时间秒（默认：30）'
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=32,
+        help='并发连接数（默认：32）'
+    )
+    parser.add_argument(
+        '--arrival',
+        choices=['poisson', 'constant'],
+        default='poisson',
+        help='到达过程（默认：poisson）'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='随机种子（默认：0）'
+    )
+    parser.add_argument(
+        '--output',
+        type=str,
+        default='load_test_results.json',
+        help='结果 JSON 文件（默认：load_test_results.json）'
+    )
+
+    args = parser.parse_args()
+    base_url = args.url.rstrip('/')
 
-if __name__ == "__main__":
-    print("开始测试信创组件适配评估系统API...")
-    print("=" * 50)
-    
     try:
-        test_health()
-        print("\n" + "=" * 50)
-        
-        test_components()
-        print("\n" + "=" * 50)
-        
-        test_component_based_adaptation()
-        print("\n" + "=" * 50)
-        
-        test_task_based_adaptation()
-        print("\n" + "=" * 50)
-        
-        test_performance_evaluation()
-        print("\n" + "=" * 50)
-        
-        test_capacity_extrapolation()
-        print("\n" + "=" * 50)
-        
-        print("所有测试完成！")
-        
+        if args.smoke:
+            ok = run_smoke(base_url)
+            print("所有测试完成！" if ok else "存在失败的接口")
+            sys.exit(0 if ok else 1)
+
+        report = run_load(base_url, args.mix, args.rate, args.duration, args.concurrency,
+                          args.arrival, args.seed)
     except requests.exceptions.ConnectionError:
         print("错误：无法连接到API服务器，请确保服务器正在运行")
-    except Exception as e:
-        print(f"测试过程中出现错误：{e}")
+        sys.exit(1)
+
+    print_report(report)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+时间序列降采样：将长时间压测的逐秒数据压缩为固定点数，用于绘图
+支持两种方法：
+1. LTTB（Largest-Triangle-Three-Buckets）：保留视觉形状
+2. minmax：每个桶保留最小值和最大值，保留峰值
+"""
+
+import pathlib
+from functools import lru_cache
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from datasets import file_signature, load_csv_cached, register_resident, signature_tag
+from normalize_metrics import as_float64, to_python_scalar
+
+
+# 时间序列文件中可降采样的指标列
+TIMESERIES_METRICS = (
+    'sent_msg_s', 'received_msg_s', 'p50_ms', 'p95_ms', 'p99_ms',
+    'cpu_percent', 'memory_percent', 'memory_used_gb',
+)
+
+DOWNSAMPLE_METHODS = ('lttb', 'minmax')
+
+
+def _bucket_edges(n: int, n_buckets: int) -> np.ndarray:
+    """将下标 1..n-2 均分为 n_buckets 个桶，返回桶边界（首尾点单独保留）"""
+    return np.linspace(1, n - 1, n_buckets + 1).astype(np.int64)
+
+
+def lttb_downsample(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    LTTB 降采样
+
+    每个桶的候选点与前一个已选点、后一个桶的均值点构成三角形，选面积最大者。
+    桶均值一次性用 reduceat 计算，桶内面积向量化计算，只在桶之间循环
+
+    Args:
+        x: 横坐标（升序）
+        y: 纵坐标
+        n_out: 目标点数（>= 3）
+
+    Returns:
+        选中点的下标
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = _bucket_edges(n, n_out - 2)
+    starts, ends = edges[:-1], edges[1:]
+    counts = ends - starts
+
+    # 每个桶的均值点；最后一个桶的"下一个桶"是最后一个点
+    avg_x = np.add.reduceat(x[:-1], starts) / counts
+    avg_y = np.add.reduceat(y[:-1], starts) / counts
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = starts[i], ends[i]
+        bx = x[start:end]
+        by = y[start:end]
+        area = np.abs(
+            (x[prev] - next_x[i]) * (by - y[prev]) -
+            (x[prev] - bx) * (next_y[i] - y[prev])
+        )
+        prev = start + int(np.argmax(area))
+        selected[i + 1] = prev
+
+    return selected
+
+
+def minmax_downsample(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    minmax 降采样：每个桶保留最小值点和最大值点（完全向量化）
+
+    Args:
+        x: 横坐标（升序）
+        y: 纵坐标
+        n_out: 目标点数（>= 4）
+
+    Returns:
+        选中点的下标（升序，去重）
+    """
+    n = len(x)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    n_buckets = (n_out - 2) // 2
+    edges = _bucket_edges(n, n_buckets)
+    bucket = np.searchsorted(edges, np.arange(1, n - 1), side='right') - 1
+
+    # 按 (桶, 值) 排序后，每个桶的第一个是最小值、最后一个是最大值
+    inner = np.arange(1, n - 1)
+    order = inner[np.lexsort((y[1:-1], bucket))]
+    first = np.searchsorted(bucket[order - 1], np.arange(n_buckets), side='left')
+    last = np.searchsorted(bucket[order - 1], np.arange(n_buckets), side='right') - 1
+
+    selected = np.concatenate(([0], order[first], order[last], [n - 1]))
+    return np.unique(selected)
+
+
+def downsample(x: np.ndarray, y: np.ndarray, n_out: int, method: str = 'lttb') -> np.ndarray:
+    """按指定方法降采样，返回选中点的下标"""
+    if method == 'lttb':
+        return lttb_downsample(x, y, n_out)
+    if method == 'minmax':
+        return minmax_downsample(x, y, n_out)
+    raise ValueError(f"未知的降采样方法: {method}")
+
+
+@lru_cache(maxsize=8)
+def _run_arrays(path: str, signature: tuple) -> Dict[str, Dict[str, np.ndarray]]:
+    """按 run_id 拆分时间序列（按 time_s 排序，保留紧凑列类型），每个文件版本只拆分一次"""
+    df = load_csv_cached(pathlib.Path(path))
+    tag = f"{pathlib.Path(path).name}@{signature_tag(signature)}"
+    runs = {}
+    for run_id, group in df.groupby('run_id', observed=True, sort=False):
+        group = group.sort_values('time_s')
+        runs[str(run_id)] = {
+            col: group[col].to_numpy()
+            for col in ('time_s',) + TIMESERIES_METRICS if col in group.columns
+        }
+        for col, values in runs[str(run_id)].items():
+            register_resident(f"timeseries/{tag}/{run_id}/{col}", values)
+    return runs
+
+
+def list_runs(path: pathlib.Path) -> List[str]:
+    """列出时间序列文件中的全部 run_id"""
+    return list(_run_arrays(str(path), file_signature(path)).keys())
+
+
+@lru_cache(maxsize=1024)
+def _downsample_cached(path: str, signature: tuple, run_id: str, metric: str,
+                       points: int, method: str) -> Tuple[Tuple[float, ...], Tuple[float, ...], int]:
+    """降采样结果按 (文件版本, run_id, 指标, 点数, 方法) 缓存"""
+    run = _run_arrays(path, signature)[run_id]
+    x = run['time_s']
+    y = run[metric]
+    valid = ~np.isnan(as_float64(y))
+    x, y = x[valid], y[valid]
+    idx = downsample(as_float64(x), as_float64(y), points, method)
+    # 只对选中的点还原 float32 的十进制表示
+    return (tuple(float(to_python_scalar(v)) for v in x[idx]),
+            tuple(float(to_python_scalar(v)) for v in y[idx]), len(x))
+
+
+def iter_downsample_run(path: pathlib.Path, run_id: str, metrics: List[str],
+                        points: int = 500, method: str = 'lttb') -> Iterator[Tuple[str, Dict]]:
+    """
+    对某次运行的多个指标逐个降采样（流式响应按指标逐块输出）
+
+    run_id 和指标在返回迭代器之前校验，响应开始发送后不会再因参数错误中断
+
+    Args:
+        path: 时间序列CSV文件
+        run_id: 运行ID
+        metrics: 指标列表（TIMESERIES_METRICS 的子集）
+        points: 每个指标的目标点数
+        method: 'lttb' 或 'minmax'
+
+    Returns:
+        (指标, {'time_s': [...], 'values': [...], 'raw_points': n}) 的迭代器
+
+    Raises:
+        KeyError: run_id 或指标不存在
+    """
+    signature = file_signature(path)
+    runs = _run_arrays(str(path), signature)
+    if run_id not in runs:
+        raise KeyError(run_id)
+    for metric in metrics:
+        if metric not in runs[run_id]:
+            raise KeyError(metric)
+
+    def generate():
+        for metric in metrics:
+            times, values, raw_points = _downsample_cached(str(path), signature, run_id, metric, points, method)
+            yield metric, {
+                'time_s': list(times),
+                'values': list(values),
+                'raw_points': raw_points
+            }
+
+    return generate()
+
+
+def downsample_run(path: pathlib.Path, run_id: str, metrics: List[str],
+                   points: int = 500, method: str = 'lttb') -> Dict:
+    """
+    对某次运行的多个指标降采样（一次返回全部指标，参数同 iter_downsample_run）
+
+    Returns:
+        {指标: {'time_s': [...], 'values': [...], 'raw_points': n}}
+
+    Raises:
+        KeyError: run_id 或指标不存在
+    """
+    return dict(iter_downsample_run(path, run_id, metrics, points, method))
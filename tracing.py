@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+轻量链路追踪：按 OpenTelemetry 的 Span 模型记录各阶段耗时，本地导出为 JSON 行，不需要 collector
+
+- 当前 Span 保存在 contextvars 中，路由、数据加载、归一化和外推计算中的子 Span 自动挂到当前请求下
+- 采样在根 Span 处决定（TRACE_SAMPLE_RATE），未采样时 span() 直接返回，几乎没有开销；
+  开启记录模式（慢请求日志使用）后未采样的请求也记录各阶段耗时，但不导出
+- 请求头带 W3C traceparent 时沿用其 trace-id，并尊重其中的采样标志
+- 导出格式为 OTLP/JSON 的 Span 字段（traceId、spanId、parentSpanId、startTimeUnixNano、attributes 等），
+  每个 Span 一行，可直接用 jq 分析或转发给 OTel collector
+
+环境变量：
+    TRACE_SAMPLE_RATE：采样率 0~1（默认 0，不追踪）
+    TRACE_EXPORT：stdout（默认）或文件路径（追加写入）
+"""
+
+import contextvars
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class Span:
+    """一个计时区间（字段与 OpenTelemetry Span 对应）"""
+
+    __slots__ = ('trace_id', 'span_id', 'parent_span_id', 'name', 'kind',
+                 'start_ns', 'end_ns', 'attributes', 'status', 'status_message',
+                 'sampled', 'root', 'finished')
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str] = None,
+                 kind: int = SPAN_KIND_INTERNAL, attributes: Optional[Dict] = None,
+                 sampled: bool = True, root: Optional['Span'] = None):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.status = STATUS_UNSET
+        self.status_message = None
+        # 是否导出；根 Span 额外收集已结束的子 Span，用于按阶段汇总耗时
+        self.sampled = sampled
+        self.root = root if root is not None else self
+        self.finished: List['Span'] = []
+
+    def set_attribute(self, key: str, value):
+        """设置属性（值为 str/bool/int/float 或其列表）"""
+        self.attributes[key] = value
+
+    def set_error(self, error: BaseException):
+        """标记为失败"""
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_otlp(self) -> Dict:
+        """OTLP/JSON 格式的 Span"""
+        data = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in self.attributes.items()],
+            'status': {'code': self.status},
+        }
+        if self.parent_span_id:
+            data['parentSpanId'] = self.parent_span_id
+        if self.status_message:
+            data['status']['message'] = self.status_message
+        return data
+
+
+def _otlp_value(value) -> Dict:
+    """属性值转换为 OTLP AnyValue"""
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    if isinstance(value, (list, tuple)):
+        return {'arrayValue': {'values': [_otlp_value(v) for v in value]}}
+    return {'stringValue': str(value)}
+
+
+class JsonLinesExporter:
+    """将结束的 Span 按行写入 stdout 或文件"""
+
+    def __init__(self, target: str = 'stdout'):
+        self.target = target
+        self._lock = threading.Lock()
+
+    def export(self, finished: Span):
+        line = json.dumps(finished.to_otlp(), ensure_ascii=False)
+        with self._lock:
+            if self.target == 'stdout':
+                sys.stdout.write(line + '\n')
+                sys.stdout.flush()
+            else:
+                with open(self.target, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+
+
+_sample_rate = float(os.environ.get('TRACE_SAMPLE_RATE', '0') or 0)
+_record_all = False
+_exporter = JsonLinesExporter(os.environ.get('TRACE_EXPORT', 'stdout') or 'stdout')
+_current: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+
+
+def configure(sample_rate: Optional[float] = None, export: Optional[str] = None,
+              record_all: Optional[bool] = None):
+    """
+    修改采样率、导出目标或记录模式
+
+    Args:
+        sample_rate: 采样率
+        export: 导出目标（stdout 或文件路径）
+        record_all: 未采样的请求是否也记录各阶段耗时（不导出）
+    """
+    global _sample_rate, _exporter, _record_all
+    if sample_rate is not None:
+        _sample_rate = sample_rate
+    if export is not None:
+        _exporter = JsonLinesExporter(export)
+    if record_all is not None:
+        _record_all = record_all
+
+
+def current_span() -> Optional[Span]:
+    """当前 Span（未采样但开启记录模式时也存在）；未追踪时为 None"""
+    return _current.get()
+
+
+def annotate(key: str, value, overwrite: bool = True):
+    """在当前请求的根 Span 上记录属性（如缓存命中、数据集版本）；未追踪时忽略"""
+    current = _current.get()
+    if current is None:
+        return
+    if overwrite or key not in current.root.attributes:
+        current.root.attributes[key] = value
+
+
+def stage_timings(root: Span) -> Dict[str, Dict]:
+    """按 Span 名称汇总根 Span 下已结束子 Span 的次数和耗时"""
+    stages: Dict[str, Dict] = {}
+    for child in root.finished:
+        stage = stages.setdefault(child.name, {'count': 0, 'total_ms': 0.0})
+        stage['count'] += 1
+        stage['total_ms'] += child.duration_ms
+    for stage in stages.values():
+        stage['total_ms'] = round(stage['total_ms'], 3)
+    return stages
+
+
+def parse_traceparent(header: Optional[str]):
+    """
+    解析 W3C traceparent：00-{trace-id}-{parent-id}-{flags}
+
+    Returns:
+        (trace_id, parent_span_id, sampled)；格式不正确时为 None
+    """
+    if not header:
+        return None
+    parts = header.strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+def start_root(name: str, kind: int = SPAN_KIND_SERVER, traceparent: Optional[str] = None,
+               attributes: Optional[Dict] = None):
+    """
+    开始根 Span（请求或命令行任务的入口）并在此决定是否采样
+
+    Returns:
+        (Span 或 None, contextvars 令牌)；需配合 end_root 使用
+    """
+    parent = parse_traceparent(traceparent)
+    if parent is not None:
+        trace_id, parent_span_id, sampled = parent
+        sampled = sampled or random.random() < _sample_rate
+    else:
+        trace_id, parent_span_id = f"{random.getrandbits(128):032x}", None
+        sampled = _sample_rate > 0 and random.random() < _sample_rate
+
+    root = None
+    if sampled or _record_all:
+        root = Span(name, trace_id, parent_span_id, kind, attributes, sampled=sampled)
+    return root, _current.set(root)
+
+
+def end_root(root: Optional[Span], token, error: Optional[BaseException] = None):
+    """结束根 Span 并导出"""
+    _current.reset(token)
+    if root is None:
+        return
+    if error is not None:
+        root.set_error(error)
+    root.end_ns = time.time_ns()
+    if root.sampled:
+        _exporter.export(root)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    在当前 Span 下记录一个子 Span；当前请求未被追踪（未采样且未开启记录模式）时直接执行
+
+    用法：
+        with span('pandas.read_csv', path=str(path)) as read_span:
+            df = pd.read_csv(path)
+            if read_span is not None:
+                read_span.set_attribute('rows', len(df))
+    """
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, parent.trace_id, parent.span_id, SPAN_KIND_INTERNAL, attributes,
+                 sampled=parent.sampled, root=parent.root)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.set_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        child.end_ns = time.time_ns()
+        child.root.finished.append(child)
+        if child.sampled:
+            _exporter.export(child)
+
+
+def traced(name: Optional[str] = None):
+    """函数装饰器：整个调用记录为一个子 Span"""
+    def decorator(fn):
+        span_name = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def traceparent_of(span_obj: Optional[Span]) -> Optional[str]:
+    """生成 W3C traceparent（用于响应头或下游调用；未采样时为 None）"""
+    if span_obj is None or not span_obj.sampled:
+        return None
+    return f"00-{span_obj.trace_id}-{span_obj.span_id}-01"
+
+
+def install_tracing(app):
+    """
+    为 Flask 应用注册追踪钩子：每个请求一个根 Span，JSON 编码单独记录一个子 Span，
+    已采样的响应带 traceparent 响应头
+    """
+    from flask import g, request
+    from flask.json.provider import DefaultJSONProvider
+
+    class TracedJSONProvider(DefaultJSONProvider):
+        def dumps(self, obj, **kwargs):
+            with span('json.encode'):
+                return super().dumps(obj, **kwargs)
+
+    app.json = TracedJSONProvider(app)
+
+    @app.before_request
+    def _start_request_span():
+        rule = request.url_rule.rule if request.url_rule is not None else request.path
+        g.trace_span, g.trace_token = start_root(
+            f"{request.method} {rule}",
+            traceparent=request.headers.get('traceparent'),
+            attributes={'http.method': request.method, 'http.route': rule, 'http.target': request.full_path}
+        )
+
+    @app.after_request
+    def _tag_response(response):
+        request_span = g.get('trace_span')
+        if request_span is not None:
+            request_span.set_attribute('http.status_code', response.status_code)
+            if response.status_code >= 500:
+                request_span.status = STATUS_ERROR
+            if request_span.sampled:
+                response.headers['traceparent'] = traceparent_of(request_span)
+        return response
+
+    @app.teardown_request
+    def _end_request_span(error=None):
+        token = g.pop('trace_token', None)
+        if token is not None:
+            end_root(g.pop('trace_span', None), token, error)
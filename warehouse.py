@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准数据仓库：将测试结果批量导入 SQLite（标准库 sqlite3），通过索引做范围查询
+数据量超出 DataFrame 常驻内存的合适范围后，路由可改走仓库查询而不是逐个扫描CSV
+
+表结构：
+1. kbbench：数据库测试结果（全部历史文件）
+2. perftest_summary：消息队列测试汇总
+3. perftest_timeseries：消息队列时间序列
+4. normalized：归一化指标（DB 与 MQ 合并）
+"""
+
+import argparse
+import os
+import pathlib
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from aliases import normalize_alias
+from datasets import component_from_filename, list_csv_files
+from normalize_metrics import NormalizedMetrics
+
+
+# 建表后创建的索引：覆盖组件、类型、延迟、吞吐和时间戳上的过滤与排序
+INDEXES = {
+    'idx_kbbench_latency': 'kbbench (component, return_code, latency_ms_avg, tps_excluding)',
+    'idx_kbbench_best': 'kbbench (source_file, return_code, tps_excluding, latency_ms_avg)',
+    'idx_kbbench_timestamp': 'kbbench (component, timestamp)',
+    'idx_summary_latency': 'perftest_summary (component, success, worst_p95_ms, avg_received_msg_s)',
+    'idx_summary_best': 'perftest_summary (source_file, success, avg_received_msg_s, worst_p95_ms)',
+    'idx_timeseries_run': 'perftest_timeseries (component, run_id, time_s)',
+    'idx_normalized_db': 'normalized (component, component_type, latency_ms, tps_per_core)',
+    'idx_normalized_mq': 'normalized (component, component_type, worst_p95_ms, msg_per_sec_per_core)',
+    'idx_normalized_timestamp': 'normalized (component_type, timestamp)',
+}
+
+
+def _read_csv_files(data_dir: pathlib.Path, kind: str, default_component: str) -> pd.DataFrame:
+    """读取某类全部历史文件，附加 component 与 source_file 列"""
+    frames = []
+    for path in list_csv_files(data_dir, kind):
+        df = pd.read_csv(path)
+        df.insert(0, 'component', component_from_filename(path, default_component))
+        df['source_file'] = path.name
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_warehouse(
+    db_path: str,
+    data_dir: str = "datas",
+    cpu_cores: int = 4,
+    memory_gb: float = 4.0,
+) -> Dict[str, int]:
+    """
+    从CSV批量构建数据仓库
+
+    先写入临时文件，完成后用 os.replace 原子替换，正在读取旧库的连接不受影响
+
+    Args:
+        db_path: SQLite 文件路径
+        data_dir: 测试结果数据目录
+        cpu_cores: 归一化使用的测试环境CPU核心数
+        memory_gb: 归一化使用的测试环境内存GB
+
+    Returns:
+        各表导入的行数
+    """
+    data_path = pathlib.Path(data_dir)
+    normalizer = NormalizedMetrics(cpu_cores=cpu_cores, memory_gb=memory_gb)
+
+    tables = {
+        'kbbench': _read_csv_files(data_path, 'db', 'KingbaseES'),
+        'perftest_summary': _read_csv_files(data_path, 'mq_summary', 'RabbitMQ'),
+        'perftest_timeseries': _read_csv_files(data_path, 'mq_timeseries', 'RabbitMQ'),
+    }
+
+    normalized = []
+    if len(tables['kbbench']) > 0:
+        for component, group in tables['kbbench'].groupby('component'):
+            normalized.append(normalizer.normalize_db_metrics(group, component))
+    if len(tables['perftest_summary']) > 0:
+        timeseries = tables['perftest_timeseries']
+        for component, group in tables['perftest_summary'].groupby('component'):
+            memory_model = None
+            if len(timeseries) > 0:
+                memory_model = normalizer.estimate_message_memory(
+                    timeseries[timeseries['component'] == component], group
+                )
+            normalized.append(normalizer.normalize_mq_metrics(group, component, memory_model))
+    normalized = [df for df in normalized if len(df) > 0]
+    tables['normalized'] = pd.concat(
+        [df.astype({c: object for c in df.select_dtypes('category').columns}) for df in normalized],
+        ignore_index=True
+    ) if normalized else pd.DataFrame()
+
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    counts = {}
+    conn = sqlite3.connect(tmp_path)
+    try:
+        for name, df in tables.items():
+            if len(df) == 0:
+                continue
+            df.to_sql(name, conn, index=False, if_exists='replace', chunksize=10000)
+            counts[name] = len(df)
+
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        for index_name, definition in INDEXES.items():
+            if definition.split(' ', 1)[0] in existing:
+                conn.execute(f"CREATE INDEX {index_name} ON {definition}")
+
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ('built_at', datetime.now().isoformat(timespec='seconds')),
+            ('data_dir', str(data_path)),
+            ('cpu_cores', str(cpu_cores)),
+            ('memory_gb', str(memory_gb)),
+        ])
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, db_path)
+    return counts
+
+
+class BenchmarkWarehouse:
+    """只读数据仓库访问：每个工作线程复用一个只读连接"""
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: SQLite 文件路径
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        """获取当前线程的只读连接（首次使用时创建）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            uri = pathlib.Path(self.db_path).resolve().as_uri() + "?mode=ro"
+            conn = sqlite3.connect(uri, uri=True)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA query_only = 1")
+            self._local.conn = conn
+        return conn
+
+    def query(self, sql: str, params: tuple = ()) -> List[Dict]:
+        """执行只读查询，返回字典列表"""
+        return [dict(row) for row in self.connection().execute(sql, params)]
+
+    def query_frame(self, sql: str, params: tuple = ()) -> pd.DataFrame:
+        """执行只读查询，返回DataFrame"""
+        return pd.read_sql_query(sql, self.connection(), params=params)
+
+    def has_table(self, table: str) -> bool:
+        """判断表是否存在（对应的CSV在构建时可能不存在）"""
+        rows = self.query("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,))
+        return len(rows) > 0
+
+    def components(self, table: str) -> List[str]:
+        """列出表中的组件名"""
+        if not self.has_table(table):
+            return []
+        return [row['component'] for row in self.query(f"SELECT DISTINCT component FROM {table}")]
+
+    def find_component(self, table: str, name: str) -> Optional[str]:
+        """按名称匹配组件（规范化后完全相同时视为匹配，与 aliases.dataset_matches 一致）"""
+        key = normalize_alias(name)
+        for component in self.components(table):
+            if normalize_alias(component) == key:
+                return component
+        return None
+
+    def has_source(self, table: str, source_file: str) -> bool:
+        """判断某个测试结果文件是否已导入（仓库早于新文件构建时不包含它）"""
+        if not self.has_table(table):
+            return False
+        rows = self.query(f"SELECT 1 FROM {table} WHERE source_file = ? LIMIT 1", (source_file,))
+        return len(rows) > 0
+
+    def best_db_run(self, source_file: str, max_latency_ms: Optional[float] = None,
+                    min_tps: float = 0) -> Optional[Dict]:
+        """某个测试结果文件中满足延迟和TPS约束、TPS最高的数据库测试记录"""
+        if not self.has_table('kbbench'):
+            return None
+        sql = "SELECT * FROM kbbench WHERE source_file = ? AND return_code = 0 AND tps_excluding >= ?"
+        params = [source_file, min_tps]
+        if max_latency_ms is not None:
+            sql += " AND latency_ms_avg <= ?"
+            params.append(max_latency_ms)
+        sql += " ORDER BY tps_excluding DESC LIMIT 1"
+        rows = self.query(sql, tuple(params))
+        return rows[0] if rows else None
+
+    def best_mq_run(self, source_file: str, max_p95_ms: Optional[float] = None,
+                    min_throughput: float = 0) -> Optional[Dict]:
+        """某个测试结果文件中满足P95延迟和吞吐约束、吞吐最高的消息队列测试记录"""
+        if not self.has_table('perftest_summary'):
+            return None
+        sql = "SELECT * FROM perftest_summary WHERE source_file = ? AND success = 1 AND avg_received_msg_s >= ?"
+        params = [source_file, min_throughput]
+        if max_p95_ms is not None:
+            sql += " AND worst_p95_ms <= ?"
+            params.append(max_p95_ms)
+        sql += " ORDER BY avg_received_msg_s DESC LIMIT 1"
+        rows = self.query(sql, tuple(params))
+        return rows[0] if rows else None
+
+    def raw_runs(self, table: str, component: Optional[str] = None, limit: Optional[int] = None) -> pd.DataFrame:
+        """原始测试记录（可按组件过滤，不含仓库附加的 component、source_file 列）"""
+        if not self.has_table(table):
+            return pd.DataFrame()
+        sql = f"SELECT * FROM {table}"
+        params = []
+        if component is not None:
+            sql += " WHERE component = ?"
+            params.append(component)
+        sql += " ORDER BY rowid"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        df = self.query_frame(sql, tuple(params))
+        df = df.drop(columns=['component', 'source_file'], errors='ignore')
+        if 'success' in df.columns:
+            df['success'] = df['success'].astype(bool)
+        return df
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="构建基准数据仓库（SQLite）"
+    )
+    parser.add_argument(
+        '--data-dir',
+        type=str,
+        default='datas',
+        help='测试结果数据目录（默认：datas）'
+    )
+    parser.add_argument(
+        '--output',
+        type=str,
+        default='datas/warehouse.sqlite',
+        help='SQLite 文件路径（默认：datas/warehouse.sqlite）'
+    )
+    parser.add_argument(
+        '--cpu-cores',
+        type=int,
+        default=4,
+        help='测试环境CPU核心数（默认：4）'
+    )
+    parser.add_argument(
+        '--memory-gb',
+        type=float,
+        default=4.0,
+        help='测试环境内存大小GB（默认：4.0）'
+    )
+
+    args = parser.parse_args()
+
+    counts = build_warehouse(args.output, args.data_dir, args.cpu_cores, args.memory_gb)
+    print(f"数据仓库已生成: {args.output}")
+    for table, count in counts.items():
+        print(f"  {table}: {count} 行")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动预热与就绪状态
+
+服务启动后在后台线程中：
+1. 预加载全部测试数据集（解析CSV、归一化、构建SLO查找表、时间序列索引）
+2. 通过应用内的测试客户端把每个数据接口请求一次，走一遍完整的处理路径（路由、计算、JSON 编码）
+
+预热完成前 /api/ready 返回 503，完成后返回 200；/api/health 只表示进程存活。
+编排系统的就绪探针应使用 /api/ready，新实例在能以稳态延迟响应之前不接收流量。
+
+环境变量：
+    WARMUP：设为 0 跳过预热，启动后立即就绪（默认启用）
+"""
+
+import os
+import pathlib
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from datasets import component_from_filename, resolve_db_csv, resolve_mq_summary_csv, resolve_mq_timeseries_csv
+
+
+# 就绪状态：pending -> warming -> ready
+_state = {
+    'status': 'pending',
+    'started_at': None,
+    'finished_at': None,
+    'elapsed_ms': None,
+    'steps': [],
+}
+_state_lock = threading.Lock()
+
+
+def readiness() -> Dict:
+    """当前就绪状态（副本）"""
+    with _state_lock:
+        state = dict(_state)
+        state['steps'] = list(_state['steps'])
+    state['ready'] = state['status'] == 'ready'
+    return state
+
+
+def _record(name: str, start: float, status, error: Optional[str] = None):
+    """记录一个预热步骤的耗时和结果"""
+    step = {'name': name, 'status': status, 'elapsed_ms': round((time.perf_counter() - start) * 1000.0, 3)}
+    if error:
+        step['error'] = error
+    with _state_lock:
+        _state['steps'].append(step)
+
+
+def _match_catalog(catalog: Dict, catalog_key: str, component_type: Optional[str],
+                   component: Optional[str]) -> Optional[str]:
+    """组件目录中关联到该测试数据组件的显示名称（按别名索引），没有时取该类第一个"""
+    if component_type and component:
+        names = catalog['aliases']['entries'].get(component_type, {}).get(component)
+        if names:
+            return names[0]
+    items = catalog['listing'][catalog_key]
+    return items[0].get('name') if items else None
+
+
+def warmup_requests(data_dir: pathlib.Path, catalog: Dict) -> List[Tuple[str, str, Optional[Dict], Optional[Dict]]]:
+    """
+    预热请求列表：每个数据接口一次，组件名取自当前测试数据和组件目录
+
+    Returns:
+        [(方法, 路径, 查询参数, 请求体)]
+    """
+    db_csv = resolve_db_csv(data_dir)
+    mq_csv = resolve_mq_summary_csv(data_dir)
+    db_name = component_from_filename(db_csv, 'KingbaseES') if db_csv else None
+    mq_name = component_from_filename(mq_csv, 'RabbitMQ') if mq_csv else None
+    database = _match_catalog(catalog, 'databases', 'DB', db_name)
+    message_queue = _match_catalog(catalog, 'message_queues', 'MQ', mq_name)
+    operating_system = _match_catalog(catalog, 'operating_systems', None, None)
+
+    requests = [
+        ('GET', '/api/components', None, None),
+        ('POST', '/api/adaptation/component-based', None, {
+            'target_database': database,
+            'target_message_queue': message_queue,
+            'target_operating_system': operating_system,
+        }),
+        ('POST', '/api/adaptation/task-based', None, {
+            'task_type': 'OLTP', 'max_response_time': 1000, 'min_throughput': 1000,
+        }),
+        ('POST', '/api/performance/evaluate', None, {
+            'database': database, 'message_queue': message_queue, 'operating_system': operating_system,
+        }),
+    ]
+    if db_name:
+        requests += [
+            ('POST', '/api/capacity/extrapolation', None, {
+                'component_name': db_name, 'component_type': 'DB', 'target_tps': 1000, 'max_latency_ms': 100,
+            }),
+            ('POST', '/api/capacity/curve', None, {
+                'component_name': db_name, 'component_type': 'DB', 'min_load': 1000, 'max_load': 100000,
+                'steps': 100, 'max_latency_ms': 100,
+            }),
+        ]
+    if mq_name:
+        requests += [
+            ('POST', '/api/capacity/extrapolation', None, {
+                'component_name': mq_name, 'component_type': 'MQ', 'target_msg_per_sec': 10000,
+                'max_latency_ms': 100,
+            }),
+            ('POST', '/api/capacity/scale-out', None, {
+                'component_name': mq_name, 'component_type': 'MQ', 'target_msg_per_sec': 200000,
+                'max_latency_ms': 2000,
+            }),
+        ]
+    if db_name and mq_name:
+        requests.append(('POST', '/api/capacity/pipeline', None, {
+            'database': db_name, 'message_queue': mq_name, 'target_msg_per_sec': 20000,
+            'messages_per_transaction': 10, 'max_latency_ms': 2000,
+        }))
+    return requests
+
+
+def preload_datasets(data_dir: pathlib.Path):
+    """预加载测试数据集：归一化结果、SLO查找表和时间序列索引（依赖 routes 中的加载函数）"""
+    import routes
+    from timeseries import list_runs
+
+    for resolve, component_type in ((resolve_db_csv, 'DB'), (resolve_mq_summary_csv, 'MQ')):
+        path = resolve(data_dir)
+        if path is None:
+            continue
+        start = time.perf_counter()
+        name = component_from_filename(path, 'Unknown')
+        try:
+            normalized_df, version = routes.load_component_normalized(name, component_type)
+            routes.load_slo_lookup(normalized_df, version, name, component_type, 4, 4.0)
+            _record(f"preload {component_type} {name}", start, 'ok')
+        except Exception as e:
+            _record(f"preload {component_type} {name}", start, 'error', str(e))
+
+    ts_csv = resolve_mq_timeseries_csv(data_dir)
+    if ts_csv is not None:
+        start = time.perf_counter()
+        try:
+            runs = list_runs(ts_csv)
+            _record(f"preload timeseries {ts_csv.name}", start, 'ok')
+            return runs
+        except Exception as e:
+            _record(f"preload timeseries {ts_csv.name}", start, 'error', str(e))
+    return []
+
+
+def run_warmup(app, data_dir: str = 'datas'):
+    """
+    执行预热（预加载数据集并请求每个数据接口一次），完成后标记为就绪
+
+    单个步骤失败（如缺少某类测试数据）只记录在步骤结果中，不阻止就绪
+    """
+    from app import get_catalog
+
+    with _state_lock:
+        _state['status'] = 'warming'
+        _state['started_at'] = datetime.now().isoformat(timespec='seconds')
+    total_start = time.perf_counter()
+
+    data_path = pathlib.Path(data_dir)
+    runs = preload_datasets(data_path)
+
+    requests = warmup_requests(data_path, get_catalog())
+    if runs:
+        requests.append(('GET', '/api/timeseries', {'run_id': runs[0], 'points': 100}, None))
+
+    client = app.test_client()
+    for method, path, params, body in requests:
+        start = time.perf_counter()
+        try:
+            response = client.open(path, method=method, query_string=params, json=body)
+            _record(f"{method} {path}", start, response.status_code)
+        except Exception as e:
+            _record(f"{method} {path}", start, 'error', str(e))
+
+    with _state_lock:
+        _state['status'] = 'ready'
+        _state['finished_at'] = datetime.now().isoformat(timespec='seconds')
+        _state['elapsed_ms'] = round((time.perf_counter() - total_start) * 1000.0, 3)
+    print(f"预热完成，耗时 {_state['elapsed_ms']:.1f} ms，服务已就绪")
+
+
+def start_warmup(app) -> Optional[threading.Thread]:
+    """在后台线程中预热（WARMUP=0 时直接标记为就绪）"""
+    if os.environ.get('WARMUP', '1') == '0':
+        with _state_lock:
+            _state['status'] = 'ready'
+        return None
+    thread = threading.Thread(target=run_warmup, args=(app,), name='warmup', daemon=True)
+    thread.start()
+    return thread